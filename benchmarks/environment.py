@@ -0,0 +1,180 @@
+"""Measure distribution metadata handling against a synthetic site-packages
+
+Builds an environment of fake `*.dist-info` directories, with configurable
+`RECORD` sizes, with and without `top_level.txt`, and with marker heavy
+`Requires-Dist` lists, then times resolving a distribution depending on all of
+them, finding their packages, and resolving a requirements file listing them.
+This is repeated at increasing sizes to check the cost grows (roughly)
+linearly.
+
+Usage: python -m benchmarks.environment [--sizes 250,1000] [--record-lines N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Sequence
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _REPO_ROOT)
+
+from unused_deps.dist_info import (  # noqa: E402
+    clear_caches,
+    distribution_packages,
+    find_distribution,
+    parse_requirement,
+    required_dists,
+)
+from unused_deps.environment import Environment  # noqa: E402
+
+_ROOT_DIST = "benchmark-root"
+_MARKERS = (
+    'python_version >= "3.8"',
+    'sys_platform == "linux" or sys_platform == "darwin"',
+    'extra == "test"',
+    'platform_machine != "armv7l" and implementation_name == "cpython"',
+    'python_version < "3.0"',
+)
+
+
+def build_site_packages(
+    site_dir: str, dist_count: int, record_lines: int, top_level_every: int
+) -> list[str]:
+    dist_names = [f"bench-dist-{i}" for i in range(dist_count)]
+    for i, name in enumerate(dist_names):
+        package = name.replace("-", "_")
+        dist_info = os.path.join(site_dir, f"{package}-1.0.dist-info")
+        os.makedirs(dist_info)
+        _write_metadata(dist_info, name, [])
+
+        with open(os.path.join(dist_info, "RECORD"), "w") as f:
+            for line in range(record_lines):
+                subpackage = f"sub_{line % 10}/" if line % 3 else ""
+                f.write(f"{package}/{subpackage}module_{line}.py,sha256=abc,1234\n")
+            f.write(f"{package}-1.0.dist-info/METADATA,sha256=abc,1234\n")
+            f.write(f"{package}-1.0.dist-info/RECORD,,\n")
+
+        if i % top_level_every == 0:
+            with open(os.path.join(dist_info, "top_level.txt"), "w") as f:
+                f.write(f"{package}\n")
+
+    root_requires = [
+        f"{name} >=1.0; {_MARKERS[i % len(_MARKERS)]}"
+        for i, name in enumerate(dist_names)
+    ]
+    root_dist_info = os.path.join(site_dir, "benchmark_root-1.0.dist-info")
+    os.makedirs(root_dist_info)
+    _write_metadata(root_dist_info, _ROOT_DIST, root_requires)
+
+    return root_requires
+
+
+def _write_metadata(dist_info: str, name: str, requires: list[str]) -> None:
+    with open(os.path.join(dist_info, "METADATA"), "w") as f:
+        f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n")
+        for requirement in requires:
+            f.write(f"Requires-Dist: {requirement}\n")
+        f.write("\n" + "A long description\n" * 200)
+
+
+def _best_of(repeat: int, func: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(
+    dist_count: int, record_lines: int, top_level_every: int, repeat: int
+) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as site_dir:
+        requirements = build_site_packages(
+            site_dir, dist_count, record_lines, top_level_every
+        )
+        environment = Environment(path=[site_dir])
+        extras = ["test"]
+        root_dist = find_distribution(_ROOT_DIST, environment)
+        dists = list(required_dists(root_dist, extras, environment))
+
+        return {
+            "required_dists": _best_of(
+                repeat, lambda: list(required_dists(root_dist, extras, environment))
+            ),
+            "distribution_packages": _best_of(
+                repeat,
+                lambda: [list(distribution_packages(dist)) for dist in dists],
+            ),
+            "requirements_file": _best_of(
+                repeat,
+                lambda: [
+                    parse_requirement(requirement, extras, environment)
+                    for requirement in requirements
+                ],
+            ),
+        }
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="250,1000",
+        help="Comma separated numbers of distributions to measure",
+    )
+    parser.add_argument(
+        "--record-lines", type=int, default=200, help="Lines in each RECORD file"
+    )
+    parser.add_argument(
+        "--top-level-every",
+        type=int,
+        default=2,
+        help="Write top_level.txt for every N-th distribution, "
+        "the rest have their packages inferred from RECORD",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        default=1.75,
+        help="Fail if the time per distribution grows by more than this factor "
+        "between the smallest and largest size",
+    )
+    args = parser.parse_args(argv)
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    results = {
+        size: measure(size, args.record_lines, args.top_level_every, args.repeat)
+        for size in sizes
+    }
+    for size, timings in results.items():
+        for operation, seconds in timings.items():
+            print(
+                f"{size} dists: {operation}: {seconds * 1000:.1f}ms "
+                f"({seconds / size * 1_000_000:.1f}us per dist)"
+            )
+
+    failed = False
+    smallest, largest = sizes[0], sizes[-1]
+    for operation in results[smallest]:
+        per_dist_small = results[smallest][operation] / smallest
+        per_dist_large = results[largest][operation] / largest
+        growth = per_dist_large / per_dist_small
+        if growth > args.max_growth:
+            print(
+                f"{operation}: time per dist grew {growth:.2f}x "
+                f"from {smallest} to {largest} dists"
+            )
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
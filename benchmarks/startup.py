@@ -0,0 +1,85 @@
+"""Measure the import time of trivial invocations using `python -X importtime`
+
+Usage: python -m benchmarks.startup [--runs N] [--max-ms MS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections.abc import Sequence
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PYPROJECT = '[tool.py-unused-deps]\nexclude = ["build"]\n'
+# (name, arguments to python, contents of a pyproject.toml in the working directory)
+_SCENARIOS = (
+    ("import", ("-c", "import unused_deps.main"), None),
+    ("help", ("-m", "unused_deps", "--help"), None),
+    ("invalid-args", ("-m", "unused_deps"), None),
+    # a config file is read before the arguments are validated
+    ("invalid-args-with-config", ("-m", "unused_deps"), _PYPROJECT),
+)
+
+
+def import_times(python_args: Sequence[str], cwd: str) -> dict[str, int]:
+    proc = subprocess.run(
+        (sys.executable, "-X", "importtime", *python_args),
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+        # benchmark this checkout, rather than whatever is installed
+        env={**os.environ, "PYTHONPATH": _REPO_ROOT},
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        if self_us.strip().isdigit():
+            times[name.strip()] = int(self_us)
+
+    if "unused_deps.main" not in times:
+        raise RuntimeError(f"Failed to import unused_deps: {proc.stderr}")
+    return times
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        help="Fail if the median total import time of any scenario exceeds this",
+    )
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name, python_args, pyproject in _SCENARIOS:
+        # run from an otherwise empty directory so only the scenario's config is used
+        with tempfile.TemporaryDirectory() as cwd:
+            if pyproject is not None:
+                with open(os.path.join(cwd, "pyproject.toml"), "w") as f:
+                    f.write(pyproject)
+            runs = [import_times(python_args, cwd) for _ in range(args.runs)]
+            total_ms = statistics.median(sum(run.values()) for run in runs) / 1000
+            print(
+                f"{name}: {total_ms:.1f}ms total import time ({len(runs[0])} modules)"
+            )
+            slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+            for module, self_us in slowest[: args.top]:
+                print(f"    {module}: {self_us / 1000:.1f}ms")
+
+            if args.max_ms is not None and total_ms > args.max_ms:
+                print(f"    exceeds the limit of {args.max_ms}ms")
+                failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+import os
+import time
+
+import pytest
+
+from tests.utils import write_dist_info
+from unused_deps.cache import (
+    Fingerprint,
+    environment_fingerprint,
+    is_cacheable,
+    load_result,
+    run_fingerprint,
+    save_result,
+)
+from unused_deps.config import Config
+from unused_deps.environment import Environment
+
+
+@pytest.fixture
+def site_dir(tmp_path):
+    site_dir = tmp_path / "site-packages"
+    write_dist_info(site_dir, "some-dist", top_level=["some_dist"])
+    return site_dir
+
+
+def _config(**kwargs):
+    return Config(filepaths=["."], include=["*.py"], exclude=[], **kwargs)
+
+
+def _fingerprint(site_dir, filepaths=(), config=None):
+    return run_fingerprint(
+        config or _config(), Environment(path=[str(site_dir)]), filepaths
+    )
+
+
+def test_fingerprint_is_stable(tmp_path, site_dir):
+    source = tmp_path / "source.py"
+    source.write_text("import foo\n")
+
+    assert _fingerprint(site_dir, [str(source)]) == _fingerprint(
+        site_dir, [str(source)]
+    )
+
+
+def test_fingerprint_changes_on_file_modification(tmp_path, site_dir):
+    source = tmp_path / "source.py"
+    source.write_text("import foo\n")
+    before = _fingerprint(site_dir, [str(source)])
+
+    source.write_text("import bar\n")
+    stat = source.stat()
+    # even if the mtime is preserved
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert _fingerprint(site_dir, [str(source)]).digest != before.digest
+
+
+def test_fingerprint_changes_on_new_file(tmp_path, site_dir):
+    first = tmp_path / "first.py"
+    second = tmp_path / "second.py"
+    first.touch()
+    second.touch()
+
+    assert (
+        _fingerprint(site_dir, [str(first)]).digest
+        != _fingerprint(site_dir, [str(first), str(second)]).digest
+    )
+
+
+def test_fingerprint_changes_on_config_change(site_dir):
+    assert (
+        _fingerprint(site_dir, config=_config(ignore=["foo"])).digest
+        != _fingerprint(site_dir, config=_config(ignore=["bar"])).digest
+    )
+
+
+def test_fingerprint_changes_on_requirements_contents(tmp_path, site_dir):
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("foo\n")
+    config = _config(
+        project=[{"no_distribution": True, "requirements": [str(requirements)]}]
+    )
+    before = _fingerprint(site_dir, config=config)
+
+    requirements.write_text("bar\n")
+
+    assert _fingerprint(site_dir, config=config).digest != before.digest
+
+
+def test_fingerprint_changes_on_pyproject_contents(tmp_path, site_dir):
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text('[project]\ndependencies = ["foo"]\n')
+    config = _config(pyproject=str(pyproject))
+    before = _fingerprint(site_dir, config=config)
+
+    pyproject.write_text('[project]\ndependencies = ["bar"]\n')
+
+    assert _fingerprint(site_dir, config=config).digest != before.digest
+
+
+def test_fingerprint_handles_missing_requirements_file(tmp_path, site_dir):
+    config = _config(requirements=[str(tmp_path / "missing.txt")])
+
+    assert _fingerprint(site_dir, config=config) == _fingerprint(
+        site_dir, config=config
+    )
+
+
+@pytest.mark.parametrize(
+    "change",
+    (
+        pytest.param(lambda site_dir: write_dist_info(site_dir, "new-dist"), id="new"),
+        pytest.param(
+            lambda site_dir: (
+                site_dir / "some_dist-1.0.dist-info" / "top_level.txt"
+            ).write_text("other\n"),
+            id="modified",
+        ),
+        pytest.param(
+            lambda site_dir: (site_dir / "old-dist.egg-info").write_text(
+                "Name: old-dist\n"
+            ),
+            id="egg-info file",
+        ),
+    ),
+)
+def test_fingerprint_changes_on_environment_change(site_dir, change):
+    before = _fingerprint(site_dir)
+
+    change(site_dir)
+
+    assert _fingerprint(site_dir).digest != before.digest
+
+
+def test_fingerprint_of_current_environment(tmp_path):
+    config = _config()
+
+    assert run_fingerprint(config, Environment(), []) == run_fingerprint(
+        config, Environment(), []
+    )
+
+
+def test_fingerprint_handles_missing_environment_path(tmp_path):
+    environment = Environment(path=[str(tmp_path / "missing")])
+
+    assert run_fingerprint(_config(), environment, []).digest
+
+
+def test_environment_fingerprint(tmp_path, site_dir):
+    environment = Environment(path=[str(site_dir)])
+    fingerprint = environment_fingerprint(environment)
+
+    # independent of the files scanned and the configuration
+    (tmp_path / "source.py").touch()
+    assert environment_fingerprint(environment) == fingerprint
+
+    write_dist_info(site_dir, "other-dist")
+    assert environment_fingerprint(environment).digest != fingerprint.digest
+
+
+def test_is_cacheable():
+    assert is_cacheable(Fingerprint("abc", 0))
+    assert not is_cacheable(Fingerprint("abc", time.time_ns()))
+
+
+def test_save_and_load_result(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    fingerprint = Fingerprint("abc", 0)
+    stdout = ["some output"]
+    stderr = ["No usage found for: foo"]
+
+    save_result(cache_dir, fingerprint, 1, stdout, stderr)
+
+    assert load_result(cache_dir, fingerprint) == (1, stdout, stderr)
+    assert load_result(cache_dir, Fingerprint("def", 0)) is None
+
+
+def test_result_not_saved_for_recently_modified_inputs(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    fingerprint = Fingerprint("abc", time.time_ns())
+
+    save_result(cache_dir, fingerprint, 0, [], [])
+
+    assert load_result(cache_dir, fingerprint) is None
+
+
+@pytest.mark.parametrize("contents", ("not json", "[]"))
+def test_load_result_ignores_invalid_cache(tmp_path, contents):
+    (tmp_path / "run.json").write_text(contents)
+
+    assert load_result(str(tmp_path), Fingerprint("abc", 0)) is None
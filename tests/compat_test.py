@@ -0,0 +1,8 @@
+from unused_deps.compat import stdlib_module_names
+
+
+def test_stdlib_module_names():
+    names = stdlib_module_names()
+
+    assert {"os", "sys", "json", "__future__"} <= names
+    assert "packaging" not in names
@@ -1,8 +1,15 @@
 from argparse import ArgumentParser
+from typing import Dict, cast
 
 import pytest
 
-from unused_deps.config import Config, build_config, load_config_from_file
+from unused_deps.config import (
+    Config,
+    build_config,
+    load_config_from_file,
+    project_configs,
+    project_label,
+)
 from unused_deps.errors import InternalError
 
 default_exclude = [
@@ -19,7 +26,7 @@ default_exclude = [
     ".venv",
     "venv",
 ]
-default_include = ["*.py", "*.pyi"]
+default_include = ["*.py", "*.pyi", "*.ipynb"]
 
 
 class TestLoadConfig:
@@ -173,3 +180,117 @@ class TestBuildConfig:
             build_config(args, config_from_file)
 
         assert str(exc.value) == f"Unknown configuration values: {invalid_key}"
+
+
+class TestProjectConfigs:
+    def test_single_project_without_project_tables(self):
+        config = Config(filepaths=["."], include=[], exclude=[], distribution="foo")
+
+        assert project_configs(config) == [config]
+
+    def test_projects_inherit_and_override_shared_config(self):
+        config = Config(
+            filepaths=["."],
+            include=default_include,
+            exclude=default_exclude,
+            ignore=["shared-ignore"],
+            verbose=1,
+            project=[
+                {"distribution": "foo", "filepaths": ["foo"]},
+                {"no_distribution": True, "requirements": ["requirements.txt"]},
+            ],
+        )
+
+        assert project_configs(config) == [
+            Config(
+                filepaths=["foo"],
+                include=default_include,
+                exclude=default_exclude,
+                distribution="foo",
+                ignore=["shared-ignore"],
+                verbose=1,
+            ),
+            Config(
+                filepaths=["."],
+                include=default_include,
+                exclude=default_exclude,
+                no_distribution=True,
+                ignore=["shared-ignore"],
+                requirements=["requirements.txt"],
+                verbose=1,
+            ),
+        ]
+
+    @pytest.mark.parametrize("key", ("verbose", "python", "project", "invalid-key"))
+    def test_raises_error_on_invalid_project_key(self, key):
+        config = Config(filepaths=[], include=[], exclude=[], project=[{key: 1}])
+
+        with pytest.raises(InternalError) as exc:
+            project_configs(config)
+
+        assert str(exc.value) == f"Unknown project configuration values: {key}"
+
+    @pytest.mark.parametrize(
+        "key, value",
+        (
+            ("filepaths", "src"),
+            ("ignore", ["foo", 1]),
+            ("distribution", ["foo"]),
+            ("no_distribution", "yes"),
+        ),
+    )
+    def test_raises_error_on_invalid_project_value(self, key, value):
+        config = Config(filepaths=[], include=[], exclude=[], project=[{key: value}])
+
+        with pytest.raises(InternalError) as exc:
+            project_configs(config)
+
+        assert str(exc.value) == (
+            f"Invalid project configuration value for '{key}': {value!r}"
+        )
+
+    def test_raises_error_on_non_table_project(self):
+        config = Config(
+            filepaths=[],
+            include=[],
+            exclude=[],
+            project=[cast(Dict[str, object], "foo")],
+        )
+
+        with pytest.raises(InternalError) as exc:
+            project_configs(config)
+
+        assert str(exc.value) == "Invalid project configuration: 'foo'"
+
+    def test_raises_error_on_no_projects(self):
+        config = Config(filepaths=[], include=[], exclude=[], project=[])
+
+        with pytest.raises(InternalError) as exc:
+            project_configs(config)
+
+        assert str(exc.value) == "No projects configured"
+
+    @pytest.mark.parametrize(
+        ("config", "expected"),
+        (
+            (
+                Config(filepaths=["src"], include=[], exclude=[], distribution="foo"),
+                "foo",
+            ),
+            (
+                Config(
+                    filepaths=["src"],
+                    include=[],
+                    exclude=[],
+                    pyproject="lib/pyproject.toml",
+                ),
+                "lib/pyproject.toml",
+            ),
+            (
+                Config(filepaths=["src", "tests"], include=[], exclude=[]),
+                "src, tests",
+            ),
+        ),
+    )
+    def test_project_label(self, config, expected):
+        assert project_label(config) == expected
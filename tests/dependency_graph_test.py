@@ -0,0 +1,181 @@
+import pytest
+
+from tests.utils import write_dist_info
+from unused_deps.dependency_graph import build_dependency_graph, load_dependency_graph
+from unused_deps.environment import Environment
+
+
+@pytest.fixture
+def environment(tmp_path):
+    site_dir = tmp_path / "site-packages"
+    write_dist_info(site_dir, "app", requires=["web[async]", "Cli_Tool"])
+    write_dist_info(
+        site_dir,
+        "web",
+        requires=[
+            "http",
+            "loop; extra == 'async'",
+            "winhelper; sys_platform == 'win32'",
+            "missing",
+        ],
+    )
+    write_dist_info(site_dir, "http", requires=["certs"])
+    write_dist_info(site_dir, "certs")
+    write_dist_info(site_dir, "loop")
+    write_dist_info(site_dir, "winhelper")
+    write_dist_info(site_dir, "cli-tool", requires=["certs"])
+    return Environment(path=[str(site_dir)], markers={"sys_platform": "linux"})
+
+
+def _node(graph, name, extra=""):
+    node = graph.node(name, extra)
+    assert node is not None
+    return node
+
+
+def _requires(graph, name):
+    return sorted(graph.names[node] for node in graph.requires(_node(graph, name)))
+
+
+def test_build_dependency_graph(environment):
+    graph = build_dependency_graph(environment)
+
+    assert _requires(graph, "app") == ["cli-tool", "web[async]"]
+    # not valid for the environment, or not installed
+    assert _requires(graph, "web") == ["http"]
+    assert _requires(graph, "HTTP") == ["certs"]
+    assert _requires(graph, "winhelper") == []
+    assert graph.node("missing") is None
+    assert graph.node("web", "missing") is None
+
+    (web_async,) = (
+        node for node in graph.requires(_node(graph, "app")) if graph.is_extra(node)
+    )
+    assert sorted(graph.names[node] for node in graph.requires(web_async)) == [
+        "loop",
+        "web",
+    ]
+
+
+def test_reachable(environment):
+    graph = build_dependency_graph(environment)
+
+    reached = graph.reachable([_node(graph, "app")])
+    assert sorted(graph.names[node] for node in reached) == [
+        "app",
+        "certs",
+        "cli-tool",
+        "http",
+        "loop",
+        "web",
+        "web[async]",
+    ]
+
+    reached = graph.reachable([_node(graph, "app")], avoiding=_node(graph, "web"))
+    assert sorted(graph.names[node] for node in reached) == [
+        "app",
+        "certs",
+        "cli-tool",
+    ]
+
+
+def test_required_by(environment):
+    graph = build_dependency_graph(environment)
+    roots = [_node(graph, name) for name in ("web", "cli-tool", "loop")]
+
+    assert graph.required_by(_node(graph, "certs"), roots) == [
+        _node(graph, "web"),
+        _node(graph, "cli-tool"),
+    ]
+    # only through an extra of web that isn't among the roots
+    assert graph.required_by(_node(graph, "loop"), roots) == []
+    assert graph.required_by(_node(graph, "web"), roots) == []
+    # not by its own extras
+    roots.append(_node(graph, "web", "async"))
+    assert graph.required_by(_node(graph, "web"), roots) == []
+    assert graph.required_by(_node(graph, "loop"), roots) == [
+        _node(graph, "web", "Async")
+    ]
+
+
+def test_only_reachable_through(environment):
+    graph = build_dependency_graph(environment)
+    roots = [_node(graph, name) for name in ("web", "cli-tool")]
+
+    # certs is still required by cli-tool
+    assert graph.only_reachable_through(_node(graph, "web"), roots) == [
+        _node(graph, "http")
+    ]
+    assert graph.only_reachable_through(_node(graph, "cli-tool"), roots) == []
+    # extras of web among the roots are followed from it
+    roots.append(_node(graph, "web", "async"))
+    assert graph.only_reachable_through(_node(graph, "web"), roots) == [
+        _node(graph, "http"),
+        _node(graph, "loop"),
+    ]
+
+    roots = [_node(graph, "app")]
+    assert graph.only_reachable_through(_node(graph, "app"), roots) == [
+        _node(graph, name) for name in ("certs", "cli-tool", "http", "loop", "web")
+    ]
+
+
+def test_load_dependency_graph_without_cache(environment):
+    graph = load_dependency_graph(environment, None)
+
+    assert _requires(graph, "web") == ["http"]
+
+
+@pytest.fixture
+def no_racy_window(monkeypatch):
+    # the environment was only just written
+    monkeypatch.setattr("unused_deps.cache._RACY_WINDOW_NS", -60_000_000_000)
+
+
+def test_load_dependency_graph_is_cached(tmp_path, environment, no_racy_window, caplog):
+    cache_dir = tmp_path / "cache"
+
+    graph = load_dependency_graph(environment, str(cache_dir))
+    assert (cache_dir / "dependency-graph.json").exists()
+
+    caplog.set_level("INFO")
+    cached = load_dependency_graph(environment, str(cache_dir))
+    assert "Using cached dependency graph from" in caplog.text
+    assert cached.names == graph.names
+    assert list(cached.offsets) == list(graph.offsets)
+    assert list(cached.targets) == list(graph.targets)
+    assert _requires(cached, "app") == ["cli-tool", "web[async]"]
+
+
+def test_load_dependency_graph_rebuilds_on_environment_change(
+    tmp_path, environment, no_racy_window, caplog
+):
+    cache_dir = tmp_path / "cache"
+    load_dependency_graph(environment, str(cache_dir))
+
+    write_dist_info(tmp_path / "site-packages", "extra-dist", requires=["certs"])
+    caplog.set_level("INFO")
+    graph = load_dependency_graph(environment, str(cache_dir))
+
+    assert "Using cached dependency graph" not in caplog.text
+    assert _requires(graph, "extra-dist") == ["certs"]
+
+
+@pytest.mark.parametrize("contents", ("not json", "[]", '{"version": 0}'))
+def test_load_dependency_graph_ignores_invalid_cache(tmp_path, environment, contents):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "dependency-graph.json").write_text(contents)
+
+    graph = load_dependency_graph(environment, str(cache_dir))
+
+    assert _requires(graph, "web") == ["http"]
+
+
+def test_load_dependency_graph_not_cached_when_recently_modified(tmp_path, environment):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+
+    load_dependency_graph(environment, str(cache_dir))
+
+    assert not (cache_dir / "dependency-graph.json").exists()
@@ -1,16 +1,26 @@
 from __future__ import annotations
 
+import importlib.metadata
 import logging
 from unittest import mock
 
 import pytest
+from packaging.markers import Marker
+from packaging.requirements import Requirement
 
-from tests.utils import InMemoryDistribution
+from tests.utils import InMemoryDistribution, write_dist_info
 from unused_deps.dist_info import (
+    cache_stats,
+    clear_caches,
+    dependency_requirements,
+    distribution_name,
     distribution_packages,
+    find_distribution,
+    module_distributions,
     parse_requirement,
     required_dists,
 )
+from unused_deps.environment import Environment
 
 
 @pytest.mark.parametrize(
@@ -43,6 +53,107 @@ def test_distribution_packages(file_lines_map, expected_packages):
     assert list(distribution_packages(dist)) == expected_packages
 
 
+def test_distribution_packages_from_record():
+    dist = InMemoryDistribution(
+        {
+            "RECORD": [
+                "tomli/__init__.py,sha256=abc,100",
+                "tomli/_re.py,sha256=abc,100",
+                "tomli/py.typed,sha256=abc,100",
+                "six.py,sha256=abc,100",
+                '"with,comma/__init__.py",sha256=abc,100',
+                "tomli-2.0.1.dist-info/METADATA,sha256=abc,100",
+                "tomli-2.0.1.dist-info/RECORD,,",
+                "../../bin/some-script,sha256=abc,100",
+            ],
+            # ignored in favour of RECORD
+            "other/__init__.py": [],
+        }
+    )
+
+    assert set(distribution_packages(dist)) == {"tomli", "six", "with,comma"}
+
+
+def test_distribution_packages_inferred_once_per_dist(tmp_path):
+    dist_info = write_dist_info(tmp_path, "tomli")
+    (dist_info / "RECORD").write_text("tomli/__init__.py,sha256=abc,100\n")
+    environment = Environment(path=[str(tmp_path)])
+    clear_caches()
+
+    with mock.patch.object(
+        importlib.metadata.PathDistribution,
+        "read_text",
+        autospec=True,
+        side_effect=importlib.metadata.PathDistribution.read_text,
+    ) as read_text:
+        # a new `Distribution` for each lookup
+        for _ in range(2):
+            dist = find_distribution("tomli", environment)
+            assert list(distribution_packages(dist)) == ["tomli"]
+
+    assert [call.args[1] for call in read_text.call_args_list] == [
+        "top_level.txt",
+        "RECORD",
+        "top_level.txt",
+    ]
+
+
+@pytest.mark.parametrize(
+    ("file_lines_map", "expected_name"),
+    (
+        pytest.param(
+            {
+                "METADATA": [
+                    "Metadata-Version: 2.1",
+                    "Name: some-dist",
+                    "Version: 1.0",
+                    "",
+                    "Name: not-the-name",
+                ]
+            },
+            "some-dist",
+            id="METADATA",
+        ),
+        pytest.param(
+            {"PKG-INFO": ["metadata-version: 1.0", "name: egg-dist"]},
+            "egg-dist",
+            id="PKG-INFO, lowercase headers",
+        ),
+    ),
+)
+def test_distribution_name(file_lines_map, expected_name):
+    dist = InMemoryDistribution(file_lines_map)
+
+    with mock.patch.object(
+        InMemoryDistribution, "metadata", new_callable=mock.PropertyMock
+    ) as metadata:
+        assert distribution_name(dist) == expected_name
+
+    metadata.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "file_lines_map",
+    (
+        pytest.param({}, id="no metadata file"),
+        pytest.param(
+            {"METADATA": ["Version: 1.0", "", "Name: not-a-header"]},
+            id="no name header",
+        ),
+    ),
+)
+def test_distribution_name_falls_back_to_full_metadata(file_lines_map):
+    dist = InMemoryDistribution(file_lines_map)
+
+    with mock.patch.object(
+        InMemoryDistribution,
+        "metadata",
+        new_callable=mock.PropertyMock,
+        return_value={"Name": "from-metadata"},
+    ):
+        assert distribution_name(dist) == "from-metadata"
+
+
 def test_required_dists_single_package():
     # specify requirements via requires.txt
     # https://setuptools.pypa.io/en/latest/deprecated/python_eggs.html#requires-txt
@@ -158,3 +269,160 @@ def test_parse_requirements_returns_dist_on_valid_requirement():
         got = parse_requirement(raw_requirement, [])
 
     assert got == requirement_dist
+
+
+def test_find_distribution_from_environment_path(tmp_path):
+    package_name = "find-dist-from-path"
+    write_dist_info(tmp_path, package_name)
+
+    dist = find_distribution(package_name, Environment(path=[str(tmp_path)]))
+
+    assert dist.metadata["Name"] == package_name
+
+
+def test_find_distribution_missing_from_environment_path(tmp_path):
+    # installed in the current environment, but not in the given path
+    with pytest.raises(importlib.metadata.PackageNotFoundError):
+        find_distribution("packaging", Environment(path=[str(tmp_path)]))
+
+
+def test_required_dists_from_environment_path(tmp_path):
+    write_dist_info(
+        tmp_path,
+        "root-dist",
+        requires=["dep-a", "dep-b; extra == 'b'", "packaging"],
+    )
+    write_dist_info(tmp_path, "dep-a")
+    write_dist_info(tmp_path, "dep-b")
+    environment = Environment(path=[str(tmp_path)])
+    root_dist = find_distribution("root-dist", environment)
+
+    got = list(required_dists(root_dist, ["b"], environment))
+
+    assert [dist.metadata["Name"] for dist in got] == ["dep-a", "dep-b"]
+
+
+@pytest.mark.parametrize(("sys_platform", "expected"), (("linux", 1), ("win32", 0)))
+def test_required_dists_evaluates_environment_markers(tmp_path, sys_platform, expected):
+    write_dist_info(tmp_path, "root-dist", requires=["dep; sys_platform == 'linux'"])
+    write_dist_info(tmp_path, "dep")
+    environment = Environment(
+        path=[str(tmp_path)], markers={"sys_platform": sys_platform}
+    )
+    root_dist = find_distribution("root-dist", environment)
+
+    assert len(list(required_dists(root_dist, None, environment))) == expected
+
+
+def test_requirements_parsed_once_per_string():
+    raw_requirement = "parsed-once-requirement"
+    requirement_dist = InMemoryDistribution({"METADATA": [f"name: {raw_requirement}"]})
+    root_dist = InMemoryDistribution({"requires.txt": [raw_requirement]})
+
+    with (
+        mock.patch(
+            "unused_deps.dist_info.importlib.metadata.Distribution.from_name",
+            return_value=requirement_dist,
+        ),
+        mock.patch(
+            "unused_deps.dist_info.Requirement", wraps=Requirement
+        ) as requirement_cls,
+    ):
+        assert parse_requirement(raw_requirement, []) == requirement_dist
+        assert parse_requirement(raw_requirement, []) == requirement_dist
+        assert list(required_dists(root_dist, None)) == [requirement_dist]
+
+    requirement_cls.assert_called_once_with(raw_requirement)
+
+
+def test_markers_evaluated_once_per_environment():
+    raw_requirement = "evaluated-once; extra == 'evaluated-once'"
+    requirement_dist = InMemoryDistribution({"METADATA": ["name: evaluated-once"]})
+
+    with (
+        mock.patch(
+            "unused_deps.dist_info.importlib.metadata.Distribution.from_name",
+            return_value=requirement_dist,
+        ),
+        mock.patch.object(Marker, "evaluate", autospec=True) as evaluate,
+    ):
+        evaluate.return_value = True
+        for _ in range(2):
+            parse_requirement(raw_requirement, ["evaluated-once"])
+            parse_requirement(
+                raw_requirement,
+                ["evaluated-once"],
+                Environment(markers={"sys_platform": "win32"}),
+            )
+
+    assert [call.args[1] for call in evaluate.call_args_list] == [
+        {"extra": "evaluated-once"},
+        {"sys_platform": "win32", "extra": "evaluated-once"},
+    ]
+
+
+def test_clear_caches():
+    requirement_dist = InMemoryDistribution({"METADATA": ["name: cleared"]})
+    with mock.patch(
+        "unused_deps.dist_info.importlib.metadata.Distribution.from_name",
+        return_value=requirement_dist,
+    ):
+        parse_requirement("cleared; extra == 'cleared'", ["cleared"])
+
+    clear_caches()
+
+    assert cache_stats() == {"requirements": (0, 0), "markers": (0, 0)}
+
+
+def test_module_distributions(tmp_path):
+    first_dir = tmp_path / "first"
+    second_dir = tmp_path / "second"
+    write_dist_info(first_dir, "dist-a", top_level=["a", "_a"])
+    write_dist_info(first_dir, "namespace-b", top_level=["namespace"])
+    write_dist_info(first_dir, "namespace-c", top_level=["namespace"])
+    # shadowed by the one in `first_dir`
+    write_dist_info(second_dir, "dist-a", top_level=["old_a"])
+    # no METADATA
+    (second_dir / "broken-1.0.dist-info").mkdir()
+    environment = Environment(path=[str(first_dir), str(second_dir)])
+
+    got = module_distributions(environment)
+
+    assert got == {
+        "a": ("dist-a",),
+        "_a": ("dist-a",),
+        "namespace": ("namespace-b", "namespace-c"),
+    }
+
+
+def test_module_distributions_from_current_environment():
+    assert module_distributions()["packaging"] == ("packaging",)
+
+
+def test_dependency_requirements(caplog):
+    dist = InMemoryDistribution(
+        {
+            "METADATA": [
+                "Name: some-dist",
+                "Requires-Dist: always[fast]",
+                "Requires-Dist: in-test; extra == 'test'",
+                "Requires-Dist: either; extra == 'a' or extra == \"b\"",
+                "Requires-Dist: linux; extra == 'test' or sys_platform == 'linux'",
+                "Requires-Dist: win; extra == 'test' and sys_platform == 'win32'",
+                "Requires-Dist: not a requirement!",
+            ]
+        }
+    )
+    environment = Environment(markers={"sys_platform": "linux"})
+    caplog.set_level(logging.DEBUG)
+
+    got = list(dependency_requirements(dist, environment))
+
+    assert got == [
+        ("", "always", frozenset({"fast"})),
+        ("test", "in-test", frozenset()),
+        ("a", "either", frozenset()),
+        ("b", "either", frozenset()),
+        ("", "linux", frozenset()),
+    ]
+    assert "Skipping requirement not a requirement!" in caplog.text
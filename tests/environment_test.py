@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+from unittest import mock
+
+import pytest
+
+from unused_deps.environment import Environment, load_environment
+from unused_deps.errors import InternalError
+
+
+def test_load_environment_defaults_to_current_interpreter():
+    assert load_environment(None, None) == Environment()
+
+
+def test_load_environment_from_site_packages(tmp_path):
+    site_dirs = [str(tmp_path / "site-1"), str(tmp_path / "site-2")]
+    for site_dir in site_dirs:
+        (tmp_path / site_dir).mkdir()
+
+    assert load_environment(site_dirs, None) == Environment(path=site_dirs)
+
+
+def test_load_environment_raises_on_missing_site_packages(tmp_path):
+    site_dir = str(tmp_path / "missing")
+
+    with pytest.raises(InternalError) as exc:
+        load_environment([site_dir], None)
+
+    assert (
+        str(exc.value)
+        == f"Can't read site-packages '{site_dir}': directory doesn't exist"
+    )
+
+
+def test_load_environment_from_interpreter():
+    environment = load_environment(None, sys.executable)
+
+    assert environment.path is not None
+    assert os.path.dirname(os.__file__) in environment.path
+    assert environment.markers is not None
+    assert environment.markers["sys_platform"] == sys.platform
+    assert environment.markers["python_version"] == "{}.{}".format(
+        *sys.version_info[:2]
+    )
+
+
+def test_load_environment_site_packages_searched_before_interpreter(tmp_path):
+    environment = load_environment([str(tmp_path)], sys.executable)
+
+    assert environment.path is not None
+    assert environment.path[0] == str(tmp_path)
+
+
+def test_load_environment_raises_on_missing_interpreter(tmp_path):
+    python = str(tmp_path / "python")
+
+    with pytest.raises(InternalError) as exc:
+        load_environment(None, python)
+
+    assert str(exc.value).startswith(f"Failed to run interpreter '{python}':")
+
+
+def test_load_environment_raises_on_failing_interpreter():
+    python = "some-python"
+    failed = subprocess.CompletedProcess(
+        args=(), returncode=1, stdout="", stderr="it broke\n"
+    )
+
+    with (
+        mock.patch("subprocess.run", return_value=failed),
+        pytest.raises(InternalError) as exc,
+    ):
+        load_environment(None, python)
+
+    assert str(exc.value) == f"Failed to query interpreter '{python}': it broke"
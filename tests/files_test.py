@@ -1,9 +1,16 @@
 import logging
 import os
+from unittest import mock
 
 import pytest
 
-from unused_deps.files import find_files
+from unused_deps.errors import InternalError
+from unused_deps.files import (
+    filter_files,
+    find_files,
+    read_file_list,
+    write_file_atomic,
+)
 
 
 def _normalize_path(path):
@@ -84,11 +91,12 @@ def test_find_files_includes_bare_filename(tmpdir):
         ),
     ),
 )
-def test_find_files(tmpdir, paths, include, exclude, expected):
+@pytest.mark.parametrize("threads", (None, 4))
+def test_find_files(tmpdir, paths, include, exclude, expected, threads):
     for path in paths:
         tmpdir.join(path).ensure()
 
-    got = tuple(find_files(tmpdir, exclude=exclude, include=include))
+    got = tuple(find_files(tmpdir, exclude=exclude, include=include, threads=threads))
 
     assert got == tuple(str(tmpdir.join(path)) for path in expected)
 
@@ -125,3 +133,289 @@ def test_find_files_logs_on_excluded_file(tmpdir, caplog):
             f"Excluding file: {os.path.join(tmpdir, filename)}",
         )
     ]
+
+
+def test_find_files_parallel_walk_order_matches_sequential(tmp_path):
+    for top in range(4):
+        for sub in range(4):
+            directory = tmp_path / f"dir{top}" / f"sub{sub}" / "nested"
+            directory.mkdir(parents=True)
+            (directory / "file.py").touch()
+            (directory.parent / f"file{sub}.py").touch()
+        (tmp_path / f"file{top}.py").touch()
+
+    sequential = list(find_files(str(tmp_path), exclude=(), include=("*.py",)))
+    parallel = list(find_files(str(tmp_path), exclude=(), include=("*.py",), threads=3))
+
+    assert len(sequential) == 4 + 4 * 4 * 2
+    assert parallel == sequential
+
+
+def test_find_files_skips_unlistable_directory(tmp_path):
+    (tmp_path / "readable").mkdir()
+    (tmp_path / "readable" / "file.py").touch()
+    (tmp_path / "unreadable").mkdir()
+    (tmp_path / "unreadable" / "file.py").touch()
+    scandir = os.scandir
+
+    def fake_scandir(path):
+        if os.path.basename(path) == "unreadable":
+            raise PermissionError(path)
+        return scandir(path)
+
+    with mock.patch("unused_deps.files.os.scandir", side_effect=fake_scandir):
+        got = list(find_files(str(tmp_path), exclude=(), include=("*.py",)))
+
+    assert got == [os.path.join(tmp_path, "readable", "file.py")]
+
+
+def test_find_files_shares_seen_between_overlapping_paths(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "file.py").touch()
+    (tmp_path / "other.py").touch()
+    seen: set[tuple[int, int]] = set()
+
+    got = [
+        filename
+        for path in (tmp_path, tmp_path / "src", tmp_path / "src" / "file.py")
+        for filename in find_files(str(path), exclude=(), include=("*.py",), seen=seen)
+    ]
+
+    assert sorted(got) == [
+        str(tmp_path / "other.py"),
+        str(tmp_path / "src" / "file.py"),
+    ]
+
+
+def test_find_files_skips_already_scanned_directory(tmp_path, caplog):
+    seen: set[tuple[int, int]] = set()
+    list(find_files(str(tmp_path), exclude=(), include=(), seen=seen))
+
+    with caplog.at_level(logging.DEBUG):
+        got = list(find_files(str(tmp_path), exclude=(), include=(), seen=seen))
+
+    assert got == []
+    assert caplog.record_tuples == [
+        (
+            "unused-deps",
+            logging.DEBUG,
+            f"Skipping already scanned directory: {tmp_path}",
+        )
+    ]
+
+
+def test_find_files_symlinked_file_found_once(tmp_path):
+    (tmp_path / "file.py").touch()
+    os.symlink(tmp_path / "file.py", tmp_path / "link.py")
+
+    got = list(find_files(str(tmp_path), exclude=(), include=("*.py",)))
+
+    assert len(got) == 1
+
+
+def test_find_files_skips_already_scanned_sub_directory(tmp_path, caplog):
+    (tmp_path / "src").mkdir()
+    seen: set[tuple[int, int]] = set()
+    list(find_files(str(tmp_path / "src"), exclude=(), include=(), seen=seen))
+
+    with caplog.at_level(logging.DEBUG):
+        list(find_files(str(tmp_path), exclude=(), include=(), seen=seen))
+
+    assert caplog.record_tuples == [
+        (
+            "unused-deps",
+            logging.DEBUG,
+            f"Skipping already scanned directory: {tmp_path / 'src'}",
+        )
+    ]
+
+
+def test_find_files_doesnt_follow_symlinked_directory(tmp_path):
+    (tmp_path / "target").mkdir()
+    (tmp_path / "target" / "file.py").touch()
+    (tmp_path / "scanned").mkdir()
+    (tmp_path / "scanned" / "scanned.py").touch()
+    os.symlink(
+        tmp_path / "target", tmp_path / "scanned" / "link", target_is_directory=True
+    )
+    # not yielded as a file either
+    os.symlink(
+        tmp_path / "target", tmp_path / "scanned" / "link.py", target_is_directory=True
+    )
+
+    got = list(find_files(str(tmp_path / "scanned"), exclude=(), include=("*.py",)))
+
+    assert got == [os.path.join(tmp_path, "scanned", "scanned.py")]
+
+
+def test_find_files_doesnt_follow_symlink_cycle(tmp_path, caplog):
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "file.py").touch()
+    os.symlink(tmp_path, tmp_path / "dir" / "loop", target_is_directory=True)
+
+    with caplog.at_level(logging.DEBUG):
+        got = list(find_files(str(tmp_path), exclude=(), include=("*.py",)))
+
+    assert got == [os.path.join(tmp_path, "dir", "file.py")]
+    assert caplog.record_tuples == []
+
+
+def test_find_files_yields_dangling_symlink(tmp_path):
+    os.symlink(tmp_path / "missing.py", tmp_path / "dangling.py")
+
+    got = list(find_files(str(tmp_path), exclude=(), include=("*.py",)))
+
+    assert got == [os.path.join(tmp_path, "dangling.py")]
+
+
+@pytest.mark.parametrize(
+    ("contents", "expected"),
+    (
+        pytest.param(b"a.py\0b c.py\0", ["a.py", "b c.py"], id="NUL separated"),
+        pytest.param(b"a.py\nb.py", ["a.py", "b.py"], id="Newline separated"),
+        pytest.param(b"a.py\r\nb.py\r\n", ["a.py", "b.py"], id="CRLF separated"),
+        pytest.param(b"a.py\n\nb.py\n", ["a.py", "b.py"], id="Empty lines"),
+        pytest.param(b"a.py", ["a.py"], id="Single path"),
+        pytest.param(b"", [], id="Empty"),
+    ),
+)
+def test_read_file_list(tmp_path, contents, expected):
+    file_list = tmp_path / "files"
+    file_list.write_bytes(contents)
+
+    # small enough that paths are split across chunks
+    with mock.patch("unused_deps.files._FILE_LIST_CHUNK_SIZE", 3):
+        assert list(read_file_list(str(file_list))) == expected
+
+
+def test_read_file_list_from_stdin():
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(read_fd, "rb") as read_file:
+        with mock.patch("unused_deps.files.sys.stdin") as stdin:
+            stdin.buffer = read_file
+            paths = read_file_list("-")
+
+            os.write(write_fd, b"first.py\0sec")
+            # available before the rest of the list is written
+            assert next(paths) == "first.py"
+
+            os.write(write_fd, b"ond.py\0")
+            os.close(write_fd)
+            assert list(paths) == ["second.py"]
+
+
+def test_read_file_list_missing_file(tmp_path):
+    path = tmp_path / "missing"
+
+    with pytest.raises(InternalError) as e:
+        list(read_file_list(str(path)))
+
+    assert str(e.value).startswith(f"Can't read file list '{path}': ")
+
+
+def test_filter_files(tmp_path, monkeypatch, caplog):
+    for path in ("src/a.py", "src/a.txt", "src/__pycache__/a.py", "venv/lib/b.py"):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).touch()
+    monkeypatch.chdir(tmp_path)
+    paths = [
+        _normalize_path("src/a.py"),
+        _normalize_path("src/a.txt"),
+        _normalize_path("src/__pycache__/a.py"),
+        _normalize_path("venv/lib/b.py"),
+        _normalize_path("src/missing.py"),
+        _normalize_path("src/./a.py"),
+    ]
+
+    with caplog.at_level(logging.DEBUG):
+        got = list(
+            filter_files(paths, exclude=("__pycache__", "venv"), include=("*.py",))
+        )
+
+    assert got == [_normalize_path("src/a.py")]
+    assert caplog.record_tuples == [
+        (
+            "unused-deps",
+            logging.DEBUG,
+            f"Excluding file: {_normalize_path('src/__pycache__/a.py')}",
+        ),
+        (
+            "unused-deps",
+            logging.DEBUG,
+            f"Excluding file: {_normalize_path('venv/lib/b.py')}",
+        ),
+        (
+            "unused-deps",
+            logging.WARNING,
+            f"Skipping '{_normalize_path('src/missing.py')}': not a file",
+        ),
+    ]
+
+
+def test_filter_files_absolute_paths(tmp_path, monkeypatch):
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "a.py").touch()
+    (tmp_path / "b.py").touch()
+    monkeypatch.chdir(tmp_path)
+    paths = [str(tmp_path / "build" / "a.py"), str(tmp_path / "b.py")]
+
+    got = list(filter_files(paths, exclude=("build",), include=("*.py",)))
+
+    assert got == [str(tmp_path / "b.py")]
+
+
+def test_filter_files_ignores_directories_above_the_current_one(tmp_path, monkeypatch):
+    project = tmp_path / "venv" / "project"
+    (project / "src").mkdir(parents=True)
+    (project / "src" / "a.py").touch()
+    (tmp_path / "venv" / "b.py").touch()
+    monkeypatch.chdir(project)
+    paths = [
+        str(project / "src" / "a.py"),
+        _normalize_path("src/a.py"),
+        str(tmp_path / "venv" / "b.py"),
+    ]
+
+    got = list(filter_files(paths, exclude=("venv",), include=("*.py",)))
+
+    # like `find_files`, which would find the same files walking the project
+    assert got == [str(project / "src" / "a.py"), str(tmp_path / "venv" / "b.py")]
+
+
+def test_write_file_atomic(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("original")
+
+    write_file_atomic(str(path), "updated")
+
+    assert path.read_text() == "updated"
+    assert os.listdir(tmp_path) == ["file.txt"]
+
+
+def test_write_file_atomic_applies_umask(tmp_path):
+    path = tmp_path / "file.txt"
+
+    with (
+        mock.patch("unused_deps.files._umask", return_value=0o022),
+        mock.patch("unused_deps.files.os.chmod", wraps=os.chmod) as chmod,
+    ):
+        write_file_atomic(str(path), "contents")
+
+    ((_, mode),) = (call.args for call in chmod.call_args_list)
+    assert mode == 0o644
+    # readable by anyone, not only the owner as `mkstemp` creates it
+    assert path.stat().st_mode & 0o444 == 0o444
+
+
+def test_write_file_atomic_leaves_original_on_failure(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("original")
+
+    with (
+        mock.patch("unused_deps.files.os.replace", side_effect=OSError("boom")),
+        pytest.raises(OSError),
+    ):
+        write_file_atomic(str(path), "updated")
+
+    assert path.read_text() == "original"
+    assert os.listdir(tmp_path) == ["file.txt"]
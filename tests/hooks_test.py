@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import sys
+import time
+
+import pytest
+
+from tests.utils import InMemoryDistribution, write_dist_info
+from unused_deps.dist_info import parse_requirement, required_dists
+from unused_deps.environment import Environment
+from unused_deps.errors import InternalError
+from unused_deps.files import filter_files, find_files
+from unused_deps.hooks import HOOKS, Hooks, load_entry_points
+from unused_deps.main import main
+
+
+@pytest.fixture
+def events():
+    events = []
+    handlers = {
+        event: lambda *args, event=event: events.append((event, *args))
+        for event in (
+            "file_discovered",
+            "file_excluded",
+            "file_parsed",
+            "distribution_resolved",
+            "requirement_skipped",
+        )
+    }
+    for event, handler in handlers.items():
+        HOOKS.register(event, handler)
+    yield events
+    for event, handler in handlers.items():
+        HOOKS.unregister(event, handler)
+
+
+def test_events_disabled_without_handlers():
+    hooks = Hooks()
+
+    assert hooks.file_discovered is None
+    assert hooks.file_parsed is None
+
+
+def test_register_and_unregister():
+    hooks = Hooks()
+    calls = []
+
+    def first(path):
+        calls.append(("first", path))
+
+    def second(path):
+        calls.append(("second", path))
+
+    hooks.register("file_discovered", first)
+    assert hooks.file_discovered is first
+
+    hooks.register("file_discovered", second)
+    hooks.file_discovered("a.py")
+    assert calls == [("first", "a.py"), ("second", "a.py")]
+
+    hooks.unregister("file_discovered", first)
+    assert hooks.file_discovered is second
+
+    hooks.unregister("file_discovered", second)
+    assert hooks.file_discovered is None
+
+
+@pytest.mark.parametrize("event", ("not_an_event", "_handlers"))
+def test_register_unknown_event(event):
+    with pytest.raises(ValueError, match=f"Unknown hook event: {event}"):
+        Hooks().register(event, print)
+
+
+def test_file_events(tmp_path, events):
+    (tmp_path / "used.py").touch()
+    (tmp_path / "excluded.py").touch()
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "generated.py").touch()
+
+    list(
+        find_files(
+            str(tmp_path),
+            exclude=("build", "excluded.py"),
+            include=("*.py",),
+        )
+    )
+
+    assert sorted(events) == [
+        ("file_discovered", str(tmp_path / "used.py")),
+        ("file_excluded", str(tmp_path / "build")),
+        ("file_excluded", str(tmp_path / "excluded.py")),
+    ]
+
+
+def test_file_events_for_listed_files(tmp_path, events):
+    (tmp_path / "used.py").touch()
+    (tmp_path / "excluded.py").touch()
+
+    list(
+        filter_files(
+            [str(tmp_path / "used.py"), str(tmp_path / "excluded.py")],
+            exclude=("excluded.py",),
+            include=("*.py",),
+        )
+    )
+
+    assert events == [
+        ("file_discovered", str(tmp_path / "used.py")),
+        ("file_excluded", str(tmp_path / "excluded.py")),
+    ]
+
+
+def test_distribution_events(tmp_path, events):
+    write_dist_info(tmp_path, "dep")
+    write_dist_info(tmp_path, "dep-win")
+    environment = Environment(path=[str(tmp_path)], markers={"sys_platform": "linux"})
+    root_dist = InMemoryDistribution(
+        {"requires.txt": ["dep", "missing-dep", "dep-win; sys_platform == 'win32'"]}
+    )
+
+    (dep,) = required_dists(root_dist, None, environment)
+
+    assert events == [
+        ("distribution_resolved", "dep", dep),
+        ("requirement_skipped", "missing-dep", "not installed"),
+        ("requirement_skipped", "dep-win", "not valid for the environment"),
+    ]
+
+
+def test_invalid_requirement_event(events):
+    parse_requirement("-r other-requirements.txt", [])
+    parse_requirement("", [])
+
+    ((event, requirement, reason),) = events
+    assert (event, requirement) == ("requirement_skipped", "-r other-requirements.txt")
+    assert reason.startswith("invalid requirement: ")
+
+
+def test_file_parsed_event(capsys, tmp_path, monkeypatch, events):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "source.py").write_text("import os\nimport sys\n")
+    write_dist_info(tmp_path / "site", "root-dist")
+
+    main(
+        [
+            "--distribution",
+            "root-dist",
+            "--site-packages",
+            str(tmp_path / "site"),
+            "--include",
+            "*.py",
+            ".",
+        ]
+    )
+
+    ((path, duration, import_count),) = (
+        event[1:] for event in events if event[0] == "file_parsed"
+    )
+    assert path.endswith("source.py")
+    assert duration >= 0
+    assert import_count == 2
+
+
+def test_file_parsed_event_not_sent_for_indexed_files(
+    capsys, tmp_path, monkeypatch, events
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "source.py").write_text("import os\n")
+    argv = ["--no-distribution", "--index-file", "index.db", "source.py"]
+    # as if the file was indexed a while after it was last modified
+    after_writes = time.time_ns() + 60_000_000_000
+    monkeypatch.setattr("unused_deps.index.time.time_ns", lambda: after_writes)
+    main(argv)
+    events.clear()
+
+    main(argv)
+
+    assert [event for event in events if event[0] == "file_parsed"] == []
+
+
+def test_timing_events(capsys, tmp_path, monkeypatch):
+    events = []
+    handlers = {
+        event: lambda *args, event=event: events.append((event, *args))
+        for event in ("stage", "directory_listed", "distribution_lookup")
+    }
+    for event, handler in handlers.items():
+        HOOKS.register(event, handler)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "source.py").write_text("import os\n")
+    write_dist_info(tmp_path / "site", "root-dist", requires=["missing-dep"])
+
+    try:
+        main(
+            [
+                "--distribution",
+                "root-dist",
+                "--site-packages",
+                str(tmp_path / "site"),
+                "src",
+            ]
+        )
+    finally:
+        for event, handler in handlers.items():
+            HOOKS.unregister(event, handler)
+
+    assert {event[:2] for event in events} >= {
+        ("stage", "parse"),
+        ("stage", "resolve"),
+        ("distribution_lookup", "root-dist"),
+        ("distribution_lookup", "missing-dep"),
+    }
+    ((path, duration, entries),) = (
+        event[1:] for event in events if event[0] == "directory_listed"
+    )
+    assert (path, entries) == ("src", 1)
+    assert duration >= 0
+
+
+@pytest.fixture
+def plugin_dist_info(tmp_path, monkeypatch):
+    monkeypatch.setattr("unused_deps.hooks._entry_points_loaded", False)
+    (tmp_path / "hooks_plugin.py").write_text(
+        "calls = []\n"
+        "def handler(path):\n"
+        "    calls.append(path)\n"
+        "def setup(hooks):\n"
+        "    hooks.register('file_discovered', handler)\n"
+    )
+    dist_info = write_dist_info(tmp_path, "hooks-plugin")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield dist_info
+    sys.modules.pop("hooks_plugin", None)
+
+
+def test_load_entry_points(plugin_dist_info):
+    (plugin_dist_info / "entry_points.txt").write_text(
+        "[py_unused_deps.hooks]\nplugin = hooks_plugin:setup\n"
+    )
+
+    load_entry_points()
+    # only loaded once
+    load_entry_points()
+
+    import hooks_plugin  # type: ignore[import-not-found]
+
+    try:
+        assert HOOKS.file_discovered is not None
+        HOOKS.file_discovered("a.py")
+    finally:
+        HOOKS.unregister("file_discovered", hooks_plugin.handler)
+    assert hooks_plugin.calls == ["a.py"]
+
+
+def test_load_entry_points_failure(plugin_dist_info):
+    (plugin_dist_info / "entry_points.txt").write_text(
+        "[py_unused_deps.hooks]\nplugin = hooks_plugin:missing\n"
+    )
+
+    with pytest.raises(
+        InternalError, match="Failed to load hooks from 'hooks_plugin:missing'"
+    ):
+        load_entry_points()
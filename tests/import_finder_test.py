@@ -1,9 +1,14 @@
+import json
 import logging
 from textwrap import dedent
 
 import pytest
 
-from unused_deps.import_finder import get_import_bases
+from unused_deps.import_finder import (
+    get_import_bases,
+    get_imports,
+    get_module_level_imports,
+)
 
 
 class TestGetImportBases:
@@ -63,3 +68,146 @@ class TestGetImportBases:
         assert caplog.record_tuples == [
             ("unused-deps", logging.DEBUG, f"Reading imports from: {file}")
         ]
+
+
+class TestGetImports:
+    def test_includes_full_module_and_line(self, tmpdir):
+        code = dedent(
+            """\
+            import foo.bar
+
+            from foo import bar
+            from .relative import foo
+            if True:
+                from something.else_ import function
+            """
+        )
+        file = tmpdir.join("file.py").ensure()
+        file.write(code)
+
+        assert list(get_imports(file)) == [
+            (1, "foo.bar"),
+            (3, "foo"),
+            (6, "something.else_"),
+        ]
+
+    def test_notebook(self, tmp_path, caplog):
+        file = tmp_path / "notebook.ipynb"
+        cells = [
+            ["import foo\n", "import bar.buz"],
+            ["%matplotlib inline\n", "obj?"],
+            ["x = 1\n", "\n", "from .relative import a\n", "from other import b\n"],
+        ]
+        file.write_text(
+            json.dumps(
+                {
+                    "cells": [
+                        {"cell_type": "code", "outputs": [], "source": source}
+                        for source in cells
+                    ]
+                }
+            )
+        )
+
+        with caplog.at_level(logging.INFO):
+            got = list(get_imports(str(file)))
+
+        assert got == [(1, "foo"), (2, "bar.buz"), (8, "other")]
+        assert caplog.messages[0].startswith(f"Skipping code cell in {file}: ")
+
+    def test_notebook_module_level_only(self, tmp_path):
+        file = tmp_path / "notebook.ipynb"
+        file.write_text(
+            json.dumps(
+                {"cells": [{"cell_type": "code", "source": "x = 1\nimport foo\n"}]}
+            )
+        )
+
+        assert list(get_import_bases(str(file), module_level_only=True)) == ["foo"]
+
+
+class TestGetModuleLevelImports:
+    @pytest.mark.parametrize(
+        ("code", "expected"),
+        (
+            pytest.param(
+                '''\
+                #!/usr/bin/env python
+                """Docstring."""
+                from __future__ import annotations
+
+                import foo  # comment
+                from bar import (
+                    a,
+                    b,
+                )
+
+                import later
+                ''',
+                [(3, "__future__"), (5, "foo"), (6, "bar"), (11, "later")],
+                id="only imports",
+            ),
+            pytest.param(
+                """\
+                import foo
+                X = 1
+                import bar
+                def function():
+                    import buz
+                """,
+                [(1, "foo")],
+                id="stops at first other statement",
+            ),
+            pytest.param(
+                """\
+                import foo; x = 1; import bar
+                """,
+                [(1, "foo")],
+                id="stops within a line",
+            ),
+            pytest.param(
+                """\
+                import foo
+                if TYPE_CHECKING:
+                    import bar
+                """,
+                [(1, "foo")],
+                id="stops at compound statement",
+            ),
+            pytest.param(
+                """\
+                @decorator
+                def function():
+                    import foo
+                """,
+                [],
+                id="nothing before first statement",
+            ),
+            pytest.param("", [], id="empty"),
+        ),
+    )
+    def test_get_module_level_imports(self, code, expected, tmpdir):
+        file = tmpdir.join("file.py")
+        file.write(dedent(code))
+
+        assert list(get_module_level_imports(file)) == expected
+
+    def test_stops_reading_at_first_statement(self, tmp_path):
+        file = tmp_path / "file.py"
+        # the end of the file can't be decoded, but it's never read
+        file.write_bytes(b"import foo\nx = 1\n" + b"#\n" * 100_000 + b"\xff\n")
+
+        assert list(get_module_level_imports(file)) == [(1, "foo")]
+
+    def test_falls_back_to_full_parse_on_tokenize_error(self, tmp_path):
+        file = tmp_path / "file.py"
+        file.write_text("import foo\nfrom bar import (\n")
+
+        with pytest.raises(SyntaxError):
+            list(get_module_level_imports(file))
+
+    def test_get_import_bases_module_level_only(self, tmpdir):
+        file = tmpdir.join("file.py")
+        file.write("import foo.bar\nx = 1\nimport buz\n")
+
+        assert list(get_import_bases(file, module_level_only=True)) == ["foo"]
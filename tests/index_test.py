@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import time
+from unittest import mock
+
+import pytest
+
+from unused_deps.config import Config
+from unused_deps.errors import InternalError
+from unused_deps.import_finder import get_imports
+from unused_deps.index import open_index, run_query
+
+# so nothing written by the tests is considered to have been modified too recently
+# to be trusted
+_AFTER_WRITES = time.time_ns() + 60_000_000_000
+
+
+@pytest.fixture(autouse=True)
+def _after_writes():
+    with mock.patch("unused_deps.index.time.time_ns", return_value=_AFTER_WRITES):
+        yield
+
+
+def _config(index_file, **kwargs):
+    return Config(
+        filepaths=[], include=[], exclude=[], index_file=str(index_file), **kwargs
+    )
+
+
+def test_file_imports_read_once(tmp_path):
+    source = tmp_path / "source.py"
+    source.write_text("import os\nfrom foo.bar import baz\n")
+
+    with open_index(str(tmp_path / "index.db")) as index:
+        first = index.file_imports(str(source))
+    with (
+        open_index(str(tmp_path / "index.db")) as index,
+        mock.patch("unused_deps.index.get_imports") as imports,
+    ):
+        second = index.file_imports(str(source))
+
+    imports.assert_not_called()
+    assert first == ([(1, "os"), (2, "foo.bar")], True)
+    assert second == ([(1, "os"), (2, "foo.bar")], False)
+
+
+def test_file_imports_read_again_after_modification(tmp_path):
+    source = tmp_path / "source.py"
+    source.write_text("import os\n")
+
+    with open_index(str(tmp_path / "index.db")) as index:
+        index.file_imports(str(source))
+        source.write_text("import sys\n")
+
+        assert index.file_imports(str(source)) == ([(1, "sys")], True)
+
+
+def test_recently_modified_file_read_again(tmp_path):
+    source = tmp_path / "source.py"
+    source.write_text("import os\n")
+
+    modified_at = max(source.stat().st_mtime_ns, source.stat().st_ctime_ns)
+
+    with (
+        mock.patch("unused_deps.index.time.time_ns", return_value=modified_at),
+        open_index(str(tmp_path / "index.db")) as index,
+    ):
+        index.file_imports(str(source))
+
+        assert index.file_imports(str(source)) == ([(1, "os")], True)
+
+
+def test_refresh(tmp_path):
+    modified = tmp_path / "modified.py"
+    modified.write_text("import os\n")
+    deleted = tmp_path / "deleted.py"
+    deleted.write_text("import os\n")
+    unchanged = tmp_path / "unchanged.py"
+    unchanged.write_text("import os\n")
+
+    with open_index(str(tmp_path / "index.db")) as index:
+        for source in (modified, deleted, unchanged):
+            index.file_imports(str(source))
+        modified.write_text("\n\nimport os\n")
+        deleted.unlink()
+
+        with mock.patch("unused_deps.index.get_imports", wraps=get_imports) as imports:
+            index.refresh()
+
+        imports.assert_called_once_with(str(modified))
+        assert index.who_imports("os") == [
+            (str(modified), 3, "os"),
+            (str(unchanged), 1, "os"),
+        ]
+
+
+def test_refresh_removes_unparsable_files(tmp_path, caplog):
+    invalid = tmp_path / "invalid.py"
+    invalid.write_text("import os\n")
+    valid = tmp_path / "valid.py"
+    valid.write_text("import os\n")
+
+    with open_index(str(tmp_path / "index.db")) as index:
+        for source in (invalid, valid):
+            index.file_imports(str(source))
+        invalid.write_text("import os\nimport\n")
+
+        index.refresh()
+
+        assert index.who_imports("os") == [(str(valid), 1, "os")]
+    assert f"Removing from index, can't parse {invalid}: " in caplog.text
+
+
+def test_who_imports_includes_submodules(tmp_path):
+    source = tmp_path / "source.py"
+    source.write_text(
+        "import foo\nimport foo.bar\nimport foo_bar\nimport foobar\nimport foo.barbaz\n"
+    )
+
+    with open_index(str(tmp_path / "index.db")) as index:
+        index.file_imports(str(source))
+
+        assert index.who_imports("foo") == [
+            (str(source), 1, "foo"),
+            (str(source), 2, "foo.bar"),
+            (str(source), 5, "foo.barbaz"),
+        ]
+        assert index.who_imports("foo.bar") == [(str(source), 2, "foo.bar")]
+
+
+def test_index_with_old_schema_recreated(tmp_path):
+    index_file = tmp_path / "index.db"
+    connection = sqlite3.connect(index_file)
+    connection.execute("CREATE TABLE files (path TEXT)")
+    connection.close()
+    source = tmp_path / "source.py"
+    source.write_text("import os\n")
+
+    with open_index(str(index_file)) as index:
+        assert index.file_imports(str(source)) == ([(1, "os")], True)
+
+
+def test_open_index_fails_on_unopenable_file(tmp_path):
+    path = tmp_path / "missing" / "index.db"
+
+    with pytest.raises(InternalError) as e:
+        with open_index(str(path)):
+            pass  # pragma: no cover
+
+    assert str(e.value).startswith(f"Can't open import index '{path}': ")
+
+
+def test_open_index_fails_on_invalid_file(tmp_path):
+    path = tmp_path / "index.db"
+    path.write_text("not a database" * 100)
+
+    with pytest.raises(InternalError) as e:
+        with open_index(str(path)):
+            pass  # pragma: no cover
+
+    assert str(e.value) == (
+        f"Failed to use import index '{path}': file is not a database"
+    )
+
+
+def test_run_query(tmp_path, capsys):
+    index_file = tmp_path / "index.db"
+    first = tmp_path / "first.py"
+    first.write_text("import foo\n")
+    second = tmp_path / "second.py"
+    second.write_text("import os\n\nimport foo.bar\n")
+    with open_index(str(index_file)) as index:
+        index.file_imports(str(first))
+
+    config = _config(index_file, who_imports=["foo"], imports_in=[str(second)])
+
+    assert run_query(config) == 0
+    assert capsys.readouterr().out == (
+        f"{first}:1: foo\n{second}:1: os\n{second}:3: foo.bar\n"
+    )
+    # files only read to answer a query are also indexed
+    assert run_query(_config(index_file, who_imports=["foo"])) == 0
+    assert capsys.readouterr().out == f"{first}:1: foo\n{second}:3: foo.bar\n"
+
+
+def test_run_query_without_results(tmp_path, capsys):
+    assert run_query(_config(tmp_path / "index.db", who_imports=["foo"])) == 1
+    assert capsys.readouterr().out == ""
+
+
+def test_run_query_on_missing_file(tmp_path):
+    path = tmp_path / "missing.py"
+
+    with pytest.raises(InternalError) as e:
+        run_query(_config(tmp_path / "index.db", imports_in=[str(path)]))
+
+    assert str(e.value).startswith(f"Can't read '{path}': ")
+
+
+def test_index_paths_are_absolute(tmp_path, monkeypatch):
+    (tmp_path / "source.py").write_text("import os\n")
+    monkeypatch.chdir(tmp_path)
+
+    with open_index("index.db") as index:
+        index.file_imports("source.py")
+
+        assert index.who_imports("os") == [
+            (os.path.join(os.getcwd(), "source.py"), 1, "os")
+        ]
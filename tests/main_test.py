@@ -1,14 +1,44 @@
 from __future__ import annotations
 
+import ast
+import json
 import logging
+import os
+import subprocess
+import sys
+import threading
+import time
 from unittest import mock
 
 import pytest
 
-from tests.utils import InMemoryDistribution
+from tests.utils import InMemoryDistribution, write_dist_info
+from unused_deps import run as run_module
+from unused_deps.errors import InternalError
+from unused_deps.import_finder import get_import_bases
 from unused_deps.main import main
 
 
+class _Clock:
+    # stands in for the `time` module of unused_deps.run, so runs with a time
+    # budget only see time pass when a test says so
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(run_module, "time", clock)
+    return clock
+
+
 class TestMain:
     @pytest.mark.parametrize(
         ("args", "expected_logging_level"),
@@ -25,15 +55,21 @@ class TestMain:
         assert logger.getEffectiveLevel() == expected_logging_level
 
     @pytest.mark.parametrize(
-        "args", ([], ["--distribution", "some-dist", "--no-distribution"])
+        "args",
+        (
+            [],
+            ["--distribution", "some-dist", "--no-distribution"],
+            ["--pyproject", "pyproject.toml", "--no-distribution"],
+            ["--distribution", "some-dist", "--pyproject", "pyproject.toml"],
+        ),
     )
     def test_failure_when_no_distribution_mode_given(self, capsys, args):
         assert main(args) == 1
         captured = capsys.readouterr()
         assert captured.out == ""
-        assert (
-            captured.err
-            == "Error: You must specify exactly one of '--distribution' or '--no-distribution'\n"
+        assert captured.err == (
+            "Error: You must specify exactly one of "
+            "'--distribution', '--pyproject' or '--no-distribution'\n"
         )
 
     def test_failure_on_invalid_filepath(self, capsys):
@@ -68,7 +104,7 @@ class TestMain:
 
         with (
             caplog.at_level(logging.INFO),
-            mock.patch("unused_deps.main.importlib.metadata.Distribution", mock_dist),
+            mock.patch("unused_deps.run.importlib.metadata.Distribution", mock_dist),
             tmpdir.as_cwd(),
         ):
             returncode = main(argv)
@@ -95,11 +131,11 @@ class TestMain:
 
         with (
             mock.patch(
-                "unused_deps.main.importlib.metadata.Distribution",
+                "unused_deps.run.importlib.metadata.Distribution",
                 new=mock.Mock(**{"from_name.return_value": root_dist}),
             ),
             mock.patch(
-                "unused_deps.main.required_dists", return_value=[requirement_dist]
+                "unused_deps.run.required_dists", return_value=[requirement_dist]
             ),
             tmpdir.as_cwd(),
         ):
@@ -122,11 +158,11 @@ class TestMain:
 
         with (
             mock.patch(
-                "unused_deps.main.importlib.metadata.Distribution",
+                "unused_deps.run.importlib.metadata.Distribution",
                 new=mock.Mock(**{"from_name.return_value": root_dist}),
             ),
             mock.patch(
-                "unused_deps.main.required_dists", return_value=[requirement_dist]
+                "unused_deps.run.required_dists", return_value=[requirement_dist]
             ),
             tmpdir.as_cwd(),
         ):
@@ -145,11 +181,11 @@ class TestMain:
 
         with (
             mock.patch(
-                "unused_deps.main.importlib.metadata.Distribution",
+                "unused_deps.run.importlib.metadata.Distribution",
                 new=mock.Mock(**{"from_name.return_value": root_dist}),
             ),
             mock.patch(
-                "unused_deps.main.required_dists", return_value=[requirement_dist]
+                "unused_deps.run.required_dists", return_value=[requirement_dist]
             ),
         ):
             returncode = main(argv)
@@ -178,11 +214,11 @@ class TestMain:
 
         with (
             mock.patch(
-                "unused_deps.main.importlib.metadata.Distribution",
+                "unused_deps.run.importlib.metadata.Distribution",
                 new=mock.Mock(**{"from_name.return_value": root_dist}),
             ),
             mock.patch(
-                "unused_deps.main.required_dists", return_value=[used_dist, unused_dist]
+                "unused_deps.run.required_dists", return_value=[used_dist, unused_dist]
             ),
             tmpdir.as_cwd(),
             caplog.at_level(logging.INFO),
@@ -210,11 +246,11 @@ class TestMain:
 
         with (
             mock.patch(
-                "unused_deps.main.importlib.metadata.Distribution",
+                "unused_deps.run.importlib.metadata.Distribution",
                 new=mock.Mock(**{"from_name.return_value": root_dist}),
             ),
             mock.patch(
-                "unused_deps.main.parse_requirement", return_value=requirement_dist
+                "unused_deps.run.parse_requirement", return_value=requirement_dist
             ),
         ):
             returncode = main(argv)
@@ -223,3 +259,1310 @@ class TestMain:
         assert returncode == 1
         assert captured.out == ""
         assert captured.err == f"No usage found for: {dep_name}\n"
+
+    def test_dist_from_site_packages(self, capsys, tmp_path):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(
+            site_dir, "site-packages-root", requires=["used-dep", "unused-dep"]
+        )
+        write_dist_info(site_dir, "used-dep", top_level=["used_dep"])
+        write_dist_info(site_dir, "unused-dep", top_level=["unused_dep"])
+        py_file = tmp_path / "src" / "__init__.py"
+        py_file.parent.mkdir()
+        py_file.write_text("import used_dep\n")
+        argv = [
+            "--distribution",
+            "site-packages-root",
+            "--site-packages",
+            str(site_dir),
+            str(py_file.parent),
+        ]
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.out == ""
+        assert captured.err == "No usage found for: unused-dep\n"
+
+    def test_dependencies_from_pyproject(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        for name in ("used-dep", "unused-dep", "test-dep", "docs-dep", "old-dep"):
+            write_dist_info(site_dir, name, top_level=[name.replace("-", "_")])
+        (tmp_path / "pyproject.toml").write_text(
+            "[project]\n"
+            'name = "not-installed"\n'
+            "dependencies = [\n"
+            '  "used-dep",\n'
+            '  "unused-dep",\n'
+            """  'old-dep; python_version < "3"',\n"""
+            "]\n"
+            "[project.optional-dependencies]\n"
+            'test = ["test-dep"]\n'
+            'docs = ["docs-dep"]\n'
+        )
+        (tmp_path / "source.py").write_text("import used_dep\n")
+        argv = [
+            "--pyproject",
+            "pyproject.toml",
+            "--site-packages",
+            str(site_dir),
+            "--extra",
+            "test",
+            "--extra",
+            "missing",
+            "source.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.out == ""
+        assert captured.err == (
+            "No usage found for: unused-dep\nNo usage found for: test-dep\n"
+        )
+
+    @pytest.mark.parametrize(
+        ("contents", "expected_error"),
+        (
+            ('[tool.other]\nkey = "value"\n', "No [project] table in lib.toml"),
+            (
+                '[project]\nname = "foo"\ndynamic = ["dependencies"]\n',
+                "The dependencies in lib.toml are dynamic, "
+                "install the project and use '--distribution' instead",
+            ),
+        ),
+    )
+    def test_failure_on_unusable_pyproject(
+        self, capsys, tmp_path, monkeypatch, contents, expected_error
+    ):
+        # not named pyproject.toml, so it's not also read as configuration
+        (tmp_path / "lib.toml").write_text(contents)
+        monkeypatch.chdir(tmp_path)
+
+        assert main(["--pyproject", "lib.toml"]) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == f"Error: {expected_error}\n"
+
+    def test_failure_on_dynamic_optional_dependencies(
+        self, capsys, tmp_path, monkeypatch
+    ):
+        (tmp_path / "lib.toml").write_text(
+            '[project]\nname = "foo"\ndynamic = ["optional-dependencies"]\n'
+        )
+        monkeypatch.chdir(tmp_path)
+
+        # only needed for extras
+        assert main(["--pyproject", "lib.toml"]) == 0
+        assert main(["--pyproject", "lib.toml", "--extra", "test"]) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == (
+            "Error: The optional dependencies in lib.toml are dynamic, "
+            "install the project and use '--distribution' instead\n"
+        )
+
+    def test_failure_on_unreadable_pyproject(self, capsys, tmp_path, monkeypatch):
+        (tmp_path / "lib.toml").write_text("[project\n")
+        monkeypatch.chdir(tmp_path)
+
+        assert main(["--pyproject", "lib.toml"]) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err.startswith("Error: Failed to read TOML file: lib.toml: ")
+
+    def test_resolution_logged_after_scan(self, tmp_path, monkeypatch, caplog):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "logged-root", requires=["missing-dep", "dep"])
+        write_dist_info(site_dir, "dep", top_level=["dep"])
+        (tmp_path / "a.py").write_text("import dep\n")
+        (tmp_path / "b.py").write_text("import dep\n")
+        argv = [
+            "--distribution",
+            "logged-root",
+            "--site-packages",
+            str(site_dir),
+            "--ignore",
+            "dep",
+            "-vv",
+            "a.py",
+            "b.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        def slow_import_bases(path, **kwargs):
+            # give the distributions plenty of time to be resolved in the background
+            time.sleep(0.1)
+            return get_import_bases(path, **kwargs)
+
+        with (
+            mock.patch(
+                "unused_deps.run.get_import_bases", side_effect=slow_import_bases
+            ),
+            caplog.at_level(logging.DEBUG),
+        ):
+            assert main(argv) == 0
+
+        assert [
+            message
+            for message in caplog.messages
+            if not message.startswith("Searching for distributions")
+        ] == [
+            "Reading imports from: a.py",
+            "Reading imports from: b.py",
+            "Cannot import missing-dep, skipping",
+            "Ignoring: dep",
+        ]
+
+    def test_scan_errors_reported_before_resolution_errors(
+        self, capsys, tmp_path, monkeypatch
+    ):
+        site_dir = tmp_path / "site-packages"
+        site_dir.mkdir()
+        (tmp_path / "a.py").write_text("import dep\n")
+        argv = ["--distribution", "missing", "--site-packages", str(site_dir), "a.py"]
+        monkeypatch.chdir(tmp_path)
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases",
+            side_effect=InternalError("Failed to scan"),
+        ):
+            assert main(argv) == 1
+
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == "Error: Failed to scan\n"
+
+    def test_failure_on_invalid_site_packages(self, capsys, tmp_path):
+        site_dir = str(tmp_path / "missing")
+
+        assert main(["--no-distribution", "--site-packages", site_dir]) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert (
+            captured.err
+            == f"Error: Can't read site-packages '{site_dir}': directory doesn't exist\n"
+        )
+
+    def test_multiple_projects_share_file_scan(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "project-a", requires=["dep-a", "dep-shared"])
+        write_dist_info(site_dir, "project-b", requires=["dep-b", "dep-shared"])
+        for name in ("dep-a", "dep-b", "dep-shared"):
+            write_dist_info(site_dir, name, top_level=[name.replace("-", "_")])
+        src = tmp_path / "src"
+        (src / "a").mkdir(parents=True)
+        (src / "b").mkdir(parents=True)
+        (src / "a" / "__init__.py").write_text("import dep_a\n")
+        (src / "b" / "__init__.py").write_text("import dep_b\n")
+        (src / "shared.py").write_text("import dep_shared\n")
+        config_file = tmp_path / "config.toml"
+        config_file.write_text(
+            "[py-unused-deps]\n"
+            "[[py-unused-deps.project]]\n"
+            'distribution = "project-a"\n'
+            'filepaths = ["src/a", "src/shared.py"]\n'
+            "[[py-unused-deps.project]]\n"
+            'distribution = "project-b"\n'
+            'filepaths = ["src/a", "src/shared.py"]\n'
+        )
+        argv = ["--config-file", str(config_file), "--site-packages", str(site_dir)]
+
+        monkeypatch.chdir(tmp_path)
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases", wraps=get_import_bases
+        ) as import_bases:
+            returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.out == ""
+        assert captured.err == "project-b: No usage found for: dep-b\n"
+        assert sorted(call.args[0] for call in import_bases.call_args_list) == [
+            os.path.join("src", "a", "__init__.py"),
+            os.path.join("src", "shared.py"),
+        ]
+
+    def test_filepaths_rejected_with_projects(self, capsys, tmp_path):
+        config_file = tmp_path / "config.toml"
+        config_file.write_text(
+            "[py-unused-deps]\n"
+            "[[py-unused-deps.project]]\n"
+            'distribution = "project-a"\n'
+            'filepaths = ["a"]\n'
+        )
+
+        returncode = main(["--config-file", str(config_file), "b/module.py"])
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.err == (
+            "Error: Filepaths can't be given on the command line when projects are "
+            "configured, set 'filepaths' in each project instead\n"
+        )
+
+    def test_overlapping_filepaths_scanned_once(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "overlapping-root", requires=["dep"])
+        write_dist_info(site_dir, "dep", top_level=["dep"])
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "module.py").write_text("import dep\n")
+        (tmp_path / "setup.py").write_text("")
+        argv = [
+            "--distribution",
+            "overlapping-root",
+            "--site-packages",
+            str(site_dir),
+            "--exclude",
+            "site-packages",
+            ".",
+            "src",
+        ]
+
+        monkeypatch.chdir(tmp_path)
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases", wraps=get_import_bases
+        ) as import_bases:
+            returncode = main(argv)
+
+        assert returncode == 0
+        assert capsys.readouterr().err == ""
+        assert sorted(call.args[0] for call in import_bases.call_args_list) == [
+            os.path.join(".", "setup.py"),
+            os.path.join(".", "src", "module.py"),
+        ]
+
+    def test_files_from_stdin(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "listed-root", requires=["used-dep", "unused-dep"])
+        write_dist_info(site_dir, "used-dep", top_level=["used_dep"])
+        write_dist_info(site_dir, "unused-dep", top_level=["unused_dep"])
+        (tmp_path / "listed.py").write_text("import used_dep\n")
+        (tmp_path / "not_listed.py").write_text("import unused_dep\n")
+        argv = [
+            "--distribution",
+            "listed-root",
+            "--site-packages",
+            str(site_dir),
+            "--files-from",
+            "-",
+        ]
+        monkeypatch.chdir(tmp_path)
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"listed.py\0")
+        os.close(write_fd)
+
+        with (
+            os.fdopen(read_fd, "rb") as read_file,
+            mock.patch("unused_deps.files.sys.stdin") as stdin,
+        ):
+            stdin.buffer = read_file
+            returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.out == ""
+        assert captured.err == "No usage found for: unused-dep\n"
+
+    def test_files_from_shared_between_projects(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "project-a", requires=["dep-a"])
+        write_dist_info(site_dir, "project-b", requires=["dep-b"])
+        write_dist_info(site_dir, "dep-a", top_level=["dep_a"])
+        write_dist_info(site_dir, "dep-b", top_level=["dep_b"])
+        (tmp_path / "a.py").write_text("import dep_a\n")
+        (tmp_path / "b.py").write_text("import dep_b\n")
+        (tmp_path / "files.txt").write_text("a.py\nb.py\n")
+        config_file = tmp_path / "config.toml"
+        config_file.write_text(
+            "[py-unused-deps]\n"
+            "[[py-unused-deps.project]]\n"
+            'distribution = "project-a"\n'
+            'include = ["a.py"]\n'
+            "[[py-unused-deps.project]]\n"
+            'distribution = "project-b"\n'
+            'include = ["a.py"]\n'
+        )
+        argv = [
+            "--config-file",
+            str(config_file),
+            "--site-packages",
+            str(site_dir),
+            "--files-from",
+            "files.txt",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.out == ""
+        assert captured.err == "project-b: No usage found for: dep-b\n"
+
+    def test_sharded_scan_and_merge(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        deps = [f"dep-{i}" for i in range(6)]
+        write_dist_info(site_dir, "sharded-root", requires=deps + ["unused-dep"])
+        for dep in deps + ["unused-dep"]:
+            write_dist_info(site_dir, dep, top_level=[dep.replace("-", "_")])
+        src = tmp_path / "src"
+        src.mkdir()
+        for dep in deps:
+            module = dep.replace("-", "_")
+            (src / f"uses_{module}.py").write_text(f"import {module}\n")
+        common_args = [
+            "--distribution",
+            "sharded-root",
+            "--site-packages",
+            str(site_dir),
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        partial_files = []
+        for index in (1, 2, 3):
+            partial_file = str(tmp_path / f"shard-{index}.json")
+            partial_files.append(partial_file)
+            argv = common_args + [
+                "--shard",
+                f"{index}/3",
+                "--shard-file",
+                partial_file,
+                "src",
+            ]
+            assert main(argv) == 0
+
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == ""
+
+        assert main(["merge"] + common_args + partial_files) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == "No usage found for: unused-dep\n"
+
+    @pytest.mark.parametrize(
+        "args", (["--shard", "1/2"], ["--shard-file", "partial.json"])
+    )
+    def test_failure_on_incomplete_shard_args(self, capsys, args):
+        assert main(["--no-distribution"] + args) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert (
+            captured.err
+            == "Error: '--shard' and '--shard-file' must be given together\n"
+        )
+
+    def test_replays_cached_result(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "cached-root", requires=["unused-dep"])
+        write_dist_info(site_dir, "unused-dep", top_level=["unused_dep"])
+        (tmp_path / "source.py").write_text("import os\n")
+        argv = [
+            "--distribution",
+            "cached-root",
+            "--site-packages",
+            str(site_dir),
+            "--cache-dir",
+            str(tmp_path / "cache"),
+            "source.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+        # pretend the inputs weren't just modified
+        after_inputs = time.time_ns() + 60_000_000_000
+
+        with mock.patch("unused_deps.cache.time.time_ns", return_value=after_inputs):
+            assert main(argv) == 1
+        first = capsys.readouterr()
+
+        with mock.patch("unused_deps.run.get_import_bases") as import_bases:
+            assert main(argv) == 1
+        second = capsys.readouterr()
+
+        import_bases.assert_not_called()
+        assert first.err == second.err == "No usage found for: unused-dep\n"
+        assert first.out == second.out == ""
+
+    def test_replays_cached_usage_by_directory(self, capsys, tmp_path, monkeypatch):
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "a.py").write_text("import os\n")
+        argv = [
+            "--no-distribution",
+            "--cache-dir",
+            str(tmp_path / "cache"),
+            "--by-directory",
+            "1",
+            "src",
+        ]
+        monkeypatch.chdir(tmp_path)
+        # pretend the inputs weren't just modified
+        after_inputs = time.time_ns() + 60_000_000_000
+
+        with mock.patch("unused_deps.cache.time.time_ns", return_value=after_inputs):
+            assert main(argv) == 0
+        first = capsys.readouterr()
+
+        with mock.patch("unused_deps.run.get_import_bases") as import_bases:
+            assert main(argv) == 0
+        second = capsys.readouterr()
+
+        import_bases.assert_not_called()
+        assert first.out == second.out == "src: (none)\n"
+
+    def test_reports_usage_by_directory(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "by-dir-root", requires=["dep-a", "dep-b"])
+        write_dist_info(site_dir, "dep-a", top_level=["dep_a"])
+        write_dist_info(site_dir, "dep-b", top_level=["dep_b"])
+        for path, code in (
+            ("src/a/__init__.py", "import dep_a\n"),
+            ("src/a/nested/module.py", "import dep_b\n"),
+            ("src/b/__init__.py", "import os\n"),
+        ):
+            (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / path).write_text(code)
+        argv = [
+            "--distribution",
+            "by-dir-root",
+            "--site-packages",
+            str(site_dir),
+            "--by-directory",
+            "2",
+            "src",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 0
+        assert captured.err == ""
+        assert captured.out == "src/a: dep-a, dep-b\nsrc/b: (none)\n"
+
+    @pytest.mark.parametrize("value", ("-1", "0"))
+    def test_failure_on_invalid_by_directory_depth(self, capsys, value):
+        assert main(["--no-distribution", "--by-directory", value]) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == "Error: '--by-directory' must be at least 1\n"
+
+    @pytest.mark.parametrize("value", ("-1", "0"))
+    def test_failure_on_invalid_walk_threads(self, capsys, value):
+        assert main(["--no-distribution", "--walk-threads", value]) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == "Error: '--walk-threads' must be at least 1\n"
+
+    def test_parallel_walk(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        deps = [f"dep-{i}" for i in range(4)]
+        write_dist_info(site_dir, "walked-root", requires=deps + ["unused-dep"])
+        for dep in deps + ["unused-dep"]:
+            write_dist_info(site_dir, dep, top_level=[dep.replace("-", "_")])
+        for i, dep in enumerate(deps):
+            module = tmp_path / "src" / f"package{i}" / "module.py"
+            module.parent.mkdir(parents=True)
+            module.write_text(f"import {dep.replace('-', '_')}\n")
+        argv = [
+            "--distribution",
+            "walked-root",
+            "--site-packages",
+            str(site_dir),
+            "--walk-threads",
+            "2",
+            "src",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.out == ""
+        assert captured.err == "No usage found for: unused-dep\n"
+
+    def test_scans_notebooks(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(
+            site_dir, "notebook-root", requires=["code-dep", "markdown-dep"]
+        )
+        for dep in ("code-dep", "markdown-dep"):
+            write_dist_info(site_dir, dep, top_level=[dep.replace("-", "_")])
+        cells = [
+            {"cell_type": "markdown", "source": ["import markdown_dep"]},
+            {"cell_type": "code", "outputs": [], "source": ["import code_dep"]},
+        ]
+        (tmp_path / "analysis.ipynb").write_text(json.dumps({"cells": cells}))
+        argv = ["--distribution", "notebook-root", "--site-packages", str(site_dir)]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.err == "No usage found for: markdown-dep\n"
+
+    def test_skips_unreadable_notebooks(self, capsys, tmp_path, monkeypatch, caplog):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "notebook-root", requires=["dep"])
+        write_dist_info(site_dir, "dep", top_level=["dep"])
+        (tmp_path / "a.py").write_text("import dep\n")
+        # a git-LFS pointer
+        (tmp_path / "broken.ipynb").write_text(
+            "version https://git-lfs.github.com/spec/v1\n"
+        )
+        argv = ["--distribution", "notebook-root", "--site-packages", str(site_dir)]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 0
+        assert captured.err == ""
+        assert f"Skipping notebook {os.path.join('.', 'broken.ipynb')}" in caplog.text
+
+    def test_module_level_only(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        deps = ["header-dep", "body-dep", "unused-dep"]
+        write_dist_info(site_dir, "header-root", requires=deps)
+        for dep in deps:
+            write_dist_info(site_dir, dep, top_level=[dep.replace("-", "_")])
+        (tmp_path / "a.py").write_text("import header_dep\n\nx = 1\n")
+        (tmp_path / "b.py").write_text(
+            "import header_dep\n\ndef f():\n    import body_dep\n"
+        )
+        (tmp_path / "c.py").write_text("import header_dep\n")
+        argv = [
+            "--distribution",
+            "header-root",
+            "--site-packages",
+            str(site_dir),
+            "--module-level-only",
+            "a.py",
+            "b.py",
+            "c.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases", wraps=get_import_bases
+        ) as import_bases:
+            returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.err == "No usage found for: unused-dep\n"
+        # only the files that could show a dependency is used are read in full
+        assert [
+            (call.args[0], call.kwargs["module_level_only"])
+            for call in import_bases.call_args_list
+        ] == [
+            ("a.py", True),
+            ("b.py", True),
+            ("c.py", True),
+            ("a.py", False),
+            ("b.py", False),
+            ("c.py", False),
+        ]
+
+    def test_module_level_only_reads_in_full_until_confirmed(
+        self, capsys, tmp_path, monkeypatch
+    ):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "header-root", requires=["body-dep"])
+        write_dist_info(site_dir, "body-dep", top_level=["body_dep"])
+        (tmp_path / "a.py").write_text("x = 1\nimport body_dep\n")
+        (tmp_path / "b.py").write_text("x = 1\n")
+        argv = [
+            "--distribution",
+            "header-root",
+            "--site-packages",
+            str(site_dir),
+            "--module-level-only",
+            "a.py",
+            "b.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases", wraps=get_import_bases
+        ) as import_bases:
+            returncode = main(argv)
+
+        assert returncode == 0
+        assert [
+            (call.args[0], call.kwargs["module_level_only"])
+            for call in import_bases.call_args_list
+        ] == [("a.py", True), ("b.py", True), ("a.py", False)]
+
+    def test_module_level_only_with_index(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "header-root", requires=["body-dep", "unused-dep"])
+        write_dist_info(site_dir, "body-dep", top_level=["body_dep"])
+        write_dist_info(site_dir, "unused-dep", top_level=["unused_dep"])
+        (tmp_path / "a.py").write_text("x = 1\nimport body_dep\n")
+        argv = [
+            "--distribution",
+            "header-root",
+            "--site-packages",
+            str(site_dir),
+            "--module-level-only",
+            "--index-file",
+            "index.db",
+            "a.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        # the index has all the imports of every file anyway
+        with mock.patch("unused_deps.run.get_import_bases") as import_bases:
+            returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.err == "No usage found for: unused-dep\n"
+        import_bases.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ("args", "expected_error"),
+        (
+            (
+                ["--shard", "1/2", "--shard-file", "partial.json"],
+                "'--module-level-only' can't be used with '--shard'",
+            ),
+            (
+                ["--by-directory", "1"],
+                "'--module-level-only' can't be used with '--by-directory'",
+            ),
+            (
+                ["--check-missing"],
+                "'--module-level-only' can't be used with '--check-missing'",
+            ),
+        ),
+    )
+    def test_failure_on_module_level_only_with(self, capsys, args, expected_error):
+        assert main(["--no-distribution", "--module-level-only", *args]) == 1
+        captured = capsys.readouterr()
+        assert captured.err == f"Error: {expected_error}\n"
+
+    def test_check_missing(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(
+            site_dir,
+            "missing-root",
+            requires=["declared-dep", "ignored-dep"],
+            top_level=["missing_root"],
+        )
+        for dep in ("declared-dep", "ignored-dep", "undeclared-dep", "first-party"):
+            write_dist_info(site_dir, dep, top_level=[dep.replace("-", "_")])
+        package = tmp_path / "src" / "first_party"
+        (package / "sub").mkdir(parents=True)
+        (package / "__init__.py").touch()
+        (package / "sub" / "__init__.py").touch()
+        (package / "sub" / "module.py").write_text(
+            "import os\n"
+            "import declared_dep\n"
+            "import undeclared_dep.sub\n"
+            "import ignored_dep\n"
+            "import first_party\n"
+            "import missing_root\n"
+            "import not_installed\n"
+        )
+        argv = [
+            "--distribution",
+            "missing-root",
+            "--site-packages",
+            str(site_dir),
+            "--ignore",
+            "ignored-dep",
+            "--check-missing",
+            "src",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.err == (
+            "Undeclared dependency: undeclared-dep (imported as undeclared_dep)\n"
+        )
+
+    def test_check_missing_skipped_requirements(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        for dep in ("attrs", "extra-dep"):
+            write_dist_info(site_dir, dep, top_level=[dep.replace("-", "_")])
+        (tmp_path / "requirements.txt").write_text(
+            "attrs; python_version < '3'\nextra-dep; extra == 'test'\n"
+        )
+        (tmp_path / "source.py").write_text("import attrs\nimport extra_dep\n")
+        argv = [
+            "--no-distribution",
+            "--requirement",
+            "requirements.txt",
+            "--site-packages",
+            str(site_dir),
+            "--check-missing",
+            "source.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 0
+        assert captured.err == ""
+
+    def test_transitive(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(
+            site_dir, "transitive-root", requires=["client", "transport", "used"]
+        )
+        write_dist_info(
+            site_dir, "client", requires=["transport", "codec[fast]"], top_level=[]
+        )
+        write_dist_info(
+            site_dir, "codec", requires=["speedups; extra == 'fast'"], top_level=[]
+        )
+        write_dist_info(site_dir, "transport", top_level=["transport"])
+        write_dist_info(site_dir, "speedups", top_level=[])
+        write_dist_info(site_dir, "used", requires=["transport"], top_level=["used"])
+        (tmp_path / "source.py").write_text("import used\n")
+        argv = [
+            "--distribution",
+            "transitive-root",
+            "--site-packages",
+            str(site_dir),
+            "--transitive",
+            "source.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.err.splitlines() == [
+            "No usage found for: client (only reachable through it: codec, speedups)",
+            "No usage found for: transport (required by: client, used)",
+        ]
+
+    def test_transitive_declared_extras(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(
+            site_dir, "transitive-root", requires=["web[socks]", "socks-lib"]
+        )
+        write_dist_info(
+            site_dir, "web", requires=["socks-lib; extra == 'socks'"], top_level=["web"]
+        )
+        write_dist_info(site_dir, "socks-lib", top_level=["socks_lib"])
+        # nothing installed requires the docs extra, so it's not in the graph
+        (tmp_path / "requirements.txt").write_text("web[docs]\n")
+        (tmp_path / "source.py").write_text("import web\n")
+        argv = [
+            "--distribution",
+            "transitive-root",
+            "--requirement",
+            "requirements.txt",
+            "--site-packages",
+            str(site_dir),
+            "--transitive",
+            "source.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.err.splitlines() == [
+            "No usage found for: socks-lib (required by: web)",
+        ]
+
+    def test_time_budget_runs_out(self, capsys, tmp_path, monkeypatch, clock):
+        site_dir = tmp_path / "site-packages"
+        deps = ["dep-a", "dep-b", "unused-dep"]
+        write_dist_info(site_dir, "budget-root", requires=deps)
+        for dep in deps:
+            write_dist_info(site_dir, dep, top_level=[dep.replace("-", "_")])
+        (tmp_path / "a.py").write_text("import dep_a\n")
+        (tmp_path / "b.py").write_text("# scanned last, it's larger\nimport dep_b\n")
+        argv = [
+            "--distribution",
+            "budget-root",
+            "--site-packages",
+            str(site_dir),
+            "--time-budget",
+            "0.3",
+            "b.py",
+            "a.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        def slow_import_bases(path, **kwargs):
+            clock.advance(0.5)
+            return get_import_bases(path, **kwargs)
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases", side_effect=slow_import_bases
+        ):
+            returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 3
+        assert captured.err.splitlines() == [
+            "Time budget ran out with 1 files not scanned, results are partial",
+            "Usage found for: dep-a",
+            "No usage found so far for: dep-b",
+            "No usage found so far for: unused-dep",
+        ]
+
+    def _budget_project(self, tmp_path, budget="0.3"):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "budget-root", requires=["dep-a", "unused-dep"])
+        for dep in ("dep-a", "unused-dep"):
+            write_dist_info(site_dir, dep, top_level=[dep.replace("-", "_")])
+        (tmp_path / "a.py").write_text("import dep_a\n")
+        (tmp_path / "b.py").write_text("import os\n# larger\n")
+        return [
+            "--distribution",
+            "budget-root",
+            "--site-packages",
+            str(site_dir),
+            "--time-budget",
+            budget,
+        ]
+
+    def test_time_budget_runs_out_finding_files(
+        self, capsys, tmp_path, monkeypatch, clock
+    ):
+        argv = self._budget_project(tmp_path)
+        monkeypatch.chdir(tmp_path)
+
+        def slow_find_files(path, **kwargs):
+            yield os.path.join(path, "a.py")
+            clock.advance(0.5)
+            yield os.path.join(path, "b.py")
+
+        with mock.patch("unused_deps.run.find_files", side_effect=slow_find_files):
+            returncode = main([*argv, "."])
+
+        captured = capsys.readouterr()
+        assert returncode == 3
+        assert captured.err.splitlines() == [
+            "Time budget ran out before all files were found, results are partial",
+            "No usage found so far for: dep-a",
+            "No usage found so far for: unused-dep",
+        ]
+
+    def test_time_budget_runs_out_ordering_files(
+        self, capsys, tmp_path, monkeypatch, clock
+    ):
+        argv = self._budget_project(tmp_path)
+        monkeypatch.chdir(tmp_path)
+        scan_cost = run_module._scan_cost
+
+        def slow_scan_cost(*args):
+            clock.advance(0.5)
+            return scan_cost(*args)
+
+        with mock.patch.object(run_module, "_scan_cost", side_effect=slow_scan_cost):
+            returncode = main([*argv, "a.py", "b.py"])
+
+        captured = capsys.readouterr()
+        assert returncode == 3
+        assert captured.err.splitlines() == [
+            "Time budget ran out with 2 files not scanned, results are partial",
+            "No usage found so far for: dep-a",
+            "No usage found so far for: unused-dep",
+        ]
+
+    def test_time_budget_runs_out_resolving(self, capsys, tmp_path, monkeypatch, clock):
+        argv = self._budget_project(tmp_path)
+        monkeypatch.chdir(tmp_path)
+        declared_dists = run_module._declared_dists
+        declared_before = run_module._Resolver.declared_before
+        waited = threading.Event()
+
+        def slow_declared_dists(*args):
+            # only resolved once the scan gave up waiting for it
+            waited.wait()
+            return declared_dists(*args)
+
+        def waiting_declared_before(self, index, deadline):
+            clock.advance(0.5)
+            declared = declared_before(self, index, deadline)
+            waited.set()
+            return declared
+
+        with (
+            mock.patch.object(
+                run_module, "_declared_dists", side_effect=slow_declared_dists
+            ),
+            mock.patch.object(
+                run_module._Resolver, "declared_before", waiting_declared_before
+            ),
+        ):
+            returncode = main([*argv, "a.py", "b.py"])
+
+        captured = capsys.readouterr()
+        assert returncode == 3
+        assert captured.err.splitlines() == [
+            "Time budget ran out with 2 files not scanned, results are partial",
+            "No usage found so far for: dep-a",
+            "No usage found so far for: unused-dep",
+        ]
+
+    def test_time_budget_scans_every_file_in_time(self, capsys, tmp_path, monkeypatch):
+        argv = self._budget_project(tmp_path, budget="60")
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main([*argv, "a.py", "b.py"])
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.err == "No usage found for: unused-dep\n"
+
+    def test_time_budget_with_files_shared_between_projects(
+        self, capsys, tmp_path, monkeypatch
+    ):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "project-a", requires=["dep-a"])
+        write_dist_info(site_dir, "project-b", requires=["dep-b"])
+        for name in ("dep-a", "dep-b"):
+            write_dist_info(site_dir, name, top_level=[name.replace("-", "_")])
+        (tmp_path / "shared.py").write_text("import dep_a\n")
+        config_file = tmp_path / "config.toml"
+        config_file.write_text(
+            "[py-unused-deps]\n"
+            "[[py-unused-deps.project]]\n"
+            'distribution = "project-a"\n'
+            'filepaths = ["shared.py"]\n'
+            "[[py-unused-deps.project]]\n"
+            'distribution = "project-b"\n'
+            'filepaths = ["shared.py"]\n'
+        )
+        argv = [
+            "--config-file",
+            str(config_file),
+            "--site-packages",
+            str(site_dir),
+            "--time-budget",
+            "60",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases", wraps=get_import_bases
+        ) as import_bases:
+            returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.err == "project-b: No usage found for: dep-b\n"
+        import_bases.assert_called_once_with("shared.py", module_level_only=False)
+
+    def test_scan_cost_of_missing_file(self, tmp_path):
+        # left to be reported when it's scanned
+        missing = str(tmp_path / "missing.py")
+
+        assert run_module._scan_cost(missing, {}, None) == (2, 0)
+
+    def test_time_budget_stops_once_all_used(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "budget-root", requires=["dep-a", "dep-b"])
+        for dep in ("dep-a", "dep-b"):
+            write_dist_info(site_dir, dep, top_level=[dep.replace("-", "_")])
+        (tmp_path / "a.py").write_text("import dep_a\n")
+        (tmp_path / "b.py").write_text("import dep_b\n# larger\n")
+        (tmp_path / "c.py").write_text("import os\n# larger still\n")
+        argv = [
+            "--distribution",
+            "budget-root",
+            "--site-packages",
+            str(site_dir),
+            "--time-budget",
+            "60",
+            ".",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases", wraps=get_import_bases
+        ) as import_bases:
+            returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 0
+        assert captured.err == ""
+        assert [call.args[0] for call in import_bases.call_args_list] == [
+            os.path.join(".", "a.py"),
+            os.path.join(".", "b.py"),
+        ]
+
+    def test_time_budget_scans_indexed_files_first(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "budget-root", requires=["dep-a"])
+        write_dist_info(site_dir, "dep-a", top_level=["dep_a"])
+        (tmp_path / "indexed.py").write_text("# larger\nimport dep_a\n")
+        (tmp_path / "small.py").write_text("import os\n")
+        argv = [
+            "--distribution",
+            "budget-root",
+            "--site-packages",
+            str(site_dir),
+            "--index-file",
+            "index.db",
+        ]
+        monkeypatch.chdir(tmp_path)
+        # as if the file was indexed a while after it was last modified
+        after_writes = time.time_ns() + 60_000_000_000
+        monkeypatch.setattr("unused_deps.index.time.time_ns", lambda: after_writes)
+        assert main([*argv, "indexed.py"]) == 0
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases", wraps=get_import_bases
+        ) as import_bases:
+            returncode = main([*argv, "--time-budget", "60", "."])
+
+        assert returncode == 0
+        import_bases.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ("args", "expected_error"),
+        (
+            (["--time-budget", "-1"], "'--time-budget' must be greater than 0"),
+            (["--time-budget", "0"], "'--time-budget' must be greater than 0"),
+            (
+                ["--time-budget", "1", "--shard", "1/2", "--shard-file", "p.json"],
+                "'--time-budget' can't be used with '--shard'",
+            ),
+            (
+                ["--time-budget", "1", "--by-directory", "1"],
+                "'--time-budget' can't be used with '--by-directory'",
+            ),
+            (
+                ["--time-budget", "1", "--module-level-only"],
+                "'--time-budget' can't be used with '--module-level-only'",
+            ),
+        ),
+    )
+    def test_failure_on_invalid_time_budget(self, capsys, args, expected_error):
+        assert main(["--no-distribution", *args]) == 1
+        captured = capsys.readouterr()
+        assert captured.err == f"Error: {expected_error}\n"
+
+    def test_scan_with_index_and_query(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(site_dir, "indexed-root", requires=["used-dep", "unused-dep"])
+        write_dist_info(site_dir, "used-dep", top_level=["used_dep"])
+        write_dist_info(site_dir, "unused-dep", top_level=["unused_dep"])
+        (tmp_path / "source.py").write_text("import os\nimport used_dep.sub\n")
+        argv = [
+            "--distribution",
+            "indexed-root",
+            "--site-packages",
+            str(site_dir),
+            "--index-file",
+            "index.db",
+            "source.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+        # pretend the inputs weren't just modified
+        after_inputs = time.time_ns() + 60_000_000_000
+
+        with mock.patch("unused_deps.index.time.time_ns", return_value=after_inputs):
+            assert main(argv) == 1
+        assert capsys.readouterr().err == "No usage found for: unused-dep\n"
+
+        with mock.patch("unused_deps.index.get_imports") as get_imports:
+            assert main(argv) == 1
+            assert (
+                main(["query", "--index-file", "index.db", "--who-imports", "used_dep"])
+                == 0
+            )
+        get_imports.assert_not_called()
+        captured = capsys.readouterr()
+        assert captured.err == "No usage found for: unused-dep\n"
+        source = os.path.join(os.getcwd(), "source.py")
+        assert captured.out == f"{source}:2: used_dep.sub\n"
+
+    @pytest.mark.parametrize(
+        ("args", "expected_error"),
+        (
+            (["--who-imports", "foo"], "'query' requires '--index-file'"),
+            (
+                ["--index-file", "index.db"],
+                "Nothing to query, give '--who-imports' or '--imports-in'",
+            ),
+        ),
+    )
+    def test_failure_on_invalid_query(self, capsys, args, expected_error):
+        assert main(["query"] + args) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == f"Error: {expected_error}\n"
+
+    def test_failure_on_by_directory_when_merging(self, capsys, tmp_path):
+        argv = ["merge", "--no-distribution", "--by-directory", "1", "shard.json"]
+
+        assert main(argv) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == "Error: '--by-directory' is not supported when merging\n"
+
+    def test_reports_extras_and_marker_matrix(self, capsys, tmp_path, monkeypatch):
+        site_dir = tmp_path / "site-packages"
+        write_dist_info(
+            site_dir,
+            "matrix-root",
+            requires=[
+                "used-dep",
+                'old-python-dep; python_version < "3.9"',
+                'test-dep; extra == "test"',
+                # the cell is only listed once
+                'test-dep; extra == "test" and python_version < "3.9"',
+            ],
+        )
+        for name in ("used-dep", "old-python-dep", "test-dep"):
+            write_dist_info(site_dir, name, top_level=[name.replace("-", "_")])
+        (tmp_path / "source.py").write_text("import used_dep\n")
+        argv = [
+            "--distribution",
+            "matrix-root",
+            "--site-packages",
+            str(site_dir),
+            "--matrix-extras",
+            "",
+            "--matrix-extras",
+            "test",
+            "--matrix-env",
+            "python_version=3.8",
+            "--matrix-env",
+            "python_version=3.12",
+            "source.py",
+        ]
+        monkeypatch.chdir(tmp_path)
+
+        with mock.patch(
+            "unused_deps.run.get_import_bases", wraps=get_import_bases
+        ) as import_bases:
+            returncode = main(argv)
+
+        captured = capsys.readouterr()
+        assert returncode == 1
+        assert captured.out == ""
+        assert captured.err == (
+            "No usage found for: old-python-dep (only with: python_version=3.8; "
+            "extra=test, python_version=3.8)\n"
+            "No usage found for: test-dep (only with: extra=test, python_version=3.8; "
+            "extra=test, python_version=3.12)\n"
+        )
+        import_bases.assert_called_once_with("source.py", module_level_only=False)
+
+    def test_failure_on_extra_with_matrix_extras(self, capsys):
+        argv = ["--no-distribution", "--extra", "test", "--matrix-extras", "docs"]
+
+        assert main(argv) == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert (
+            captured.err
+            == "Error: '--extra' and '--matrix-extras' can't be used together\n"
+        )
+
+    @pytest.mark.parametrize(
+        "args", (["--help"], ["--distribution", "some-dist", "--no-distribution"])
+    )
+    @pytest.mark.parametrize("config_file", (None, "pyproject.toml"))
+    def test_trivial_invocations_skip_loading_scan(self, tmp_path, args, config_file):
+        if config_file is not None:
+            # as in most repositories using the pre-commit hook
+            (tmp_path / config_file).write_text(
+                '[tool.py-unused-deps]\nexclude = ["build"]\n'
+            )
+        script = (
+            "import sys\n"
+            "from unused_deps.main import main\n"
+            "try:\n"
+            f"    main({args!r})\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print(sorted(sys.modules))\n"
+        )
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = {**os.environ, "PYTHONPATH": repo_root}
+
+        proc = subprocess.run(
+            (sys.executable, "-c", script),
+            capture_output=True,
+            text=True,
+            cwd=tmp_path,
+            env=env,
+        )
+
+        assert proc.returncode == 0, proc.stderr
+        modules = ast.literal_eval(proc.stdout.splitlines()[-1])
+        assert "unused_deps.main" in modules
+        for module in ("unused_deps.run", "importlib.metadata", "packaging"):
+            assert module not in modules
+
+    def test_writes_trace_file(self, capsys, tmp_path, monkeypatch):
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "a.py").write_text("import os\n")
+        (tmp_path / "src" / "b.py").write_text("import sys\n")
+        trace_file = tmp_path / "trace.json"
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(
+            [
+                "--no-distribution",
+                "--walk-threads",
+                "2",
+                "--trace-file",
+                str(trace_file),
+                "src",
+            ]
+        )
+
+        assert returncode == 0
+        spans = [
+            (event["cat"], event["name"])
+            for event in json.loads(trace_file.read_text())["traceEvents"]
+            if event["ph"] == "X"
+        ]
+        assert ("stage", "parse") in spans
+        assert ("list", "src") in spans
+        assert ("parse", os.path.join("src", "a.py")) in spans
+        _, err = capsys.readouterr()
+        assert err.splitlines()[0] == "Slowest files to parse:"
+        assert len(err.splitlines()) == 3
+
+    def test_writes_trace_file_without_files_parsed(self, capsys, tmp_path):
+        trace_file = tmp_path / "trace.json"
+
+        returncode = main(
+            ["--no-distribution", "--trace-file", str(trace_file), str(tmp_path)]
+        )
+
+        assert returncode == 0
+        assert json.loads(trace_file.read_text())["traceEvents"]
+        assert capsys.readouterr().err == ""
+
+    def test_writes_metrics_file(self, capsys, tmp_path, monkeypatch):
+        (tmp_path / "source.py").write_text("import os\n")
+        metrics_file = tmp_path / "metrics.prom"
+        monkeypatch.chdir(tmp_path)
+
+        returncode = main(
+            ["--no-distribution", "--metrics-file", str(metrics_file), "source.py"]
+        )
+
+        assert returncode == 0
+        metrics = metrics_file.read_text()
+        assert "# TYPE py_unused_deps_files_scanned gauge" in metrics
+        assert 'stage="parse"' in metrics
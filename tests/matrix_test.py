@@ -0,0 +1,91 @@
+import pytest
+
+from unused_deps.environment import Environment
+from unused_deps.errors import InternalError
+from unused_deps.matrix import MatrixCell, cell_environment, cell_label, matrix_cells
+
+
+@pytest.mark.parametrize(
+    ("matrix_extras", "matrix_env", "extras", "expected"),
+    (
+        pytest.param(None, None, None, [MatrixCell((), ())], id="No matrix"),
+        pytest.param(
+            None,
+            None,
+            ["test"],
+            [MatrixCell(("test",), ())],
+            id="Extras without matrix extras",
+        ),
+        pytest.param(
+            ["", "test,docs"],
+            None,
+            None,
+            [MatrixCell((), ()), MatrixCell(("test", "docs"), ())],
+            id="Matrix extras",
+        ),
+        pytest.param(
+            ["", "test"],
+            ["python_version=3.9", " python_version = 3.12 ,sys_platform=win32"],
+            None,
+            [
+                MatrixCell((), (("python_version", "3.9"),)),
+                MatrixCell((), (("python_version", "3.12"), ("sys_platform", "win32"))),
+                MatrixCell(("test",), (("python_version", "3.9"),)),
+                MatrixCell(
+                    ("test",),
+                    (("python_version", "3.12"), ("sys_platform", "win32")),
+                ),
+            ],
+            id="Matrix extras and environments",
+        ),
+    ),
+)
+def test_matrix_cells(matrix_extras, matrix_env, extras, expected):
+    assert matrix_cells(matrix_extras, matrix_env, extras) == expected
+
+
+@pytest.mark.parametrize(
+    "matrix_env", ("python_version", "python_version=3.9,", "not_a_marker=1")
+)
+def test_matrix_cells_invalid_environment(matrix_env):
+    with pytest.raises(InternalError) as e:
+        matrix_cells(None, [matrix_env], None)
+
+    assert str(e.value) == (
+        f"Invalid marker environment '{matrix_env}': expected NAME=VALUE pairs, "
+        "e.g. 'python_version=3.9,sys_platform=linux'"
+    )
+
+
+def test_cell_environment_overrides_markers():
+    environment = Environment(
+        path=["site-packages"],
+        markers={"python_version": "3.12", "sys_platform": "linux"},
+    )
+    cell = MatrixCell((), (("python_version", "3.9"),))
+
+    assert cell_environment(environment, cell) == Environment(
+        path=["site-packages"],
+        markers={"python_version": "3.9", "sys_platform": "linux"},
+    )
+
+
+def test_cell_environment_without_markers():
+    environment = Environment(path=["site-packages"])
+
+    assert cell_environment(environment, MatrixCell(("test",), ())) is environment
+
+
+@pytest.mark.parametrize(
+    ("cell", "expected"),
+    (
+        (MatrixCell((), ()), "no extras"),
+        (MatrixCell(("test", "docs"), ()), "extra=test, extra=docs"),
+        (
+            MatrixCell(("test",), (("sys_platform", "win32"),)),
+            "extra=test, sys_platform=win32",
+        ),
+    ),
+)
+def test_cell_label(cell, expected):
+    assert cell_label(cell) == expected
@@ -0,0 +1,90 @@
+import sys
+from unittest import mock
+
+import pytest
+
+from unused_deps.metrics import format_metrics, write_metrics
+from unused_deps.stats import RunStats
+
+
+def _samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+@pytest.fixture
+def directory_label(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return f'directory="{tmp_path}"'.replace("\\", "\\\\")
+
+
+def test_format_metrics(directory_label):
+    stats = RunStats(
+        files=3,
+        bytes=300,
+        file_cache_hits=1,
+        distributions=4,
+        run_cache_hit=False,
+        stage_seconds={"discover": 0.5, "parse": 1.5},
+    )
+
+    samples = _samples(format_metrics(stats, 1, 2.5))
+
+    assert samples[f"py_unused_deps_exit_code{{{directory_label}}}"] == 1
+    assert samples[f"py_unused_deps_run_duration_seconds{{{directory_label}}}"] == 2.5
+    assert (
+        samples[
+            f'py_unused_deps_stage_duration_seconds{{{directory_label},stage="parse"}}'
+        ]
+        == 1.5
+    )
+    assert samples[f"py_unused_deps_files_scanned{{{directory_label}}}"] == 3
+    assert samples[f"py_unused_deps_bytes_scanned{{{directory_label}}}"] == 300
+    assert samples[f"py_unused_deps_distributions_resolved{{{directory_label}}}"] == 4
+    assert (
+        samples[f'py_unused_deps_cache_hit_ratio{{{directory_label},cache="files"}}']
+        == 0.25
+    )
+    assert (
+        samples[f'py_unused_deps_cache_hit_ratio{{{directory_label},cache="run"}}'] == 0
+    )
+    if sys.platform != "win32":  # pragma: win32 no cover
+        assert samples[f"py_unused_deps_peak_rss_bytes{{{directory_label}}}"] > 0
+
+
+def test_format_metrics_skips_unused_caches_and_empty_metrics(directory_label):
+    text = format_metrics(RunStats(), 0, 1.0)
+
+    assert 'cache="files"' not in text
+    assert 'cache="run"' not in text
+    assert "stage_duration_seconds" not in text
+
+
+def test_format_metrics_declares_each_metric_once(directory_label):
+    stats = RunStats(stage_seconds={"discover": 0.5, "parse": 1.5})
+
+    lines = format_metrics(stats, 0, 1.0).splitlines()
+
+    assert lines.count("# TYPE py_unused_deps_stage_duration_seconds gauge") == 1
+
+
+def test_format_metrics_escapes_labels():
+    directory = 'C:\\with"quote\nnewline'
+
+    with mock.patch("unused_deps.metrics.os.getcwd", return_value=directory):
+        text = format_metrics(RunStats(), 0, 1.0)
+
+    assert 'directory="C:\\\\with\\"quote\\nnewline"' in text
+
+
+def test_write_metrics(tmp_path, directory_label):
+    path = tmp_path / "metrics.prom"
+
+    write_metrics(str(path), RunStats(files=1), 0, 1.0)
+
+    samples = _samples(path.read_text())
+    assert samples[f"py_unused_deps_files_scanned{{{directory_label}}}"] == 1
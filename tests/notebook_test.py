@@ -0,0 +1,109 @@
+import json
+from unittest import mock
+
+import pytest
+
+from unused_deps.notebook import notebook_code
+
+
+def _code_cell(source, outputs=()):
+    return {
+        "cell_type": "code",
+        "execution_count": 1,
+        "id": "a1",
+        "metadata": {"collapsed": False, "tags": []},
+        "outputs": list(outputs),
+        "source": source,
+    }
+
+
+def _notebook(cells):
+    return {
+        "cells": cells,
+        "metadata": {"kernelspec": {"name": "python3"}},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+
+
+_IMAGE_OUTPUT = {
+    "data": {"image/png": "iVBORw0KGgo" * 1000 + '\\"', "text/plain": ["<Figure>"]},
+    "metadata": {"needs_background": "light"},
+    "output_type": "display_data",
+}
+
+
+@pytest.mark.parametrize("chunk_size", (1, 7, 64 * 1024))
+def test_notebook_code(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr("unused_deps.notebook._CHUNK_SIZE", chunk_size)
+    path = tmp_path / "notebook.ipynb"
+    notebook = _notebook(
+        [
+            {"cell_type": "markdown", "metadata": {}, "source": ["# import nothing"]},
+            _code_cell(["import foo\n", 'x = "é \\" \\\\"\n'], [_IMAGE_OUTPUT]),
+            _code_cell("import bar"),
+            {"source": "import raw", "cell_type": "raw", "metadata": {}},
+            _code_cell(["%matplotlib inline\n", "!pip install buz\n", "import buz"]),
+            _code_cell(["%%bash\n", "echo hello\n"]),
+            _code_cell([]),
+            {"cell_type": "code", "metadata": {}, "outputs": [], "source": None},
+            {"cell_type": "code", "source": {"invalid": [1, True, None]}},
+        ]
+    )
+    path.write_text(json.dumps(notebook, indent=1))
+
+    assert list(notebook_code(str(path))) == [
+        'import foo\nx = "é \\" \\\\"\n',
+        "import bar",
+        "\n\nimport buz",
+        "",
+        "",
+        "",
+    ]
+
+
+def test_outputs_are_skipped_without_decoding(tmp_path):
+    path = tmp_path / "notebook.ipynb"
+    notebook = _notebook([_code_cell("import foo", [_IMAGE_OUTPUT] * 10)])
+    path.write_text(json.dumps(notebook))
+
+    with mock.patch("unused_deps.notebook.json.loads", wraps=json.loads) as loads:
+        assert list(notebook_code(str(path))) == ["import foo"]
+
+    assert max(len(call.args[0]) for call in loads.call_args_list) < 100
+
+
+@pytest.mark.parametrize(
+    ("contents", "expected_error"),
+    (
+        ("", "Expected '{', got b''"),
+        ('{"cells": [', "Expected '{', got b''"),
+        ('{"cells": [{"source": []} {}]}', "Expected ',' or ']', got b'{'"),
+        ('{"metadata": "', "Unterminated string"),
+        ('{"cells" "code"}', "Expected ':', got b'\"'"),
+        ('{1: "code"}', "Expected an object key, got 1"),
+        ('{"nbformat": }', "Unexpected b'}'"),
+        ('{"cells": [{"cell_type": nope}]}', "Expecting value"),
+    ),
+)
+def test_invalid_notebook(tmp_path, caplog, contents, expected_error):
+    path = tmp_path / "notebook.ipynb"
+    path.write_text(contents)
+
+    assert list(notebook_code(str(path))) == []
+
+    (record,) = caplog.records
+    assert record.levelname == "WARNING"
+    assert record.getMessage().startswith(f"Skipping notebook {path}: ")
+    assert expected_error in caplog.text
+
+
+def test_truncated_notebook_keeps_cells_read(tmp_path, caplog):
+    path = tmp_path / "notebook.ipynb"
+    contents = json.dumps(_notebook([_code_cell("import foo"), _code_cell("x = 1")]))
+    # cut off part way through the second cell
+    end = contents.index("x = 1")
+    path.write_text(contents[:end])
+
+    assert list(notebook_code(str(path))) == ["import foo"]
+    assert "Skipping notebook" in caplog.text
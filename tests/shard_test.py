@@ -0,0 +1,139 @@
+import json
+import logging
+
+import pytest
+
+from unused_deps.errors import InternalError
+from unused_deps.shard import Shard, in_shard, parse_shard, read_partials, write_partial
+from unused_deps.stats import RunStats
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"), (("1/1", Shard(1, 1)), ("2/4", Shard(2, 4)))
+)
+def test_parse_shard(value, expected):
+    assert parse_shard(value) == expected
+
+
+@pytest.mark.parametrize("value", ("1", "0/4", "5/4", "a/4", "1/b", "1/4/2", ""))
+def test_parse_shard_invalid(value):
+    with pytest.raises(InternalError) as exc:
+        parse_shard(value)
+
+    assert (
+        str(exc.value) == f"Invalid shard '{value}': expected INDEX/COUNT, e.g. '1/4'"
+    )
+
+
+def test_in_shard_assigns_each_path_to_one_shard():
+    paths = [f"pkg/module_{i}.py" for i in range(100)]
+    shards = [Shard(index, 3) for index in range(1, 4)]
+
+    assignments = [[path for path in paths if in_shard(path, s)] for s in shards]
+
+    assert sorted(sum(assignments, [])) == sorted(paths)
+    assert all(assigned for assigned in assignments)
+
+
+def test_in_shard_ignores_path_spelling():
+    shard = Shard(1, 7)
+    assert in_shard("./pkg/module.py", shard) == in_shard("pkg/module.py", shard)
+
+
+def _write_partials(tmp_path, shard_imports, count=None):
+    count = count or len(shard_imports)
+    paths = []
+    for index, imports in enumerate(shard_imports, start=1):
+        path = str(tmp_path / f"shard-{index}.json")
+        write_partial(path, Shard(index, count), imports, RunStats(files=1, bytes=10))
+        paths.append(path)
+    return paths
+
+
+def test_read_partials_merges_shards(tmp_path, caplog):
+    paths = _write_partials(
+        tmp_path,
+        [
+            [frozenset({"foo"}), frozenset()],
+            [frozenset({"bar"}), frozenset({"foo"})],
+        ],
+    )
+    stats = RunStats()
+
+    with caplog.at_level(logging.INFO):
+        got = read_partials(paths, 2, stats)
+
+    assert got == [frozenset({"foo", "bar"}), frozenset({"foo"})]
+    assert stats == RunStats(files=2, bytes=20)
+    assert caplog.record_tuples == [
+        ("unused-deps", logging.INFO, "Merged 2 shards: 2 files, 20 bytes scanned")
+    ]
+
+
+def test_read_partials_raises_on_missing_shards(tmp_path):
+    paths = _write_partials(tmp_path, [[frozenset()]], count=3)
+
+    with pytest.raises(InternalError) as exc:
+        read_partials(paths, 1, RunStats())
+
+    assert str(exc.value) == "Missing partial results for shards: 2, 3"
+
+
+def test_read_partials_raises_on_duplicate_shard(tmp_path):
+    (path,) = _write_partials(tmp_path, [[frozenset()]], count=2)
+
+    with pytest.raises(InternalError) as exc:
+        read_partials([path, path], 1, RunStats())
+
+    assert str(exc.value) == f"Partial results {path} and {path} are both for shard 1"
+
+
+def test_read_partials_raises_on_different_shard_counts(tmp_path):
+    path_a = str(tmp_path / "a.json")
+    path_b = str(tmp_path / "b.json")
+    write_partial(path_a, Shard(1, 2), [frozenset()], RunStats())
+    write_partial(path_b, Shard(2, 3), [frozenset()], RunStats())
+
+    with pytest.raises(InternalError) as exc:
+        read_partials([path_a, path_b], 1, RunStats())
+
+    assert (
+        str(exc.value)
+        == f"Partial result {path_b} is from a run with 3 shards, expected 2"
+    )
+
+
+def test_read_partials_raises_on_different_project_count(tmp_path):
+    paths = _write_partials(tmp_path, [[frozenset(), frozenset()]])
+
+    with pytest.raises(InternalError) as exc:
+        read_partials(paths, 1, RunStats())
+
+    assert str(exc.value) == f"Partial result {paths[0]} has 2 projects, expected 1"
+
+
+@pytest.mark.parametrize(
+    ("contents", "expected_error"),
+    (
+        ("not json", "Failed to read partial result {path}: "),
+        (json.dumps([]), "Unsupported partial result file: {path}"),
+        (json.dumps({"version": 0}), "Unsupported partial result file: {path}"),
+    ),
+)
+def test_read_partials_raises_on_invalid_file(tmp_path, contents, expected_error):
+    path = tmp_path / "partial.json"
+    path.write_text(contents)
+
+    with pytest.raises(InternalError) as exc:
+        read_partials([str(path)], 1, RunStats())
+
+    assert str(exc.value).startswith(expected_error.format(path=path))
+
+
+def test_read_partials_raises_on_missing_file(tmp_path):
+    path = str(tmp_path / "missing.json")
+
+    with pytest.raises(InternalError) as exc:
+        read_partials([path], 1, RunStats())
+
+    assert str(exc.value).startswith(f"Failed to read partial result {path}: ")
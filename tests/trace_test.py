@@ -0,0 +1,74 @@
+import json
+import threading
+
+from unused_deps.hooks import Hooks
+from unused_deps.trace import TraceRecorder
+
+
+def _spans(path):
+    trace = json.loads(path.read_text())
+    return [event for event in trace["traceEvents"] if event["ph"] == "X"]
+
+
+def test_records_spans(tmp_path):
+    hooks = Hooks()
+    recorder = TraceRecorder()
+    recorder.register(hooks)
+    assert hooks.stage is not None
+    assert hooks.directory_listed is not None
+    assert hooks.file_parsed is not None
+    assert hooks.distribution_lookup is not None
+
+    hooks.stage("parse", 0.5)
+    hooks.directory_listed("src", 0.01, 3)
+    hooks.file_parsed("src/a.py", 0.2, 4)
+    hooks.distribution_lookup("requests", 0.03)
+    recorder.unregister(hooks)
+    recorder.write(str(tmp_path / "trace.json"))
+
+    spans = _spans(tmp_path / "trace.json")
+    assert [(span["cat"], span["name"], span["args"]) for span in spans] == [
+        ("stage", "parse", {}),
+        ("list", "src", {"entries": 3}),
+        ("parse", "src/a.py", {"imports": 4}),
+        ("distribution", "requests", {}),
+    ]
+    assert [span["dur"] for span in spans] == [500000, 10000, 200000, 30000]
+    assert all(span["tid"] == threading.get_ident() for span in spans)
+    assert hooks.stage is None
+
+
+def test_records_worker_threads(tmp_path):
+    hooks = Hooks()
+    recorder = TraceRecorder()
+    recorder.register(hooks)
+
+    thread = threading.Thread(
+        target=hooks.file_parsed, args=("a.py", 0.1, 1), name="worker"
+    )
+    thread.start()
+    thread.join()
+    assert hooks.file_parsed is not None
+    hooks.file_parsed("b.py", 0.1, 1)
+    recorder.write(str(tmp_path / "trace.json"))
+
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    names = {
+        event["tid"]: event["args"]["name"]
+        for event in trace["traceEvents"]
+        if event["ph"] == "M"
+    }
+    tids = [event["tid"] for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert [names[tid] for tid in tids] == ["worker", "MainThread"]
+
+
+def test_slowest_files():
+    hooks = Hooks()
+    recorder = TraceRecorder()
+    recorder.register(hooks)
+    assert hooks.file_parsed is not None
+
+    for path, duration in (("a.py", 0.1), ("b.py", 0.3), ("c.py", 0.2)):
+        hooks.file_parsed(path, duration, 0)
+
+    assert recorder.slowest_files(2) == [(0.3, "b.py"), (0.2, "c.py")]
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from unused_deps.usage_matrix import UsageMatrix
+
+
+def _path(path):
+    return path.replace("/", os.path.sep)
+
+
+def test_usage_by_directory():
+    matrix = UsageMatrix(depth=2)
+    matrix.add_file(_path("src/app/views/index.py"), ["flask", "os"])
+    matrix.add_file(_path("src/app/models.py"), ["sqlalchemy"])
+    matrix.add_file(_path("src/lib/utils.py"), ["os"])
+    matrix.add_file(_path("setup.py"), ["setuptools"])
+
+    got = matrix.usage_by_directory(
+        {
+            "flask": ["flask"],
+            "sqlalchemy": ["sqlalchemy"],
+            "setuptools": ["setuptools", "pkg_resources"],
+            "unused": ["unused"],
+        }
+    )
+
+    assert got == {
+        ".": ["setuptools"],
+        "src/app": ["flask", "sqlalchemy"],
+        "src/lib": [],
+    }
+
+
+def test_usage_by_directory_of_absolute_paths(tmp_path):
+    matrix = UsageMatrix(depth=1)
+    matrix.add_file(str(tmp_path / "a" / "x.py"), ["flask"])
+
+    got = matrix.usage_by_directory({"flask": ["flask"]})
+
+    # e.g. `/tmp` rather than the root directory
+    drive, directory = os.path.splitdrive(str(tmp_path))
+    assert got == {f"{drive}/{directory.split(os.sep)[1]}": ["flask"]}
+
+
+def test_files_stored_as_module_bitsets():
+    matrix = UsageMatrix(depth=1)
+    matrix.add_file("first.py", ["foo", "bar"])
+    matrix.add_file("second.py", ["bar", "baz"])
+
+    assert matrix.files == ["first.py", "second.py"]
+    assert matrix.file_modules == [0b011, 0b110]
+    assert matrix.directory_modules == {".": 0b111}
+
+
+@pytest.mark.parametrize(
+    ("modules", "expected"),
+    ((["foo"], 0b01), (["foo", "bar"], 0b11), (["not-imported"], 0), ([], 0)),
+)
+def test_modules_mask(modules, expected):
+    matrix = UsageMatrix(depth=1)
+    matrix.add_file("file.py", ["foo", "bar"])
+
+    assert matrix.modules_mask(modules) == expected
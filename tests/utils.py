@@ -40,3 +40,20 @@ class InMemoryDistribution(importlib.metadata.Distribution):
 
     def locate_file(self, path: str | os.PathLike[str]) -> Path:
         raise NotImplementedError("Unimplemented unused abstractmethod")
+
+
+def write_dist_info(
+    site_dir: Path,
+    name: str,
+    *,
+    requires: Iterable[str] = (),
+    top_level: Iterable[str] | None = None,
+) -> Path:
+    dist_info = site_dir / f"{name.replace('-', '_')}-1.0.dist-info"
+    dist_info.mkdir(parents=True)
+    metadata = [f"Name: {name}", "Version: 1.0"]
+    metadata.extend(f"Requires-Dist: {requirement}" for requirement in requires)
+    (dist_info / "METADATA").write_text("\n".join(metadata) + "\n")
+    if top_level is not None:
+        (dist_info / "top_level.txt").write_text("\n".join(top_level) + "\n")
+    return dist_info
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from unused_deps.config import Config, project_configs
+from unused_deps.environment import Environment
+from unused_deps.files import write_file_atomic
+
+logger = logging.getLogger("unused-deps")
+
+_RUN_CACHE_FILE = "run.json"
+_CACHE_VERSION = 1
+# a file modified within this long of its stat being taken could be modified again
+# without changing its mtime on filesystems with coarse timestamps (2s for FAT),
+# so results depending on such files are never stored
+_RACY_WINDOW_NS = 2_000_000_000
+_METADATA_FILES = ("METADATA", "PKG-INFO", "RECORD", "top_level.txt", "requires.txt")
+
+
+class Fingerprint(NamedTuple):
+    digest: str
+    newest_mtime_ns: int
+
+
+class _Hasher:
+    def __init__(self) -> None:
+        self._hash = hashlib.sha256()
+        self.newest_mtime_ns = 0
+
+    def update(self, *values: object) -> None:
+        self._hash.update(repr(values).encode())
+        self._hash.update(b"\0")
+
+    def update_stat(self, path: str) -> bool:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.update(path, None)
+            return False
+
+        self.update(path, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino)
+        self.newest_mtime_ns = max(
+            self.newest_mtime_ns, stat.st_mtime_ns, stat.st_ctime_ns
+        )
+        return True
+
+    def update_contents(self, path: str) -> None:
+        try:
+            with open(path, "rb") as f:
+                self.update(path, hashlib.sha256(f.read()).hexdigest())
+        except OSError:
+            self.update(path, None)
+
+    def fingerprint(self) -> Fingerprint:
+        return Fingerprint(self._hash.hexdigest(), self.newest_mtime_ns)
+
+
+def run_fingerprint(
+    config: Config, environment: Environment, filepaths: Iterable[str]
+) -> Fingerprint:
+    hasher = _Hasher()
+    hasher.update(_CACHE_VERSION, os.getcwd())
+    hasher.update(json.dumps(config._asdict(), sort_keys=True))
+
+    # changes to py-unused-deps itself
+    package_dir = os.path.dirname(__file__)
+    for filename in sorted(os.listdir(package_dir)):
+        if filename.endswith(".py"):
+            hasher.update_stat(os.path.join(package_dir, filename))
+
+    for path in filepaths:
+        hasher.update_stat(path)
+
+    for project in project_configs(config):
+        for requirement_file in project.requirements or ():
+            hasher.update_contents(requirement_file)
+        if project.pyproject is not None:
+            hasher.update_contents(project.pyproject)
+
+    _update_environment(hasher, environment)
+    return hasher.fingerprint()
+
+
+def environment_fingerprint(environment: Environment) -> Fingerprint:
+    # changes whenever a distribution is installed, removed or upgraded
+    hasher = _Hasher()
+    hasher.update(_CACHE_VERSION)
+    _update_environment(hasher, environment)
+    return hasher.fingerprint()
+
+
+def is_cacheable(fingerprint: Fingerprint) -> bool:
+    return fingerprint.newest_mtime_ns < time.time_ns() - _RACY_WINDOW_NS
+
+
+def load_result(
+    cache_dir: str, fingerprint: Fingerprint
+) -> tuple[int, list[str], list[str]] | None:
+    path = os.path.join(cache_dir, _RUN_CACHE_FILE)
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(cached, dict) or cached.get("fingerprint") != fingerprint.digest:
+        logger.debug("No cached result matching this run in: %s", path)
+        return None
+
+    logger.info("Using cached result from: %s", path)
+    return cached["returncode"], cached["stdout"], cached["stderr"]
+
+
+def save_result(
+    cache_dir: str,
+    fingerprint: Fingerprint,
+    returncode: int,
+    stdout: list[str],
+    stderr: list[str],
+) -> None:
+    if not is_cacheable(fingerprint):
+        logger.debug("Not caching result: inputs were modified too recently")
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    write_file_atomic(
+        os.path.join(cache_dir, _RUN_CACHE_FILE),
+        json.dumps(
+            {
+                "fingerprint": fingerprint.digest,
+                "returncode": returncode,
+                "stdout": stdout,
+                "stderr": stderr,
+            }
+        ),
+    )
+
+
+def _update_environment(hasher: _Hasher, environment: Environment) -> None:
+    if environment.path is None:
+        path = sys.path
+        hasher.update(sys.executable, sys.version, sys.platform)
+    else:
+        path = environment.path
+        hasher.update(environment.markers)
+    hasher.update(path)
+
+    for entry in path:
+        if not hasher.update_stat(entry) or not os.path.isdir(entry):
+            continue
+        for name in sorted(os.listdir(entry)):
+            if not name.endswith((".dist-info", ".egg-info")):
+                continue
+            dist_path = os.path.join(entry, name)
+            if os.path.isdir(dist_path):
+                for filename in _METADATA_FILES:
+                    hasher.update_stat(os.path.join(dist_path, filename))
+            else:
+                hasher.update_stat(dist_path)
@@ -1,8 +1,53 @@
+from __future__ import annotations
+
+import os
 import sys
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import importlib.metadata
 
 if sys.version_info >= (3, 11):  # pragma: >=3.11 cover
     import tomllib as toml
 else:  # pragma: <3.11 cover
     import tomli as toml
 
-__all__ = ("toml",)
+
+if sys.version_info >= (3, 10):  # pragma: >=3.10 cover
+
+    def entry_points(group: str) -> importlib.metadata.EntryPoints:
+        # imported here, as reading a config file also imports this module and
+        # importing `importlib.metadata` is slow
+        import importlib.metadata
+
+        return importlib.metadata.entry_points(group=group)
+
+else:  # pragma: <3.10 cover
+
+    def entry_points(group: str) -> list[importlib.metadata.EntryPoint]:
+        import importlib.metadata
+
+        return list(importlib.metadata.entry_points().get(group, ()))
+
+
+if sys.version_info >= (3, 10):  # pragma: >=3.10 cover
+
+    def stdlib_module_names() -> frozenset[str]:
+        return sys.stdlib_module_names
+
+else:  # pragma: <3.10 cover
+
+    def stdlib_module_names() -> frozenset[str]:
+        # approximated by what's installed in the standard library directories
+        import pkgutil
+        import sysconfig
+
+        paths = sysconfig.get_paths()
+        stdlib = [paths["stdlib"], os.path.join(paths["platstdlib"], "lib-dynload")]
+        return frozenset(
+            {module.name for module in pkgutil.iter_modules(stdlib)}
+            | set(sys.builtin_module_names)
+        )
+
+
+__all__ = ("entry_points", "stdlib_module_names", "toml")
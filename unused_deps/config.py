@@ -1,15 +1,16 @@
 from __future__ import annotations
 
-import argparse
 import logging
 import os.path
 from collections.abc import Mapping
 from itertools import chain
-from typing import Dict, NamedTuple, cast
+from typing import TYPE_CHECKING, Any, Dict, NamedTuple, cast
 
-from unused_deps.compat import toml
 from unused_deps.errors import InternalError
 
+if TYPE_CHECKING:
+    import argparse
+
 logger = logging.getLogger("unused-deps")
 
 _CONFIG_LOCATIONS = (
@@ -17,6 +18,21 @@ _CONFIG_LOCATIONS = (
     "pyproject.toml",
 )
 
+# values that can be set per project, the remaining values are shared across
+# all projects in a run
+# with the type of each value
+_PROJECT_FIELDS = {
+    "filepaths": list,
+    "include": list,
+    "exclude": list,
+    "distribution": str,
+    "no_distribution": bool,
+    "pyproject": str,
+    "ignore": list,
+    "extras": list,
+    "requirements": list,
+}
+
 
 class Config(NamedTuple):
     filepaths: list[str]
@@ -24,9 +40,30 @@ class Config(NamedTuple):
     exclude: list[str]
     distribution: str | None = None
     no_distribution: bool = False
+    pyproject: str | None = None
     ignore: list[str] | None = None
     extras: list[str] | None = None
     requirements: list[str] | None = None
+    site_packages: list[str] | None = None
+    python: str | None = None
+    project: list[dict[str, object]] | None = None
+    files_from: str | None = None
+    walk_threads: int | None = None
+    module_level_only: bool = False
+    time_budget: float | None = None
+    shard: str | None = None
+    shard_file: str | None = None
+    cache_dir: str | None = None
+    by_directory: int | None = None
+    check_missing: bool = False
+    transitive: bool = False
+    metrics_file: str | None = None
+    trace_file: str | None = None
+    index_file: str | None = None
+    who_imports: list[str] | None = None
+    imports_in: list[str] | None = None
+    matrix_extras: list[str] | None = None
+    matrix_env: list[str] | None = None
     verbose: int = 0
     config_file: str | None = None
 
@@ -49,7 +86,7 @@ def _merge_args(
 ) -> Config:
     defaults = {
         "verbose": 0,
-        "include": ["*.py", "*.pyi"],
+        "include": ["*.py", "*.pyi", "*.ipynb"],
         "exclude": [
             ".svn",
             "CVS",
@@ -70,18 +107,109 @@ def _merge_args(
     return Config(
         **{
             **defaults,  # type: ignore[arg-type]
-            **{k: v for (k, v) in chain(config_args.items(), cmd_args.items()) if v},
+            **{
+                k: v
+                for (k, v) in chain(config_args.items(), cmd_args.items())
+                if _is_set(v)
+            },
         }
     )
 
 
-def validate_config(config: Config) -> None:
-    if (config.distribution is None and not config.no_distribution) or (
-        config.distribution is not None and config.no_distribution
-    ):
+def _is_set(value: object) -> bool:
+    # a number is set even when 0, so it can be rejected by validate_config
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return True
+    return bool(value)
+
+
+def validate_config(config: Config, command: str = "scan") -> None:
+    if command == "query":
+        if config.index_file is None:
+            raise InternalError("'query' requires '--index-file'")
+        if config.who_imports is None and config.imports_in is None:
+            raise InternalError(
+                "Nothing to query, give '--who-imports' or '--imports-in'"
+            )
+        return
+
+    modes = (
+        config.distribution is not None,
+        config.pyproject is not None,
+        config.no_distribution,
+    )
+    if sum(modes) != 1:
+        raise InternalError(
+            "You must specify exactly one of "
+            "'--distribution', '--pyproject' or '--no-distribution'"
+        )
+    if config.by_directory is not None and config.by_directory < 1:
+        raise InternalError("'--by-directory' must be at least 1")
+    if config.walk_threads is not None and config.walk_threads < 1:
+        raise InternalError("'--walk-threads' must be at least 1")
+    if (config.shard is None) != (config.shard_file is None):
+        raise InternalError("'--shard' and '--shard-file' must be given together")
+    if config.module_level_only and config.shard is not None:
+        raise InternalError("'--module-level-only' can't be used with '--shard'")
+    if config.module_level_only and config.by_directory is not None:
+        raise InternalError("'--module-level-only' can't be used with '--by-directory'")
+    if config.module_level_only and config.check_missing:
         raise InternalError(
-            "You must specify exactly one of '--distribution' or '--no-distribution'"
+            "'--module-level-only' can't be used with '--check-missing'"
         )
+    if config.time_budget is not None:
+        if config.time_budget <= 0:
+            raise InternalError("'--time-budget' must be greater than 0")
+        for option, value in (
+            ("--shard", config.shard),
+            ("--by-directory", config.by_directory),
+            ("--module-level-only", config.module_level_only or None),
+        ):
+            if value is not None:
+                raise InternalError(f"'--time-budget' can't be used with '{option}'")
+    if config.extras is not None and config.matrix_extras is not None:
+        raise InternalError("'--extra' and '--matrix-extras' can't be used together")
+
+
+def project_configs(config: Config) -> list[Config]:
+    if config.project is None:
+        return [config]
+
+    projects = []
+    for project in config.project:
+        if not isinstance(project, Mapping):
+            raise InternalError(f"Invalid project configuration: {project!r}")
+        invalid_keys = tuple(key for key in project if key not in _PROJECT_FIELDS)
+        if invalid_keys:
+            raise InternalError(
+                "Unknown project configuration values: " + "\n".join(invalid_keys)
+            )
+        for key, value in project.items():
+            if not _is_project_value(key, value):
+                raise InternalError(
+                    f"Invalid project configuration value for '{key}': {value!r}"
+                )
+        projects.append(config._replace(project=None, **cast(Dict[str, Any], project)))
+
+    if not projects:
+        raise InternalError("No projects configured")
+
+    return projects
+
+
+def _is_project_value(key: str, value: object) -> bool:
+    expected = _PROJECT_FIELDS[key]
+    if not isinstance(value, expected):
+        return False
+    return not isinstance(value, list) or all(isinstance(v, str) for v in value)
+
+
+def project_label(config: Config) -> str:
+    if config.distribution is not None:
+        return config.distribution
+    if config.pyproject is not None:
+        return config.pyproject
+    return ", ".join(config.filepaths)
 
 
 def load_config_from_file(path: str | None) -> dict[str, object] | None:
@@ -102,6 +230,9 @@ def load_config_from_file(path: str | None) -> dict[str, object] | None:
 
 
 def _read_config(path: str) -> dict[str, object] | None:
+    # not needed unless there's a config file to read
+    from unused_deps.compat import toml
+
     with open(path, "rb") as f:
         try:
             toml_data = toml.load(f)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from array import array
+from collections.abc import Iterable, Sequence
+
+from packaging.utils import canonicalize_name
+
+from unused_deps.cache import environment_fingerprint, is_cacheable
+from unused_deps.dist_info import dependency_requirements, named_distributions
+from unused_deps.environment import Environment
+from unused_deps.files import write_file_atomic
+
+logger = logging.getLogger("unused-deps")
+
+_GRAPH_FILE = "dependency-graph.json"
+_GRAPH_VERSION = 1
+
+
+class DependencyGraph:
+    # the installed distributions and which others each one requires, with the
+    # nodes numbered and the edges of node `n` stored as
+    # `targets[offsets[n]:offsets[n + 1]]`. An extra of a distribution is a node
+    # of its own, named `name[extra]`, which requires the distribution along with
+    # the requirements of the extra
+    def __init__(self, names: list[str], offsets: array[int], targets: array[int]):
+        self.names = names
+        self.offsets = offsets
+        self.targets = targets
+        self._ids: dict[str, int] = {}
+        self._extras: dict[int, list[int]] = {}
+        for node, name in enumerate(names):
+            base_name, _, extra = name.partition("[")
+            if extra:
+                self._ids[_node_key(base_name, extra[:-1])] = node
+                base = self._ids[_node_key(base_name, "")]
+                self._extras.setdefault(base, []).append(node)
+            else:
+                self._ids[_node_key(name, "")] = node
+        self._reverse: DependencyGraph | None = None
+
+    def node(self, name: str, extra: str = "") -> int | None:
+        return self._ids.get(_node_key(name, extra))
+
+    def is_extra(self, node: int) -> bool:
+        return self.names[node].endswith("]")
+
+    def requires(self, node: int) -> Sequence[int]:
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return self.targets[start:end]
+
+    def reachable(
+        self, sources: Iterable[int], *, avoiding: int | None = None
+    ) -> set[int]:
+        # every node reachable from `sources`, including themselves, without
+        # passing through the distribution `avoiding` or any of its extras
+        seen = bytearray(len(self.names))
+        if avoiding is not None:
+            seen[avoiding] = 1
+            for extra in self._extras.get(avoiding, ()):
+                seen[extra] = 1
+        stack = [node for node in sources if not seen[node]]
+        for node in stack:
+            seen[node] = 1
+        reached = set(stack)
+        while stack:
+            for target in self.requires(stack.pop()):
+                if not seen[target]:
+                    seen[target] = 1
+                    reached.add(target)
+                    stack.append(target)
+        return reached
+
+    def required_by(self, node: int, candidates: Iterable[int]) -> list[int]:
+        # which of `candidates` require `node`, directly or not, other than `node`
+        # and its extras
+        if self._reverse is None:
+            self._reverse = self._reversed()
+        ancestors = self._reverse.reachable((node,))
+        own = {node, *self._extras.get(node, ())}
+        return [
+            candidate
+            for candidate in candidates
+            if candidate not in own and candidate in ancestors
+        ]
+
+    def only_reachable_through(self, node: int, roots: Iterable[int]) -> list[int]:
+        # the distributions that `roots` only require through `node`, i.e. that
+        # would no longer be required without it. `roots` can include extras of
+        # `node`, which are followed from it
+        roots = list(roots)
+        own = {node, *self._extras.get(node, ())}
+        without = self.reachable(roots, avoiding=node)
+        through = self.reachable(root for root in roots if root in own) - without
+        through -= own
+        return sorted(
+            (target for target in through if not self.is_extra(target)),
+            key=self.names.__getitem__,
+        )
+
+    def _reversed(self) -> DependencyGraph:
+        sources: list[list[int]] = [[] for _ in self.names]
+        for node in range(len(self.names)):
+            for target in self.requires(node):
+                sources[target].append(node)
+        return _from_adjacency(self.names, sources)
+
+
+def build_dependency_graph(environment: Environment) -> DependencyGraph:
+    dists = sorted(
+        named_distributions(environment), key=lambda item: canonicalize_name(item[0])
+    )
+    names = [dist_name for dist_name, _ in dists]
+    ids = {_node_key(dist_name, ""): node for node, dist_name in enumerate(names)}
+    adjacency: list[list[int]] = [[] for _ in names]
+
+    def node(name: str, extra: str) -> int:
+        key = _node_key(name, extra)
+        try:
+            return ids[key]
+        except KeyError:
+            # the first time an extra is seen
+            base = ids[_node_key(name, "")]
+            extra_node = ids[key] = len(names)
+            names.append(f"{names[base]}[{canonicalize_name(extra)}]")
+            adjacency.append([base])
+            return extra_node
+
+    for dist_name, dist in dists:
+        for extra, required, required_extras in dependency_requirements(
+            dist, environment
+        ):
+            if _node_key(required, "") not in ids:
+                # not installed
+                continue
+            source = node(dist_name, extra)
+            for required_extra in sorted(required_extras) or [""]:
+                adjacency[source].append(node(required, required_extra))
+
+    return _from_adjacency(names, adjacency)
+
+
+def load_dependency_graph(
+    environment: Environment, cache_dir: str | None
+) -> DependencyGraph:
+    # the graph is cached for as long as the environment doesn't change
+    if cache_dir is None:
+        return build_dependency_graph(environment)
+
+    fingerprint = environment_fingerprint(environment)
+    path = os.path.join(cache_dir, _GRAPH_FILE)
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = None
+
+    if (
+        isinstance(cached, dict)
+        and cached.get("version") == _GRAPH_VERSION
+        and cached.get("fingerprint") == fingerprint.digest
+    ):
+        logger.info("Using cached dependency graph from: %s", path)
+        return DependencyGraph(
+            cached["names"],
+            array("l", cached["offsets"]),
+            array("l", cached["targets"]),
+        )
+
+    graph = build_dependency_graph(environment)
+    if is_cacheable(fingerprint):
+        os.makedirs(cache_dir, exist_ok=True)
+        write_file_atomic(
+            path,
+            json.dumps(
+                {
+                    "version": _GRAPH_VERSION,
+                    "fingerprint": fingerprint.digest,
+                    "names": graph.names,
+                    "offsets": graph.offsets.tolist(),
+                    "targets": graph.targets.tolist(),
+                }
+            ),
+        )
+    return graph
+
+
+def _node_key(name: str, extra: str) -> str:
+    if not extra:
+        return canonicalize_name(name)
+    return f"{canonicalize_name(name)}[{canonicalize_name(extra)}]"
+
+
+def _from_adjacency(names: list[str], adjacency: list[list[int]]) -> DependencyGraph:
+    offsets = array("l", [0])
+    targets = array("l")
+    for node_targets in adjacency:
+        targets.extend(node_targets)
+        offsets.append(len(targets))
+    return DependencyGraph(names, offsets, targets)
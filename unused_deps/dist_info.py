@@ -1,13 +1,28 @@
 from __future__ import annotations
 
+import csv
+import functools
 import importlib.metadata
 import logging
+import re
+import time
 from collections.abc import Generator, Iterable
 
+from packaging.markers import Marker
 from packaging.requirements import InvalidRequirement, Requirement
+from packaging.utils import canonicalize_name
+
+from unused_deps.environment import Environment
+from unused_deps.hooks import HOOKS
 
 logger = logging.getLogger("unused-deps")
 
+_EXTRA_MARKER = re.compile(r"""\bextra\s*==\s*["']([^"']+)["']""")
+
+# by the path of the dist-info directory, as a new `Distribution` is made for the
+# same distribution on every lookup
+_top_level_inferred_cache: dict[str, frozenset[str]] = {}
+
 
 # swapping the order of https://github.com/python/cpython/blob/e8165d47b852e933c176209ddc0b5836a9b0d5f4/Lib/importlib/metadata/__init__.py#L1058
 def distribution_packages(
@@ -20,15 +35,144 @@ def distribution_packages(
         yield from _top_level_inferred(dist)
 
 
+def cache_stats() -> dict[str, tuple[int, int]]:
+    return {
+        name: (info.hits, info.misses)
+        for name, info in (
+            ("requirements", _intern_requirement.cache_info()),
+            ("markers", _evaluate_marker.cache_info()),
+        )
+    }
+
+
+def clear_caches() -> None:
+    _intern_requirement.cache_clear()
+    _evaluate_marker.cache_clear()
+    _top_level_inferred_cache.clear()
+
+
+def distribution_name(dist: importlib.metadata.Distribution) -> str:
+    name = _declared_name(dist)
+    if name is not None:
+        return name
+
+    return dist.metadata["Name"]
+
+
+def find_distribution(
+    name: str, environment: Environment = Environment()
+) -> importlib.metadata.Distribution:
+    if HOOKS.distribution_lookup is None:
+        return _find_distribution(name, environment)
+
+    start = time.perf_counter()
+    try:
+        return _find_distribution(name, environment)
+    finally:
+        HOOKS.distribution_lookup(name, time.perf_counter() - start)
+
+
+def _find_distribution(
+    name: str, environment: Environment
+) -> importlib.metadata.Distribution:
+    if environment.path is None:
+        return importlib.metadata.Distribution.from_name(name)
+
+    # only consult the path based finder: any other finders installed are for the
+    # current interpreter, not the environment being inspected
+    context = importlib.metadata.DistributionFinder.Context(
+        name=name, path=environment.path
+    )
+    for dist in importlib.metadata.MetadataPathFinder.find_distributions(context):
+        return dist
+    raise importlib.metadata.PackageNotFoundError(name)
+
+
+def installed_distributions(
+    environment: Environment = Environment(),
+) -> Iterable[importlib.metadata.Distribution]:
+    if environment.path is None:
+        return importlib.metadata.distributions()
+
+    context = importlib.metadata.DistributionFinder.Context(path=environment.path)
+    return importlib.metadata.MetadataPathFinder.find_distributions(context)
+
+
+def named_distributions(
+    environment: Environment = Environment(),
+) -> Generator[tuple[str, importlib.metadata.Distribution]]:
+    # each distribution that would be found by name, with its name
+    seen = set()
+    for dist in installed_distributions(environment):
+        dist_name = _declared_name(dist)
+        if dist_name is None:
+            # broken metadata, e.g. a leftover directory from an uninstall
+            continue
+        key = canonicalize_name(dist_name)
+        if key in seen:
+            # shadowed by the same distribution earlier on the path
+            continue
+        seen.add(key)
+        yield dist_name, dist
+
+
+def module_distributions(
+    environment: Environment = Environment(),
+) -> dict[str, tuple[str, ...]]:
+    # the reverse of `distribution_packages` for every installed distribution:
+    # the names of the distributions providing each top level module
+    modules: dict[str, list[str]] = {}
+    for dist_name, dist in named_distributions(environment):
+        for module in distribution_packages(dist):
+            modules.setdefault(module, []).append(dist_name)
+
+    return {module: tuple(sorted(dist_names)) for module, dist_names in modules.items()}
+
+
+def dependency_requirements(
+    dist: importlib.metadata.Distribution, environment: Environment = Environment()
+) -> Generator[tuple[str, str, frozenset[str]]]:
+    # each requirement of `dist` that applies in the environment, as the extra of
+    # `dist` it's required with ("" when it's always required), the name of the
+    # required distribution, and the extras it's required with
+    markers = tuple(sorted((environment.markers or {}).items()))
+    for raw_requirement in dist.requires or ():
+        try:
+            requirement = _intern_requirement(raw_requirement)
+        except InvalidRequirement as e:
+            logger.debug("Skipping requirement %s: %s", raw_requirement, e)
+            continue
+
+        extras = ("",)
+        if requirement.marker is not None:
+            extras += tuple(_EXTRA_MARKER.findall(str(requirement.marker)))
+        for extra in extras:
+            if requirement.marker is None or _evaluate_marker(
+                requirement.marker, extra, markers
+            ):
+                yield extra, requirement.name, frozenset(requirement.extras)
+                if not extra:
+                    # required whatever the extras
+                    break
+
+
 def required_dists(
     dist: importlib.metadata.Distribution,
     extras: Iterable[str] | None,
+    environment: Environment = Environment(),
+    *,
+    requested_extras: dict[str, set[str]] | None = None,
 ) -> Generator[importlib.metadata.Distribution]:
     if dist.requires is None:
         return
 
     for raw_requirement in dist.requires:
-        req_dist = _dist_from_requirement(Requirement(raw_requirement), extras)
+        req_dist = _dist_from_requirement(
+            _intern_requirement(raw_requirement),
+            extras,
+            environment,
+            requested_extras,
+        )
         if req_dist is not None:
             yield req_dist
 
@@ -36,20 +180,63 @@ def required_dists(
 def parse_requirement(
     raw_requirement: str,
     extras: Iterable[str] | None,
+    environment: Environment = Environment(),
+    *,
+    requested_extras: dict[str, set[str]] | None = None,
 ) -> importlib.metadata.Distribution | None:
     raw_requirement = raw_requirement.lstrip()
     if raw_requirement.startswith("#"):
         return None
 
     try:
-        requirement = Requirement(raw_requirement)
+        requirement = _intern_requirement(raw_requirement)
     except InvalidRequirement as e:
         # requirement.txt format used by pip supports a lot more than just a list of requirements,
         # but we don't want to try to handle all these https://pip.pypa.io/en/stable/reference/requirements-file-format/
         logger.debug("Skipping requirement %s: %s", raw_requirement, e)
+        if HOOKS.requirement_skipped is not None and raw_requirement:
+            HOOKS.requirement_skipped(raw_requirement, f"invalid requirement: {e}")
         return None
     else:
-        return _dist_from_requirement(requirement, extras)
+        return _dist_from_requirement(
+            requirement, extras, environment, requested_extras
+        )
+
+
+# the same requirements are repeated across distributions and requirements files,
+# and parsing them with `packaging` isn't cheap, so only do it once per string
+@functools.lru_cache(maxsize=None)
+def _intern_requirement(raw_requirement: str) -> Requirement:
+    return Requirement(raw_requirement)
+
+
+@functools.lru_cache(maxsize=None)
+def _evaluate_marker(
+    marker: Marker, extra: str, markers: tuple[tuple[str, str], ...]
+) -> bool:
+    return marker.evaluate({**dict(markers), "extra": extra})
+
+
+def _declared_name(dist: importlib.metadata.Distribution) -> str | None:
+    # `dist.metadata` parses the entire file as an email message, including the
+    # (potentially large) long description in its body, but only a single header
+    # is needed here
+    text = dist.read_text("METADATA") or dist.read_text("PKG-INFO")
+    if text is None:
+        return None
+    return _name_from_headers(text)
+
+
+def _name_from_headers(text: str) -> str | None:
+    headers_end = text.find("\n\n")
+    if headers_end != -1:
+        text = text[:headers_end]
+
+    for line in text.splitlines():
+        key, sep, value = line.partition(":")
+        if sep and key.lower() == "name":
+            return value.strip()
+    return None
 
 
 def _top_level_declared(dist: importlib.metadata.Distribution) -> list[str]:
@@ -60,38 +247,97 @@ def _top_level_declared(dist: importlib.metadata.Distribution) -> list[str]:
     return top_level.split()
 
 
-def _top_level_inferred(dist: importlib.metadata.Distribution) -> set[str]:
+def _top_level_inferred(dist: importlib.metadata.Distribution) -> frozenset[str]:
+    key = None
+    if isinstance(dist, importlib.metadata.PathDistribution):
+        key = str(dist._path)
+        try:
+            return _top_level_inferred_cache[key]
+        except KeyError:
+            pass
+
+    record = dist.read_text("RECORD")
+    if record is not None:
+        top_level = _top_level_from_record(record)
+    else:
+        # no RECORD, e.g. an egg-info distribution: fall back to whatever
+        # importlib.metadata can find
+        top_level = _top_level_from_files(dist)
+
+    if key is not None:
+        _top_level_inferred_cache[key] = top_level
+    return top_level
+
+
+def _top_level_from_record(record: str) -> frozenset[str]:
+    # RECORD files can be huge, so rather than going through `dist.files`,
+    # which builds a `PackagePath` for each entry, work on the raw lines
+    top_level = set()
+    for line in record.splitlines():
+        if line.startswith('"'):
+            # only paths containing a comma (or quote) need quoting
+            path = next(csv.reader((line,)))[0]
+        else:
+            path = line.partition(",")[0]
+
+        if not path.endswith(".py"):
+            continue
+
+        head, sep, _ = path.partition("/")
+        top_level.add(head if sep else head[: -len(".py")])
+
+    return frozenset(top_level)
+
+
+def _top_level_from_files(dist: importlib.metadata.Distribution) -> frozenset[str]:
     if not dist.files:
-        return set()
+        return frozenset()
 
-    return {
+    return frozenset(
         f.parts[0] if len(f.parts) > 1 else f.with_suffix("").name
         for f in dist.files
         if f.suffix == ".py"
-    }
+    )
 
 
 def _dist_from_requirement(
     requirement: Requirement,
     extras: Iterable[str] | None,
+    environment: Environment,
+    requested_extras: dict[str, set[str]] | None = None,
 ) -> importlib.metadata.Distribution | None:
+    # the requirement is added to `requested_extras` under its canonical name even
+    # when it's skipped, and the extras it asks for once it's resolved
+    if requested_extras is not None:
+        requested_extras.setdefault(canonicalize_name(requirement.name), set())
     try:
-        req_dist = importlib.metadata.Distribution.from_name(requirement.name)
+        req_dist = find_distribution(requirement.name, environment)
     except importlib.metadata.PackageNotFoundError:
         logger.info("Cannot import %s, skipping", requirement.name)
+        if HOOKS.requirement_skipped is not None:
+            HOOKS.requirement_skipped(requirement.name, "not installed")
         return None
 
     if requirement.marker is not None:
         if extras is None:
             extras = ("",)
 
-        if any(requirement.marker.evaluate({"extra": extra}) for extra in extras):
-            return req_dist
-        else:
+        markers = tuple(sorted((environment.markers or {}).items()))
+        if not any(
+            _evaluate_marker(requirement.marker, extra, markers) for extra in extras
+        ):
             logger.info(
                 "%s is not valid for the current environment, skipping",
                 requirement.name,
             )
+            if HOOKS.requirement_skipped is not None:
+                HOOKS.requirement_skipped(
+                    requirement.name, "not valid for the environment"
+                )
             return None
-    else:
-        return req_dist
+
+    if requested_extras is not None:
+        requested_extras[canonicalize_name(requirement.name)].update(requirement.extras)
+    if HOOKS.distribution_resolved is not None:
+        HOOKS.distribution_resolved(requirement.name, req_dist)
+    return req_dist
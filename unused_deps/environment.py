@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import logging
+import os.path
+from collections.abc import Sequence
+from typing import NamedTuple
+
+from unused_deps.errors import InternalError
+
+logger = logging.getLogger("unused-deps")
+
+# Mirrors `packaging.markers.default_environment` using only the standard library,
+# since `packaging` isn't necessarily installed for the target interpreter
+_INTERPRETER_INFO_SCRIPT = """\
+import json, os, platform, sys
+
+def format_full_version(info):
+    version = "{0.major}.{0.minor}.{0.micro}".format(info)
+    if info.releaselevel != "final":
+        version += info.releaselevel[0] + str(info.serial)
+    return version
+
+iver = format_full_version(sys.implementation.version)
+markers = {
+    "implementation_name": sys.implementation.name,
+    "implementation_version": iver,
+    "os_name": os.name,
+    "platform_machine": platform.machine(),
+    "platform_release": platform.release(),
+    "platform_system": platform.system(),
+    "platform_version": platform.version(),
+    "python_full_version": platform.python_version(),
+    "platform_python_implementation": platform.python_implementation(),
+    "python_version": ".".join(platform.python_version_tuple()[:2]),
+    "sys_platform": sys.platform,
+}
+print(json.dumps({"path": [p for p in sys.path if p], "markers": markers}))
+"""
+
+
+# Where to look for installed distributions and how to evaluate requirement markers,
+# `None` for either means: use the running interpreter
+class Environment(NamedTuple):
+    path: list[str] | None = None
+    markers: dict[str, str] | None = None
+
+
+def load_environment(
+    site_packages: Sequence[str] | None, python: str | None
+) -> Environment:
+    if site_packages is None and python is None:
+        return Environment()
+
+    path: list[str] = []
+    for site_dir in site_packages or ():
+        if not os.path.isdir(site_dir):
+            raise InternalError(
+                f"Can't read site-packages '{site_dir}': directory doesn't exist"
+            )
+        path.append(site_dir)
+
+    markers = None
+    if python is not None:
+        interpreter_path, markers = _interpreter_environment(python)
+        path.extend(interpreter_path)
+
+    logger.debug("Searching for distributions in: %s", path)
+    return Environment(path=path, markers=markers)
+
+
+def _interpreter_environment(python: str) -> tuple[list[str], dict[str, str]]:
+    import subprocess
+
+    try:
+        proc = subprocess.run(
+            (python, "-c", _INTERPRETER_INFO_SCRIPT),
+            capture_output=True,
+            text=True,
+        )
+    except OSError as e:
+        raise InternalError(f"Failed to run interpreter '{python}': {e}")
+
+    if proc.returncode != 0:
+        raise InternalError(
+            f"Failed to query interpreter '{python}': {proc.stderr.strip()}"
+        )
+
+    info = json.loads(proc.stdout)
+    return info["path"], info["markers"]
@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-import traceback
-
 
 class InternalError(Exception):
     pass
@@ -13,6 +11,8 @@ def log_error(exc: Exception) -> tuple[int, str]:
     elif isinstance(exc, KeyboardInterrupt):
         return 130, "Interrupted (^C)"
     else:
+        import traceback
+
         return (
             2,
             f"Fatal: unexpected error: '{exc}'\n"
@@ -1,44 +1,262 @@
 from __future__ import annotations
 
+import functools
 import logging
 import os
-from collections.abc import Generator, Sequence
+import sys
+import time
+from collections.abc import Callable, Generator, Iterable, Sequence
 from fnmatch import fnmatch
+from typing import TYPE_CHECKING
 
 from unused_deps.errors import InternalError
+from unused_deps.hooks import HOOKS
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
 
 logger = logging.getLogger("unused-deps")
 
+_FILE_LIST_CHUNK_SIZE = 64 * 1024
+
+# the sub-directories and files in a directory
+_Listing = tuple[list[str], list[str]]
+
 
 def find_files(
-    path: str, *, exclude: Sequence[str], include: Sequence[str]
+    path: str,
+    *,
+    exclude: Sequence[str],
+    include: Sequence[str],
+    seen: set[tuple[int, int]] | None = None,
+    threads: int | None = None,
+) -> Generator[str]:
+    # `seen` holds the (st_dev, st_ino) of every file and directory found so far,
+    # sharing it between calls finds files reached through overlapping paths once
+    if seen is None:
+        seen = set()
+
+    if threads is None:
+        yield from _find_files(path, exclude, include, seen, None)
+    else:
+        # only needed when listing in parallel
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            yield from _find_files(path, exclude, include, seen, executor)
+
+
+def _find_files(
+    path: str,
+    exclude: Sequence[str],
+    include: Sequence[str],
+    seen: set[tuple[int, int]],
+    executor: Executor | None,
+) -> Generator[str]:
+    for filename in _walk_path(path, exclude, seen, executor):
+        if _include(filename, include) and _first_visit(filename, seen):
+            if HOOKS.file_discovered is not None:
+                HOOKS.file_discovered(filename)
+            yield filename
+
+
+def read_file_list(path: str) -> Generator[str]:
+    try:
+        if path == "-":
+            yield from _split_file_list(sys.stdin.buffer.fileno())
+        else:
+            with open(path, "rb") as f:
+                yield from _split_file_list(f.fileno())
+    except OSError as e:
+        raise InternalError(f"Can't read file list '{path}': {e}")
+
+
+def _split_file_list(fd: int) -> Generator[str]:
+    # read with `os.read` since it returns whatever is available rather than
+    # waiting for a full chunk, so paths are passed on as the producer writes them.
+    # The separator is whichever of NUL or newline is seen first
+    separator = None
+    buffer = b""
+    while True:
+        chunk = os.read(fd, _FILE_LIST_CHUNK_SIZE)
+        buffer += chunk
+        if separator is None:
+            nul, newline = buffer.find(b"\0"), buffer.find(b"\n")
+            if nul != -1 and (newline == -1 or nul < newline):
+                separator = b"\0"
+            elif newline != -1:
+                separator = b"\n"
+
+        if separator is not None:
+            *paths, buffer = buffer.split(separator)
+        else:
+            paths = []
+        if not chunk:
+            paths.append(buffer)
+
+        for path in paths:
+            if separator != b"\0":
+                path = path.rstrip(b"\r")
+            if path:
+                yield os.fsdecode(path)
+
+        if not chunk:
+            return
+
+
+def filter_files(
+    paths: Iterable[str],
+    *,
+    exclude: Sequence[str],
+    include: Sequence[str],
+    seen: set[tuple[int, int]] | None = None,
 ) -> Generator[str]:
-    return (
-        filename
-        for filename in _walk_path(path, exclude)
-        if _include(filename, include)
+    # for lists of files found elsewhere (e.g. `git ls-files`), so unlike with
+    # `find_files` the directories containing each file haven't been checked
+    if seen is None:
+        seen = set()
+    excluded_directories: dict[str, bool] = {}
+    for path in paths:
+        if _exclude(path, exclude) or _excluded_directory(
+            _relative_directory(path), exclude, excluded_directories
+        ):
+            logger.debug("Excluding file: %s", path)
+            if HOOKS.file_excluded is not None:
+                HOOKS.file_excluded(path)
+        elif not _include(path, include):
+            continue
+        elif not os.path.isfile(path):
+            logger.warning("Skipping '%s': not a file", path)
+        elif _first_visit(path, seen):
+            if HOOKS.file_discovered is not None:
+                HOOKS.file_discovered(path)
+            yield path
+
+
+def _relative_directory(path: str) -> str:
+    try:
+        return os.path.relpath(os.path.dirname(os.path.abspath(path)))
+    except ValueError:  # pragma: no cover
+        # on another drive, only on Windows
+        return os.pardir
+
+
+def _excluded_directory(
+    directory: str, exclude: Sequence[str], cache: dict[str, bool]
+) -> bool:
+    # as `find_files` never checks the directories above the one it's given, only
+    # the directories below the current one are checked
+    if (
+        directory == os.curdir
+        or directory == os.pardir
+        or directory.startswith(os.pardir + os.sep)
+    ):
+        return False
+    try:
+        return cache[directory]
+    except KeyError:
+        pass
+
+    excluded = cache[directory] = _exclude(directory, exclude) or _excluded_directory(
+        os.path.dirname(directory) or os.curdir, exclude, cache
     )
+    return excluded
 
 
-def _walk_path(path: str, exclude: Sequence[str]) -> Generator[str]:
+def _walk_path(
+    path: str,
+    exclude: Sequence[str],
+    seen: set[tuple[int, int]],
+    executor: Executor | None,
+) -> Generator[str]:
     if not os.path.exists(path):
         raise InternalError(f"Can't scan '{path}': file doesn't exist")
-    if os.path.isdir(path):
-        for root, sub_directories, files in os.walk(path):
-            for directory in tuple(sub_directories):
-                joined = os.path.join(root, directory)
-                if _exclude(joined, exclude):
-                    logger.debug("Excluding directory: %s", joined)
-                    sub_directories.remove(directory)
-
-            for filename in files:
-                joined = os.path.join(root, filename)
-                if not _exclude(joined, exclude):
-                    yield joined
-                else:
-                    logger.debug("Excluding file: %s", joined)
-    else:
+    if not os.path.isdir(path):
         yield path
+        return
+    if not _first_visit(path, seen):
+        logger.debug("Skipping already scanned directory: %s", path)
+        return
+
+    # the same top-down, depth first order as `os.walk`. With an executor, the
+    # listing of each directory is started as soon as its parent is listed, so
+    # siblings are listed in parallel while the tree is still walked in order
+    stack = [(path, _start_listing(path, executor))]
+    while stack:
+        root, listing = stack.pop()
+        sub_directories, files = listing()
+
+        children = []
+        for directory in sub_directories:
+            joined = os.path.join(root, directory)
+            if _exclude(joined, exclude):
+                logger.debug("Excluding directory: %s", joined)
+                if HOOKS.file_excluded is not None:
+                    HOOKS.file_excluded(joined)
+            elif not _first_visit(joined, seen):
+                logger.debug("Skipping already scanned directory: %s", joined)
+            else:
+                children.append((joined, _start_listing(joined, executor)))
+
+        for filename in files:
+            joined = os.path.join(root, filename)
+            if not _exclude(joined, exclude):
+                yield joined
+            else:
+                logger.debug("Excluding file: %s", joined)
+                if HOOKS.file_excluded is not None:
+                    HOOKS.file_excluded(joined)
+
+        stack.extend(reversed(children))
+
+
+def _start_listing(directory: str, executor: Executor | None) -> Callable[[], _Listing]:
+    if executor is None:
+        return functools.partial(_list_directory, directory)
+    return executor.submit(_list_directory, directory).result
+
+
+def _list_directory(directory: str) -> _Listing:
+    if HOOKS.directory_listed is None:
+        return _scan_directory(directory)
+
+    start = time.perf_counter()
+    sub_directories, files = _scan_directory(directory)
+    HOOKS.directory_listed(
+        directory, time.perf_counter() - start, len(sub_directories) + len(files)
+    )
+    return sub_directories, files
+
+
+def _scan_directory(directory: str) -> _Listing:
+    sub_directories: list[str] = []
+    files: list[str] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    sub_directories.append(entry.name)
+                elif not entry.is_dir():
+                    # as with `os.walk`, symlinks to directories aren't followed
+                    files.append(entry.name)
+    except OSError:
+        # as with `os.walk`, directories that can't be listed are skipped
+        pass
+    return sub_directories, files
+
+
+def _first_visit(path: str, seen: set[tuple[int, int]]) -> bool:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        # e.g. a dangling symlink, leave reporting this to whatever reads it
+        return True
+
+    key = (stat.st_dev, stat.st_ino)
+    if key in seen:
+        return False
+    seen.add(key)
+    return True
 
 
 def _include(path: str, globs: Sequence[str]) -> bool:
@@ -52,3 +270,30 @@ def _exclude(path: str, exclude: Sequence[str]) -> bool:
     return any(
         fnmatch(basename, pattern) or fnmatch(abs_path, pattern) for pattern in exclude
     )
+
+
+@functools.lru_cache(maxsize=None)
+def _umask() -> int:
+    # it can only be read by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def write_file_atomic(path: str, contents: str) -> None:
+    import tempfile
+
+    # so anything reading the file never sees it half written
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(contents)
+        # `mkstemp` only lets the owner read it, but e.g. a metrics file is
+        # usually read by another user, so give it the mode of any new file
+        os.chmod(tmp_path, 0o666 & ~_umask())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import functools
+import importlib.metadata
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from unused_deps.errors import InternalError
+
+logger = logging.getLogger("unused-deps")
+
+_ENTRY_POINT_GROUP = "py_unused_deps.hooks"
+_entry_points_loaded = False
+
+
+class Hooks:
+    # each event is `None` until a handler is registered for it, so an event
+    # without handlers costs a single attribute check where it's raised:
+    #
+    #     if HOOKS.file_parsed is not None:
+    #         HOOKS.file_parsed(path, duration, import_count)
+    #
+    # handlers may be called from threads other than the main thread
+    __slots__ = (
+        # (stage name, duration in seconds)
+        "stage",
+        # (path, duration in seconds, number of entries)
+        "directory_listed",
+        # (path)
+        "file_discovered",
+        # (path): a file or directory matching an exclude pattern
+        "file_excluded",
+        # (path, duration in seconds, number of top-level modules imported)
+        "file_parsed",
+        # (distribution name, duration in seconds): whether it's found or not
+        "distribution_lookup",
+        # (requirement name, distribution)
+        "distribution_resolved",
+        # (requirement, reason)
+        "requirement_skipped",
+        "_handlers",
+    )
+
+    def __init__(self) -> None:
+        self.stage: Callable[[str, float], None] | None = None
+        self.directory_listed: Callable[[str, float, int], None] | None = None
+        self.file_discovered: Callable[[str], None] | None = None
+        self.file_excluded: Callable[[str], None] | None = None
+        self.file_parsed: Callable[[str, float, int], None] | None = None
+        self.distribution_lookup: Callable[[str, float], None] | None = None
+        self.distribution_resolved: (
+            Callable[[str, importlib.metadata.Distribution], None] | None
+        ) = None
+        self.requirement_skipped: Callable[[str, str], None] | None = None
+        self._handlers: dict[str, list[Callable[..., None]]] = {}
+
+    def register(self, event: str, handler: Callable[..., None]) -> None:
+        handlers = self._event_handlers(event)
+        handlers.append(handler)
+        self._update(event, handlers)
+
+    def unregister(self, event: str, handler: Callable[..., None]) -> None:
+        handlers = self._event_handlers(event)
+        handlers.remove(handler)
+        self._update(event, handlers)
+
+    def _event_handlers(self, event: str) -> list[Callable[..., None]]:
+        if event.startswith("_") or event not in self.__slots__:
+            raise ValueError(f"Unknown hook event: {event}")
+        return self._handlers.setdefault(event, [])
+
+    def _update(self, event: str, handlers: list[Callable[..., None]]) -> None:
+        if not handlers:
+            setattr(self, event, None)
+        elif len(handlers) == 1:
+            setattr(self, event, handlers[0])
+        else:
+            setattr(self, event, functools.partial(_call_all, tuple(handlers)))
+
+
+def _call_all(handlers: tuple[Callable[..., None], ...], *args: Any) -> None:
+    for handler in handlers:
+        handler(*args)
+
+
+HOOKS = Hooks()
+
+
+def load_entry_points() -> None:
+    # each entry point is a function called with `HOOKS` to register its handlers
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+
+    from unused_deps.compat import entry_points
+
+    for entry_point in entry_points(_ENTRY_POINT_GROUP):
+        logger.debug("Loading hooks from: %s", entry_point.value)
+        try:
+            setup = entry_point.load()
+        except Exception as e:
+            raise InternalError(f"Failed to load hooks from '{entry_point.value}': {e}")
+        setup(HOOKS)
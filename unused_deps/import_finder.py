@@ -2,25 +2,116 @@ from __future__ import annotations
 
 import ast
 import logging
-from collections.abc import Generator
+import tokenize
+from collections.abc import Generator, Iterator
+
+from unused_deps.notebook import notebook_code
 
 logger = logging.getLogger("unused-deps")
 
+# tokens that don't start a statement
+_SKIPPED_TOKENS = frozenset(
+    (
+        tokenize.COMMENT,
+        tokenize.NL,
+        tokenize.INDENT,
+        tokenize.DEDENT,
+        tokenize.ENCODING,
+    )
+)
+
+
+def get_import_bases(path: str, *, module_level_only: bool = False) -> Generator[str]:
+    imports = get_module_level_imports(path) if module_level_only else get_imports(path)
+    for _, module in imports:
+        yield module.partition(".")[0]
+
 
-def get_import_bases(path: str) -> Generator[str]:
+def get_imports(path: str) -> Generator[tuple[int, str]]:
     logger.debug("Reading imports from: %s", path)
+    if str(path).endswith(".ipynb"):
+        yield from _notebook_imports(path)
+        return
+
     with open(path) as f:
         file_contents = f.read()
 
-    module = ast.parse(file_contents, str(path))
+    yield from _module_imports(ast.parse(file_contents, str(path)))
+
+
+def get_module_level_imports(path: str) -> Generator[tuple[int, str]]:
+    # only the imports before the first statement that isn't an import or a
+    # docstring, the rest of the file isn't read
+    if str(path).endswith(".ipynb"):
+        yield from get_imports(path)
+        return
+
+    logger.debug("Reading module level imports from: %s", path)
+    lines: list[str] = []
+    with tokenize.open(path) as f:
+
+        def readline() -> str:
+            line = f.readline()
+            lines.append(line)
+            return line
+
+        try:
+            header = _header_source(tokenize.generate_tokens(readline), lines)
+        except tokenize.TokenError:
+            # e.g. an unclosed bracket, let the full parse report the error
+            header = None
+
+    if header is None:
+        yield from get_imports(path)
+    else:
+        yield from _module_imports(ast.parse(header, str(path)))
+
+
+def _notebook_imports(path: str) -> Generator[tuple[int, str]]:
+    # line numbers count through the code cells one after another
+    offset = 0
+    for cell in notebook_code(path):
+        try:
+            module = ast.parse(cell, str(path))
+        except SyntaxError as e:
+            # e.g. IPython specific syntax such as `object?`
+            logger.info("Skipping code cell in %s: %s", path, e)
+        else:
+            for lineno, name in _module_imports(module):
+                yield offset + lineno, name
+        offset += len(cell.splitlines())
+
+
+def _header_source(tokens: Iterator[tokenize.TokenInfo], lines: list[str]) -> str:
+    # the tokens always end with ENDMARKER, so this returns before they run out
+    statement_start = True
+    while True:
+        token = next(tokens)
+        if token.type in _SKIPPED_TOKENS:
+            continue
+        if token.type == tokenize.ENDMARKER:
+            # every statement is an import
+            return "".join(lines)
+        if token.type == tokenize.NEWLINE or token.string == ";":
+            statement_start = True
+        elif statement_start:
+            statement_start = False
+            if token.type != tokenize.STRING and token.string not in (
+                "import",
+                "from",
+            ):
+                row, column = token.start
+                return "".join(lines[: row - 1]) + lines[row - 1][:column]
+
 
+def _module_imports(module: ast.Module) -> Generator[tuple[int, str]]:
     for node in ast.walk(module):
         if isinstance(node, ast.Import):
-            yield node.names[0].name.partition(".")[0]
+            yield node.lineno, node.names[0].name
         elif (
             isinstance(node, ast.ImportFrom)
             and node.module is not None
             # Ignore relative imports
             and node.level == 0
         ):
-            yield node.module.partition(".")[0]
+            yield node.lineno, node.module
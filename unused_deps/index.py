@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import sqlite3
+import time
+from collections.abc import Generator, Iterable
+
+from unused_deps.config import Config
+from unused_deps.errors import InternalError
+from unused_deps.import_finder import get_imports
+
+logger = logging.getLogger("unused-deps")
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """\
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ctime_ns INTEGER NOT NULL,
+    ino INTEGER NOT NULL
+);
+CREATE TABLE imports (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    line INTEGER NOT NULL,
+    module TEXT NOT NULL,
+    base TEXT NOT NULL
+);
+CREATE INDEX imports_file_id ON imports(file_id);
+CREATE INDEX imports_base ON imports(base);
+"""
+# as with the run cache: a file modified this close to being indexed could be
+# modified again without its mtime changing, so such files are always re-read
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+class ImportIndex:
+    # a SQLite database of the imports of each file scanned, along with the line
+    # they're on, a file is only read again once its stat changes
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self._connection = connection
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        if version != _SCHEMA_VERSION:
+            self._create()
+        self._indexed: dict[str, tuple[int, int, int, int]] | None = None
+
+    def is_current(self, path: str, stat: os.stat_result) -> bool:
+        # whether the file's imports can be taken from the index without reading it
+        if self._indexed is None:
+            rows = self._connection.execute(
+                "SELECT path, size, mtime_ns, ctime_ns, ino FROM files"
+            )
+            self._indexed = {
+                indexed_path: tuple(indexed) for indexed_path, *indexed in rows
+            }
+        return self._indexed.get(os.path.abspath(path)) == _stat_key(stat)
+
+    def file_imports(self, path: str) -> tuple[list[tuple[int, str]], bool]:
+        # the imports of the file, and whether they had to be read from the file
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self._connection.execute(
+            "SELECT id, size, mtime_ns, ctime_ns, ino FROM files WHERE path = ?",
+            (key,),
+        ).fetchone()
+        if row is not None and tuple(row[1:]) == _stat_key(stat):
+            rows = self._connection.execute(
+                "SELECT line, module FROM imports WHERE file_id = ? ORDER BY rowid",
+                (row[0],),
+            )
+            return [(line, module) for line, module in rows], False
+
+        imports = list(get_imports(path))
+        self._store(key, stat, imports)
+        return imports, True
+
+    def refresh(self) -> None:
+        rows = self._connection.execute(
+            "SELECT path, size, mtime_ns, ctime_ns, ino FROM files"
+        ).fetchall()
+        for path, *indexed in rows:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                logger.debug("Removing from index: %s", path)
+                self._connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                continue
+            if tuple(indexed) == _stat_key(stat):
+                continue
+            try:
+                imports = list(get_imports(path))
+            except (SyntaxError, ValueError) as e:
+                # a scan fails on it, but it shouldn't stop querying the other files
+                logger.warning("Removing from index, can't parse %s: %s", path, e)
+                self._connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                continue
+            self._store(path, stat, imports)
+
+    def who_imports(self, module: str) -> list[tuple[str, int, str]]:
+        return self._connection.execute(
+            "SELECT path, line, module FROM imports "
+            "JOIN files ON files.id = imports.file_id "
+            "WHERE base = ? AND (module = ? OR module GLOB ?) "
+            "ORDER BY path, line",
+            (module.partition(".")[0], module, f"{module}.*"),
+        ).fetchall()
+
+    def imports_in(self, path: str) -> list[tuple[str, int, str]]:
+        imports, _ = self.file_imports(path)
+        key = os.path.abspath(path)
+        return [(key, line, module) for line, module in imports]
+
+    def _create(self) -> None:
+        self._connection.executescript(
+            "DROP TABLE IF EXISTS imports; DROP TABLE IF EXISTS files;"
+            + _SCHEMA
+            + f"PRAGMA user_version = {_SCHEMA_VERSION};"
+        )
+
+    def _store(
+        self, path: str, stat: os.stat_result, imports: Iterable[tuple[int, str]]
+    ) -> None:
+        size, mtime_ns, ctime_ns, ino = _stat_key(stat)
+        if max(mtime_ns, ctime_ns) >= time.time_ns() - _RACY_WINDOW_NS:
+            # never matches, so the file is read again next time
+            mtime_ns = -1
+
+        self._connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        file_id = self._connection.execute(
+            "INSERT INTO files (path, size, mtime_ns, ctime_ns, ino) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, ctime_ns, ino),
+        ).lastrowid
+        self._connection.executemany(
+            "INSERT INTO imports (file_id, line, module, base) VALUES (?, ?, ?, ?)",
+            (
+                (file_id, line, module, module.partition(".")[0])
+                for line, module in imports
+            ),
+        )
+
+
+def _stat_key(stat: os.stat_result) -> tuple[int, int, int, int]:
+    return stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino
+
+
+@contextlib.contextmanager
+def open_index(path: str) -> Generator[ImportIndex]:
+    try:
+        connection = sqlite3.connect(path)
+    except sqlite3.Error as e:
+        raise InternalError(f"Can't open import index '{path}': {e}")
+
+    try:
+        with connection:
+            yield ImportIndex(connection)
+    except sqlite3.Error as e:
+        raise InternalError(f"Failed to use import index '{path}': {e}")
+    finally:
+        connection.close()
+
+
+def run_query(config: Config) -> int:
+    assert config.index_file is not None
+    results = []
+    with open_index(config.index_file) as index:
+        # only files already in the index are found: new files are added by a scan
+        index.refresh()
+        for module in config.who_imports or ():
+            results.extend(index.who_imports(module))
+        for path in config.imports_in or ():
+            try:
+                results.extend(index.imports_in(path))
+            except OSError as e:
+                raise InternalError(f"Can't read '{path}': {e}")
+
+    for path, line, module in results:
+        print(f"{path}:{line}: {module}")
+    return 0 if results else 1
@@ -1,85 +1,64 @@
 from __future__ import annotations
 
 import argparse
-import importlib.metadata
 import logging
 import sys
-from collections.abc import Generator, Iterable, Sequence
-from itertools import chain
-
-from unused_deps.config import build_config, load_config_from_file, validate_config
-from unused_deps.dist_info import (
-    distribution_packages,
-    parse_requirement,
-    required_dists,
+from collections.abc import Sequence
+
+from unused_deps.config import (
+    build_config,
+    load_config_from_file,
+    project_configs,
+    validate_config,
 )
 from unused_deps.errors import InternalError, log_error
-from unused_deps.files import find_files
-from unused_deps.import_finder import get_import_bases
 
 logger = logging.getLogger("unused-deps")
 
+_COMMANDS = ("merge", "query")
+
 
 def main(argv: Sequence[str] | None = None) -> int:
     if argv is None:  # pragma: no cover
         argv = sys.argv[1:]
 
-    parser = _build_arg_parser()
+    command = "scan"
+    if argv and argv[0] in _COMMANDS:
+        command, argv = argv[0], argv[1:]
+
+    parser = _build_arg_parser(command)
     args = parser.parse_args(argv)
 
     try:
         config_from_file = load_config_from_file(args.config_file)
         config = build_config(args, config_from_file)
-        validate_config(config)
+        if command == "scan" and args.filepaths and config.project is not None:
+            # each project scans its own filepaths
+            raise InternalError(
+                "Filepaths can't be given on the command line when projects are "
+                "configured, set 'filepaths' in each project instead"
+            )
+        projects = project_configs(config)
+        for project in projects:
+            validate_config(project, command)
         _configure_logging(config.verbose)
 
-        python_paths = chain.from_iterable(
-            find_files(path, exclude=config.exclude, include=config.include)
-            for path in config.filepaths
-        )
-        imported_packages = frozenset(
-            chain.from_iterable(get_import_bases(path) for path in python_paths)
-        )
-
-        if not imported_packages:
-            logger.info("Could not find any source files")
-
-        success = True
+        if command == "query":
+            from unused_deps.index import run_query
 
-        package_dists: Iterable[importlib.metadata.Distribution]
-        if config.distribution is not None:
-            package_dists = _requirements_from_dist(config.distribution, config.extras)
-        else:
-            package_dists = []
+            return run_query(config)
 
-        requirement_dists = (
-            (
-                dist
-                for dist in _read_requirements(config.requirements, config.extras)
-                if dist is not None
-            )
-            if config.requirements is not None
-            else []
-        )
+        # only imported once the arguments and config are known to be valid:
+        # loading everything needed for a run is the bulk of our startup time,
+        # and not needed for e.g. '--help' or invalid arguments
+        from unused_deps.run import run
 
-        for dist in chain(package_dists, requirement_dists):
-            dist_name = dist.metadata["Name"]
-            if config.ignore is not None and dist_name in config.ignore:
-                logger.info("Ignoring: %s", dist_name)
-                continue
-
-            if not any(
-                package in imported_packages for package in distribution_packages(dist)
-            ):
-                print(f"No usage found for: {dist_name}", file=sys.stderr)
-                success = False
+        return run(command, config, projects)
     except Exception as e:
         returncode, msg = log_error(e)
         print(msg, file=sys.stderr)
         return returncode
 
-    return 0 if success else 1
-
 
 def _configure_logging(verbosity: int) -> None:
     if verbosity == 0:
@@ -96,18 +75,16 @@ def _configure_logging(verbosity: int) -> None:
     logger.setLevel(log_level)
 
 
-def _read_requirements(
-    requirements: Iterable[str],
-    extras: Iterable[str] | None,
-) -> Generator[importlib.metadata.Distribution | None]:
-    for requirement_file in requirements:
-        with open(requirement_file) as f:
-            for requirement in f:
-                yield parse_requirement(requirement.rstrip(), extras)
-
-
-def _build_arg_parser() -> argparse.ArgumentParser:
+def _build_arg_parser(command: str = "scan") -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
+    if command == "query":
+        return _build_query_arg_parser(parser)
+    if command == "merge":
+        parser.prog += " merge"
+        parser.description = (
+            "Check for unused dependencies using the partial results "
+            "written by runs with '--shard'"
+        )
 
     parser.add_argument(
         "-d",
@@ -122,6 +99,13 @@ def _build_arg_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Run without scanning any distribution for dependencies",
     )
+    parser.add_argument(
+        "--pyproject",
+        required=False,
+        metavar="PATH",
+        help="Read the dependencies to scan for from the [project] table of the "
+        "given pyproject.toml, rather than an installed distribution",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -164,27 +148,196 @@ def _build_arg_parser() -> argparse.ArgumentParser:
         help="Pattern to match on files or directory to exclude when measuring usage",
     )
     parser.add_argument(
-        "--config-file",
+        "--site-packages",
         required=False,
-        help="File to load config from",
+        action="append",
+        help="Directory to load installed distributions from, "
+        "instead of the current environment. Can be given multiple times",
+        dest="site_packages",
     )
     parser.add_argument(
-        "filepaths",
-        nargs="*",
-        help="Paths to scan for dependency usage",
+        "--python",
+        required=False,
+        help="Python interpreter whose environment distributions are loaded from, "
+        "instead of the current environment",
     )
+    parser.add_argument(
+        "--by-directory",
+        required=False,
+        type=int,
+        metavar="DEPTH",
+        help="Also report which dependencies are used under each directory, "
+        "grouping directories to the given depth",
+        dest="by_directory",
+    )
+    parser.add_argument(
+        "--check-missing",
+        action="store_true",
+        help="Also report installed third party modules that are imported without "
+        "their distribution being declared as a dependency",
+        dest="check_missing",
+    )
+    parser.add_argument(
+        "--transitive",
+        action="store_true",
+        help="Also report, for each unused dependency, the dependencies that require "
+        "it and the distributions only installed because of it",
+        dest="transitive",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        required=False,
+        help="Directory to cache results in, "
+        "a run with the same inputs as the previous one will reuse its result",
+        dest="cache_dir",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        required=False,
+        help="File to write metrics about the run to, "
+        "in the Prometheus text exposition format",
+        dest="metrics_file",
+    )
+    parser.add_argument(
+        "--trace-file",
+        required=False,
+        help="File to write a timeline of the run to, in the Chrome trace event "
+        "format, and report the slowest files to parse",
+        dest="trace_file",
+    )
+    parser.add_argument(
+        "--matrix-extras",
+        required=False,
+        action="append",
+        metavar="EXTRAS",
+        help="Comma separated extras to check dependencies with, as one axis of a "
+        "matrix of environments. Can be given multiple times, an empty value "
+        "checks without any extras",
+        dest="matrix_extras",
+    )
+    parser.add_argument(
+        "--matrix-env",
+        required=False,
+        action="append",
+        metavar="MARKERS",
+        help="Comma separated NAME=VALUE environment marker values to check "
+        "dependencies with, e.g. 'python_version=3.9,sys_platform=win32', as one "
+        "axis of a matrix of environments. Can be given multiple times",
+        dest="matrix_env",
+    )
+    parser.add_argument(
+        "--index-file",
+        required=False,
+        help="SQLite database to keep an index of the imports in each file in, "
+        "files that haven't changed since they were indexed aren't read again. "
+        "The index can be searched with the 'query' command",
+        dest="index_file",
+    )
+    parser.add_argument(
+        "--config-file",
+        required=False,
+        help="File to load config from",
+    )
+    if command == "merge":
+        parser.add_argument(
+            "filepaths",
+            nargs="+",
+            metavar="partial_files",
+            help="Partial results to merge, one for each shard",
+        )
+    else:
+        parser.add_argument(
+            "--files-from",
+            required=False,
+            metavar="PATH",
+            help="Scan the NUL or newline separated paths listed in the given file, "
+            "or '-' for stdin, instead of searching 'filepaths'",
+            dest="files_from",
+        )
+        parser.add_argument(
+            "--walk-threads",
+            required=False,
+            type=int,
+            metavar="N",
+            help="List directories under 'filepaths' with up to N threads, "
+            "for filesystems where listing a directory is slow, e.g. NFS",
+            dest="walk_threads",
+        )
+        parser.add_argument(
+            "--module-level-only",
+            action="store_true",
+            help="Only read the imports at the top of each file, before any other "
+            "statement. Dependencies that look unused are confirmed by reading "
+            "the whole of the files",
+            dest="module_level_only",
+        )
+        parser.add_argument(
+            "--time-budget",
+            required=False,
+            type=float,
+            metavar="SECONDS",
+            help="Stop scanning after this long, reporting which dependencies were "
+            "found to be used and which might be unused, and exit with 3. The "
+            "cheapest files to scan are scanned first",
+            dest="time_budget",
+        )
+        parser.add_argument(
+            "--shard",
+            required=False,
+            help="Only scan the files belonging to the given shard, "
+            "given as INDEX/COUNT e.g. '1/4'",
+        )
+        parser.add_argument(
+            "--shard-file",
+            required=False,
+            help="File to write the partial results of a '--shard' run to",
+            dest="shard_file",
+        )
+        parser.add_argument(
+            "filepaths",
+            nargs="*",
+            help="Paths to scan for dependency usage",
+        )
 
     return parser
 
 
-def _requirements_from_dist(
-    dist_name: str, extras: Iterable[str] | None
-) -> Generator[importlib.metadata.Distribution]:
-    try:
-        root_dist = importlib.metadata.Distribution.from_name(dist_name)
-    except importlib.metadata.PackageNotFoundError:
-        raise InternalError(
-            f"Could not find metadata for distribution `{dist_name}` is it installed?"
-        )
-
-    return required_dists(root_dist, extras)
+def _build_query_arg_parser(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    parser.prog += " query"
+    parser.description = (
+        "Search the import index written by runs with '--index-file', "
+        "files in the index that have changed since are read again first"
+    )
+    parser.add_argument(
+        "--index-file",
+        required=False,
+        help="The import index to search",
+        dest="index_file",
+    )
+    parser.add_argument(
+        "--who-imports",
+        required=False,
+        action="append",
+        metavar="MODULE",
+        help="List the imports of the given module, or any of its submodules",
+        dest="who_imports",
+    )
+    parser.add_argument(
+        "--imports-in",
+        required=False,
+        action="append",
+        metavar="FILE",
+        help="List the imports in the given file",
+        dest="imports_in",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+    )
+    parser.add_argument(
+        "--config-file",
+        required=False,
+        help="File to load config from",
+    )
+    return parser
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from itertools import product
+from typing import NamedTuple
+
+from unused_deps.environment import Environment
+from unused_deps.errors import InternalError
+
+# the names that can be used in environment markers, see PEP 508
+_MARKER_NAMES = frozenset(
+    (
+        "implementation_name",
+        "implementation_version",
+        "os_name",
+        "platform_machine",
+        "platform_release",
+        "platform_system",
+        "platform_version",
+        "python_full_version",
+        "platform_python_implementation",
+        "python_version",
+        "sys_platform",
+    )
+)
+
+
+# a combination of extras and marker values to check dependencies under
+class MatrixCell(NamedTuple):
+    extras: tuple[str, ...]
+    markers: tuple[tuple[str, str], ...]
+
+
+def matrix_cells(
+    matrix_extras: Sequence[str] | None,
+    matrix_env: Sequence[str] | None,
+    extras: Sequence[str] | None,
+) -> list[MatrixCell]:
+    if matrix_extras is not None:
+        extras_sets = [
+            tuple(extra for extra in value.split(",") if extra)
+            for value in matrix_extras
+        ]
+    else:
+        extras_sets = [tuple(extras or ())]
+
+    if matrix_env is not None:
+        marker_sets = [_parse_markers(value) for value in matrix_env]
+    else:
+        marker_sets = [()]
+
+    return [MatrixCell(*cell) for cell in product(extras_sets, marker_sets)]
+
+
+def cell_environment(environment: Environment, cell: MatrixCell) -> Environment:
+    if not cell.markers:
+        return environment
+    return environment._replace(
+        markers={**(environment.markers or {}), **dict(cell.markers)}
+    )
+
+
+def cell_label(cell: MatrixCell) -> str:
+    return (
+        ", ".join(
+            [f"extra={extra}" for extra in cell.extras]
+            + [f"{name}={value}" for name, value in cell.markers]
+        )
+        or "no extras"
+    )
+
+
+def _parse_markers(value: str) -> tuple[tuple[str, str], ...]:
+    markers = []
+    for item in value.split(","):
+        name, sep, marker_value = item.partition("=")
+        name = name.strip()
+        if not sep or name not in _MARKER_NAMES:
+            raise InternalError(
+                f"Invalid marker environment '{value}': expected NAME=VALUE pairs, "
+                "e.g. 'python_version=3.9,sys_platform=linux'"
+            )
+        markers.append((name, marker_value.strip()))
+    return tuple(markers)
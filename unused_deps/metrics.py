@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+from unused_deps.dist_info import cache_stats
+from unused_deps.files import write_file_atomic
+from unused_deps.stats import RunStats
+
+_PREFIX = "py_unused_deps"
+
+
+def write_metrics(
+    path: str, stats: RunStats, returncode: int, duration_seconds: float
+) -> None:
+    write_file_atomic(path, format_metrics(stats, returncode, duration_seconds))
+
+
+def format_metrics(stats: RunStats, returncode: int, duration_seconds: float) -> str:
+    # label every sample with the directory the run was for, so the metrics from
+    # runs over many repositories can be collected side by side
+    labels = {"directory": os.getcwd()}
+    lines: list[str] = []
+
+    def add(
+        name: str,
+        help_text: str,
+        samples: list[tuple[dict[str, str], float]],
+        metric_type: str = "gauge",
+    ) -> None:
+        if not samples:
+            return
+        lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {_PREFIX}_{name} {metric_type}")
+        for sample_labels, value in samples:
+            lines.append(
+                f"{_PREFIX}_{name}{_format_labels({**labels, **sample_labels})} "
+                f"{value!r}"
+            )
+
+    add(
+        "last_run_timestamp_seconds",
+        "Time the run finished",
+        [({}, time.time())],
+    )
+    add("exit_code", "Exit code of the run", [({}, float(returncode))])
+    add("run_duration_seconds", "Duration of the run", [({}, duration_seconds)])
+    add(
+        "stage_duration_seconds",
+        "Time spent in each stage of the run",
+        [({"stage": stage}, seconds) for stage, seconds in stats.stage_seconds.items()],
+    )
+    add("files_scanned", "Number of files parsed", [({}, float(stats.files))])
+    add("bytes_scanned", "Number of bytes parsed", [({}, float(stats.bytes))])
+    add(
+        "distributions_resolved",
+        "Number of declared distributions resolved",
+        [({}, float(stats.distributions))],
+    )
+
+    cache_lookups = {
+        "files": (stats.file_cache_hits, stats.files),
+        **cache_stats(),
+    }
+    if stats.run_cache_hit is not None:
+        cache_lookups["run"] = (int(stats.run_cache_hit), int(not stats.run_cache_hit))
+    add(
+        "cache_hit_ratio",
+        "Fraction of lookups in each cache that were hits",
+        [
+            ({"cache": cache}, hits / (hits + misses))
+            for cache, (hits, misses) in cache_lookups.items()
+            if hits + misses
+        ],
+    )
+
+    peak_rss = _peak_rss_bytes()
+    if peak_rss is not None:  # pragma: win32 no cover
+        add("peak_rss_bytes", "Peak resident set size", [({}, float(peak_rss))])
+
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    formatted = ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+    return "{" + formatted + "}"
+
+
+def _peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:  # pragma: win32 cover
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # pragma: darwin cover
+        return peak_rss
+    else:  # pragma: darwin no cover
+        # reported in kilobytes, rather than bytes like macOS
+        return peak_rss * 1024
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+from collections.abc import Generator
+from typing import IO, Any
+
+logger = logging.getLogger("unused-deps")
+
+_CHUNK_SIZE = 64 * 1024
+_NON_WHITESPACE = re.compile(rb"[^ \t\r\n]")
+# stops at the closing quote, the end of the buffer, or a backslash at the end of
+# the buffer whose escaped character hasn't been read yet
+_STRING_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_SCALAR = re.compile(rb"[^ \t\r\n,:\]}]*")
+
+
+def notebook_code(path: str) -> Generator[str]:
+    # the Python source of each code cell, with IPython magics and shell commands
+    # blanked out so line numbers are kept. A notebook that can't be read, e.g.
+    # truncated or a git-LFS pointer, is skipped from where the error is found
+    try:
+        with open(path, "rb") as f:
+            for cell in _code_cells(_JSONReader(f)):
+                if not cell.lstrip().startswith("%%"):
+                    # otherwise a cell magic, e.g. `%%bash`: none of it is Python
+                    yield "".join(
+                        "\n" if line.lstrip().startswith(("%", "!")) else line
+                        for line in cell.splitlines(keepends=True)
+                    )
+    except ValueError as e:
+        logger.warning("Skipping notebook %s: %s", path, e)
+
+
+def _code_cells(reader: _JSONReader) -> Generator[str]:
+    for key in reader.keys():
+        if key != "cells":
+            reader.skip_value()
+            continue
+
+        for _ in reader.elements():
+            cell_type = None
+            source: Any = None
+            for cell_key in reader.keys():
+                if cell_key == "cell_type":
+                    cell_type = reader.read_value()
+                elif cell_key == "source" and cell_type in (None, "code"):
+                    source = reader.read_value()
+                else:
+                    # including `outputs`, which can be huge with embedded images
+                    reader.skip_value()
+
+            if cell_type == "code":
+                yield _source_text(source)
+
+
+def _source_text(source: Any) -> str:
+    # usually a list of lines, but may be given as a single string
+    if isinstance(source, str):
+        return source
+    elif isinstance(source, list):
+        return "".join(line for line in source if isinstance(line, str))
+    else:
+        return ""
+
+
+class _JSONReader:
+    # reads JSON values incrementally from a file, so that values which aren't
+    # needed can be skipped without ever holding them in memory. Values are
+    # visited with `keys` and `elements`, which expect the caller to read or skip
+    # each value before continuing
+    def __init__(self, f: IO[bytes]) -> None:
+        self._f = f
+        self._buffer = b""
+        self._pos = 0
+
+    def keys(self) -> Generator[str]:
+        self._expect(b"{")
+        if self._peek() == b"}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected an object key, got {key!r}")
+            self._expect(b":")
+            yield key
+            if self._next_separator(b"}"):
+                return
+
+    def elements(self) -> Generator[None]:
+        self._expect(b"[")
+        if self._peek() == b"]":
+            self._pos += 1
+            return
+        while True:
+            yield
+            if self._next_separator(b"]"):
+                return
+
+    def read_value(self) -> Any:
+        char = self._peek()
+        if char == b'"':
+            return json.loads(self._string(keep=True))
+        elif char == b"{":
+            return {key: self.read_value() for key in self.keys()}
+        elif char == b"[":
+            return [self.read_value() for _ in self.elements()]
+        else:
+            return json.loads(self._scalar())
+
+    def skip_value(self) -> None:
+        char = self._peek()
+        if char == b'"':
+            self._string(keep=False)
+        elif char == b"{":
+            for _ in self.keys():
+                self.skip_value()
+        elif char == b"[":
+            for _ in self.elements():
+                self.skip_value()
+        else:
+            self._scalar()
+
+    def _next_separator(self, end: bytes) -> bool:
+        # whether the end of the object or array has been reached
+        char = self._peek()
+        self._pos += 1
+        if char == end:
+            return True
+        elif char == b",":
+            return False
+        else:
+            raise ValueError(f"Expected ',' or {end.decode()!r}, got {char!r}")
+
+    def _fill(self) -> bool:
+        chunk = self._f.read(_CHUNK_SIZE)
+        if not chunk:
+            return False
+        pos = self._pos
+        self._buffer = self._buffer[pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> bytes:
+        # the next character that isn't whitespace, without consuming it
+        while True:
+            match = _NON_WHITESPACE.search(self._buffer, self._pos)
+            if match is not None:
+                self._pos = match.start()
+                return match.group()
+            self._pos = len(self._buffer)
+            if not self._fill():
+                return b""
+
+    def _expect(self, char: bytes) -> None:
+        got = self._peek()
+        if got != char:
+            raise ValueError(f"Expected {char.decode()!r}, got {got!r}")
+        self._pos += 1
+
+    def _string(self, *, keep: bool) -> bytes:
+        self._expect(b'"')
+        parts = []
+        while True:
+            match = _STRING_BODY.match(self._buffer, self._pos)
+            assert match is not None
+            if keep:
+                parts.append(match.group())
+            self._pos = match.end()
+            if self._buffer.startswith(b'"', self._pos):
+                self._pos += 1
+                return b'"' + b"".join(parts) + b'"'
+            if not self._fill():
+                raise ValueError("Unterminated string")
+
+    def _scalar(self) -> bytes:
+        parts = []
+        while True:
+            match = _SCALAR.match(self._buffer, self._pos)
+            assert match is not None
+            parts.append(match.group())
+            self._pos = match.end()
+            if self._pos < len(self._buffer) or not self._fill():
+                break
+
+        scalar = b"".join(parts)
+        if not scalar:
+            raise ValueError(f"Unexpected {self._peek()!r}")
+        return scalar
@@ -0,0 +1,918 @@
+from __future__ import annotations
+
+import contextlib
+import importlib.metadata
+import logging
+import os.path
+import sys
+import threading
+import time
+from collections.abc import Generator, Iterable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from itertools import chain
+from typing import TYPE_CHECKING
+
+from packaging.utils import canonicalize_name
+
+from unused_deps.config import Config, project_label
+from unused_deps.dist_info import (
+    distribution_name,
+    distribution_packages,
+    find_distribution,
+    module_distributions,
+    parse_requirement,
+    required_dists,
+)
+from unused_deps.environment import Environment, load_environment
+from unused_deps.errors import InternalError
+from unused_deps.files import filter_files, find_files, read_file_list
+from unused_deps.hooks import HOOKS, load_entry_points
+from unused_deps.import_finder import get_import_bases
+from unused_deps.matrix import MatrixCell, cell_environment, cell_label, matrix_cells
+from unused_deps.shard import Shard, in_shard, parse_shard, read_partials, write_partial
+from unused_deps.stats import RunStats
+from unused_deps.usage_matrix import UsageMatrix
+
+if TYPE_CHECKING:
+    from unused_deps.dependency_graph import DependencyGraph
+    from unused_deps.index import ImportIndex
+
+logger = logging.getLogger("unused-deps")
+
+_SLOWEST_FILES = 10
+# the result only covers the files scanned before the time budget ran out
+_PARTIAL_RETURNCODE = 3
+
+
+def run(command: str, config: Config, projects: Sequence[Config]) -> int:
+    load_entry_points()
+    stats = RunStats()
+    start = time.perf_counter()
+    deadline = None if config.time_budget is None else start + config.time_budget
+    if config.trace_file is None:
+        returncode = _run(command, config, projects, stats, deadline)
+    else:
+        from unused_deps.trace import TraceRecorder
+
+        recorder = TraceRecorder()
+        recorder.register(HOOKS)
+        try:
+            returncode = _run(command, config, projects, stats, deadline)
+        finally:
+            recorder.unregister(HOOKS)
+        recorder.write(config.trace_file)
+        slowest = recorder.slowest_files(_SLOWEST_FILES)
+        if slowest:
+            print("Slowest files to parse:", file=sys.stderr)
+            for duration, path in slowest:
+                print(f"  {duration:.3f}s {path}", file=sys.stderr)
+
+    if config.metrics_file is not None:
+        from unused_deps.metrics import write_metrics
+
+        write_metrics(
+            config.metrics_file, stats, returncode, time.perf_counter() - start
+        )
+    return returncode
+
+
+def _run(
+    command: str,
+    config: Config,
+    projects: Sequence[Config],
+    stats: RunStats,
+    deadline: float | None,
+) -> int:
+    with stats.stage("environment"):
+        environment = load_environment(config.site_packages, config.python)
+
+    resolver = _Resolver(config, environment, stats)
+    try:
+        return _check(command, config, projects, environment, resolver, stats, deadline)
+    finally:
+        resolver.close()
+
+
+def _check(
+    command: str,
+    config: Config,
+    projects: Sequence[Config],
+    environment: Environment,
+    resolver: _Resolver,
+    stats: RunStats,
+    deadline: float | None,
+) -> int:
+    fingerprint = None
+    # shared across projects, so each file is only parsed once per run
+    file_imports: dict[str, frozenset[str]] = {}
+    # files in `file_imports` with only their module level imports
+    header_files: set[str] | None = None
+    # the number of files of each project not scanned within the time budget, and
+    # whether the budget ran out before all of its files were found
+    project_unscanned = [0 for _ in projects]
+    project_undiscovered = [False for _ in projects]
+    if command == "merge":
+        if config.by_directory is not None:
+            raise InternalError("'--by-directory' is not supported when merging")
+        resolver.start(projects)
+        with stats.stage("merge"):
+            project_imports = read_partials(config.filepaths, len(projects), stats)
+        project_paths: list[list[str]] = [[] for _ in projects]
+    else:
+        shard = parse_shard(config.shard) if config.shard is not None else None
+        listed_files: Iterable[str] | None = None
+        if config.files_from is not None:
+            listed_files = read_file_list(config.files_from)
+            if len(projects) > 1:
+                # it can only be read once, e.g. from stdin
+                listed_files = list(listed_files)
+        with stats.stage("discover"):
+            project_files = [
+                _project_files(project, shard, listed_files) for project in projects
+            ]
+            # a list of files, or files found by a parallel walk, are passed on to
+            # be parsed as they're found, unless the complete list is needed first
+            streamed = listed_files is not None or config.walk_threads is not None
+            if deadline is not None:
+                # the budget covers finding files too, e.g. a slow network mount
+                discovered = [
+                    _discover_until(files, deadline) for files in project_files
+                ]
+                project_files = [files for files, _ in discovered]
+                project_undiscovered = [not complete for _, complete in discovered]
+            elif not streamed or config.cache_dir is not None:
+                project_files = [list(files) for files in project_files]
+
+        if config.cache_dir is not None and shard is None:
+            from unused_deps.cache import load_result, run_fingerprint
+
+            with stats.stage("fingerprint"):
+                fingerprint = run_fingerprint(
+                    config, environment, chain.from_iterable(project_files)
+                )
+                cached = load_result(config.cache_dir, fingerprint)
+            stats.run_cache_hit = cached is not None
+            if cached is not None:
+                returncode, stdout, stderr = cached
+                for line in stdout:
+                    print(line)
+                for line in stderr:
+                    print(line, file=sys.stderr)
+                return returncode
+
+        if shard is None:
+            resolver.start(projects)
+        if config.module_level_only:
+            header_files = set()
+        with stats.stage("parse"), contextlib.ExitStack() as stack:
+            index = None
+            if config.index_file is not None:
+                from unused_deps.index import open_index
+
+                index = stack.enter_context(open_index(config.index_file))
+            if deadline is None:
+                scanned = [
+                    _imported_packages(files, file_imports, stats, index, header_files)
+                    for files in project_files
+                ]
+            else:
+                scanned = []
+                for project_index, files in enumerate(project_files):
+                    assert isinstance(files, list)
+                    declared = resolver.declared_before(project_index, deadline)
+                    imports, paths, unscanned = _budgeted_imports(
+                        files,
+                        declared,
+                        not config.check_missing,
+                        file_imports,
+                        stats,
+                        index,
+                        deadline,
+                    )
+                    scanned.append((imports, paths))
+                    project_unscanned[project_index] = unscanned
+        project_imports = [imports for imports, _ in scanned]
+        project_paths = [paths for _, paths in scanned]
+        if shard is not None:
+            assert config.shard_file is not None
+            write_partial(config.shard_file, shard, project_imports, stats)
+            return 0
+
+    output = _Output()
+    for project_index, (project, imported_packages, paths) in enumerate(
+        zip(projects, project_imports, project_paths)
+    ):
+        prefix = "" if config.project is None else f"{project_label(project)}: "
+        if not imported_packages:
+            logger.info("Could not find any source files")
+
+        with stats.stage("resolve"):
+            declared, suffixes = resolver.result(project_index)
+        if header_files is not None:
+            with stats.stage("confirm"):
+                imported_packages = _confirm_unused(
+                    paths,
+                    declared,
+                    imported_packages,
+                    file_imports,
+                    header_files,
+                    stats,
+                )
+        unscanned = project_unscanned[project_index]
+        partial = unscanned or project_undiscovered[project_index]
+        if project_undiscovered[project_index]:
+            output.err(
+                f"{prefix}Time budget ran out before all files were found, "
+                "results are partial"
+            )
+        elif unscanned:
+            output.err(
+                f"{prefix}Time budget ran out with {unscanned} files not scanned, "
+                "results are partial"
+            )
+        if config.transitive:
+            suffixes = _transitive_suffixes(
+                declared,
+                imported_packages,
+                suffixes,
+                resolver.dependency_graph(),
+                resolver.requested_extras(project_index),
+            )
+        for dist_name, packages in declared.items():
+            if not imported_packages.isdisjoint(packages):
+                if partial:
+                    output.err(f"{prefix}Usage found for: {dist_name}")
+            elif partial:
+                output.err(
+                    f"{prefix}No usage found so far for: {dist_name}"
+                    + suffixes.get(dist_name, "")
+                )
+            else:
+                output.err(
+                    f"{prefix}No usage found for: {dist_name}"
+                    + suffixes.get(dist_name, "")
+                )
+        if config.check_missing:
+            for module, dist_names in _undeclared_imports(
+                project,
+                imported_packages,
+                declared,
+                resolver.requested_extras(project_index),
+                resolver.module_index(),
+                paths,
+            ):
+                output.err(
+                    f"{prefix}Undeclared dependency: {', '.join(dist_names)} "
+                    f"(imported as {module})"
+                )
+
+        if config.by_directory is not None:
+            matrix = UsageMatrix(config.by_directory)
+            for path in paths:
+                matrix.add_file(path, file_imports[os.path.abspath(path)])
+            for directory, used in matrix.usage_by_directory(declared).items():
+                output.out(f"{prefix}{directory}: {', '.join(used) or '(none)'}")
+
+    if any(project_unscanned) or any(project_undiscovered):
+        # never cached, a later run may have time to finish
+        return _PARTIAL_RETURNCODE
+    returncode = 1 if output.stderr else 0
+    if config.cache_dir is not None and fingerprint is not None:
+        from unused_deps.cache import save_result
+
+        save_result(
+            config.cache_dir, fingerprint, returncode, output.stdout, output.stderr
+        )
+    return returncode
+
+
+class _LogCapture(logging.Filter):
+    # holds back records logged by a thread while it's capturing, so they can be
+    # emitted later by another thread
+    def __init__(self) -> None:
+        super().__init__()
+        self._local = threading.local()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        records = getattr(self._local, "records", None)
+        if records is None:
+            return True
+        records.append(record)
+        return False
+
+    @contextlib.contextmanager
+    def capture(self, records: list[logging.LogRecord]) -> Generator[None]:
+        self._local.records = records
+        try:
+            yield
+        finally:
+            self._local.records = None
+
+
+_Resolved = tuple[dict[str, frozenset[str]], dict[str, str]]
+
+
+class _Resolver:
+    # resolves the dependencies declared by each project in the background while
+    # files are scanned, loading the metadata of the distributions concurrently.
+    # Anything logged or raised while resolving a project is held back until its
+    # result is used, so the output is the same as resolving after the scan
+    def __init__(
+        self, config: Config, environment: Environment, stats: RunStats
+    ) -> None:
+        self._config = config
+        self._environment = environment
+        self._stats = stats
+        self._log_capture = _LogCapture()
+        self._background: ThreadPoolExecutor | None = None
+        self._metadata_loader: ThreadPoolExecutor | None = None
+        self._resolving: list[tuple[list[logging.LogRecord], Future[_Resolved]]] = []
+        # the requirements of each project, including skipped ones, and the extras
+        # they ask for, by canonical name
+        self._requested_extras: list[dict[str, set[str]]] = []
+        self._module_index: Future[dict[str, tuple[str, ...]]] | None = None
+        self._dependency_graph: Future[DependencyGraph] | None = None
+
+    def start(self, projects: Sequence[Config]) -> None:
+        logger.addFilter(self._log_capture)
+        # a single thread, so projects are resolved in order
+        self._background = ThreadPoolExecutor(max_workers=1)
+        self._metadata_loader = ThreadPoolExecutor()
+        for project in projects:
+            records: list[logging.LogRecord] = []
+            requested_extras: dict[str, set[str]] = {}
+            future = self._background.submit(
+                self._resolve, project, records, requested_extras
+            )
+            self._resolving.append((records, future))
+            self._requested_extras.append(requested_extras)
+        if self._config.check_missing:
+            self._module_index = self._metadata_loader.submit(
+                module_distributions, self._environment
+            )
+        if self._config.transitive:
+            from unused_deps.dependency_graph import load_dependency_graph
+
+            self._dependency_graph = self._metadata_loader.submit(
+                load_dependency_graph, self._environment, self._config.cache_dir
+            )
+
+    def result(self, index: int) -> _Resolved:
+        records, future = self._resolving[index]
+        wait((future,))
+        for record in records:
+            logger.handle(record)
+        # only emitted the first time the result is used
+        records.clear()
+        return future.result()
+
+    def declared_before(
+        self, index: int, deadline: float
+    ) -> dict[str, frozenset[str]] | None:
+        # the declared dependencies if they're resolved before the deadline
+        _, future = self._resolving[index]
+        wait((future,), timeout=max(deadline - time.perf_counter(), 0))
+        if not future.done():
+            return None
+        declared, _ = self.result(index)
+        return declared
+
+    def requested_extras(self, index: int) -> dict[str, set[str]]:
+        # only complete once the project's result has been used
+        return self._requested_extras[index]
+
+    def module_index(self) -> dict[str, tuple[str, ...]]:
+        assert self._module_index is not None
+        return self._module_index.result()
+
+    def dependency_graph(self) -> DependencyGraph:
+        assert self._dependency_graph is not None
+        return self._dependency_graph.result()
+
+    def close(self) -> None:
+        for executor in (self._background, self._metadata_loader):
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        logger.removeFilter(self._log_capture)
+
+    def _resolve(
+        self,
+        project: Config,
+        records: list[logging.LogRecord],
+        requested_extras: dict[str, set[str]],
+    ) -> _Resolved:
+        assert self._metadata_loader is not None
+        with self._log_capture.capture(records):
+            if self._config.matrix_extras is None and self._config.matrix_env is None:
+                loading = {
+                    dist_name: self._metadata_loader.submit(_load_packages, dist)
+                    for dist_name, dist in _declared_dists(
+                        project, self._environment, self._stats, requested_extras
+                    )
+                }
+                return _loaded_packages(loading), {}
+
+            cells = matrix_cells(
+                self._config.matrix_extras, self._config.matrix_env, project.extras
+            )
+            return _matrix_declared_dists(
+                project,
+                self._environment,
+                cells,
+                self._stats,
+                self._metadata_loader,
+                requested_extras,
+            )
+
+
+class _Output:
+    # output is kept so it can be cached
+    def __init__(self) -> None:
+        self.stdout: list[str] = []
+        self.stderr: list[str] = []
+
+    def out(self, line: str) -> None:
+        print(line)
+        self.stdout.append(line)
+
+    def err(self, line: str) -> None:
+        print(line, file=sys.stderr)
+        self.stderr.append(line)
+
+
+def _declared_dists(
+    config: Config,
+    environment: Environment,
+    stats: RunStats,
+    requested_extras: dict[str, set[str]] | None,
+) -> Generator[tuple[str, importlib.metadata.Distribution]]:
+    package_dists: Iterable[importlib.metadata.Distribution]
+    if config.distribution is not None:
+        package_dists = _requirements_from_dist(
+            config.distribution, config.extras, environment, requested_extras
+        )
+    elif config.pyproject is not None:
+        package_dists = (
+            dist
+            for dist in _requirements_from_pyproject(
+                config.pyproject, config.extras, environment, requested_extras
+            )
+            if dist is not None
+        )
+    else:
+        package_dists = []
+
+    requirement_dists = (
+        (
+            dist
+            for dist in _read_requirements(
+                config.requirements, config.extras, environment, requested_extras
+            )
+            if dist is not None
+        )
+        if config.requirements is not None
+        else []
+    )
+
+    for dist in chain(package_dists, requirement_dists):
+        stats.distributions += 1
+        dist_name = distribution_name(dist)
+        if config.ignore is not None and dist_name in config.ignore:
+            logger.info("Ignoring: %s", dist_name)
+            continue
+
+        yield dist_name, dist
+
+
+def _matrix_declared_dists(
+    config: Config,
+    environment: Environment,
+    cells: Sequence[MatrixCell],
+    stats: RunStats,
+    metadata_loader: ThreadPoolExecutor,
+    requested_extras: dict[str, set[str]],
+) -> _Resolved:
+    # the files are only scanned once, so whether a dependency is used doesn't
+    # depend on the cell: only which cells declare it does
+    declared: dict[str, Future[frozenset[str]]] = {}
+    declared_in: dict[str, list[str]] = {}
+    for cell in cells:
+        label = cell_label(cell)
+        cell_config = config._replace(extras=list(cell.extras) or None)
+        for dist_name, dist in _declared_dists(
+            cell_config, cell_environment(environment, cell), stats, requested_extras
+        ):
+            if dist_name not in declared:
+                declared[dist_name] = metadata_loader.submit(_load_packages, dist)
+            labels = declared_in.setdefault(dist_name, [])
+            if not labels or labels[-1] != label:
+                labels.append(label)
+
+    suffixes = {
+        dist_name: f" (only with: {'; '.join(labels)})"
+        for dist_name, labels in declared_in.items()
+        if len(labels) < len(cells)
+    }
+    return _loaded_packages(declared), suffixes
+
+
+def _load_packages(dist: importlib.metadata.Distribution) -> frozenset[str]:
+    return frozenset(distribution_packages(dist))
+
+
+def _loaded_packages(
+    loading: dict[str, Future[frozenset[str]]],
+) -> dict[str, frozenset[str]]:
+    return {dist_name: packages.result() for dist_name, packages in loading.items()}
+
+
+def _project_files(
+    config: Config, shard: Shard | None, listed_files: Iterable[str] | None
+) -> Iterable[str]:
+    seen: set[tuple[int, int]] = set()
+    python_paths: Iterable[str]
+    if listed_files is not None:
+        python_paths = filter_files(
+            listed_files, exclude=config.exclude, include=config.include, seen=seen
+        )
+    else:
+        python_paths = chain.from_iterable(
+            find_files(
+                path,
+                exclude=config.exclude,
+                include=config.include,
+                seen=seen,
+                threads=config.walk_threads,
+            )
+            for path in config.filepaths
+        )
+    if shard is not None:
+        python_paths = (path for path in python_paths if in_shard(path, shard))
+    return python_paths
+
+
+def _imported_packages(
+    python_paths: Iterable[str],
+    file_imports: dict[str, frozenset[str]],
+    stats: RunStats,
+    index: ImportIndex | None,
+    header_files: set[str] | None,
+) -> tuple[frozenset[str], list[str]]:
+    imported_packages: set[str] = set()
+    scanned: list[str] = []
+    for path in python_paths:
+        scanned.append(path)
+        imported_packages.update(
+            _scan_file(path, file_imports, stats, index, header_files)
+        )
+
+    return frozenset(imported_packages), scanned
+
+
+def _discover_until(
+    python_paths: Iterable[str], deadline: float
+) -> tuple[list[str], bool]:
+    # the files found before the deadline, and whether that was all of them
+    found: list[str] = []
+    for path in python_paths:
+        if time.perf_counter() >= deadline:
+            return found, False
+        found.append(path)
+    return found, True
+
+
+def _budgeted_imports(
+    python_paths: list[str],
+    declared: dict[str, frozenset[str]] | None,
+    stop_when_used: bool,
+    file_imports: dict[str, frozenset[str]],
+    stats: RunStats,
+    index: ImportIndex | None,
+    deadline: float,
+) -> tuple[frozenset[str], list[str], int]:
+    # scans the cheapest files first, so as many files as possible are covered
+    # before the deadline, and stops early once every dependency is found to be
+    # used since scanning more can't change the result. `declared` is None when
+    # the budget ran out resolving them. Also returns how many files weren't
+    # scanned before the deadline
+    ordered = _cheapest_first(python_paths, file_imports, index, deadline)
+    unconfirmed = list((declared or {}).values())
+    imported_packages: set[str] = set()
+    scanned: list[str] = []
+    for position, path in enumerate(ordered):
+        if stop_when_used and declared is not None and not unconfirmed:
+            logger.info("Usage found for every dependency, stopping the scan")
+            break
+        if time.perf_counter() >= deadline:
+            return frozenset(imported_packages), scanned, len(ordered) - position
+
+        scanned.append(path)
+        imported_packages.update(_scan_file(path, file_imports, stats, index, None))
+        unconfirmed = [
+            packages
+            for packages in unconfirmed
+            if imported_packages.isdisjoint(packages)
+        ]
+
+    return frozenset(imported_packages), scanned, 0
+
+
+def _cheapest_first(
+    python_paths: list[str],
+    file_imports: dict[str, frozenset[str]],
+    index: ImportIndex | None,
+    deadline: float,
+) -> list[str]:
+    # finding the cost takes a stat of each file, so this stops at the deadline
+    # too, leaving the remaining files in the order they were found
+    costs: list[tuple[tuple[int, int], str]] = []
+    for path in python_paths:
+        if time.perf_counter() >= deadline:
+            break
+        costs.append((_scan_cost(path, file_imports, index), path))
+    ordered = [path for _, path in sorted(costs, key=lambda item: item[0])]
+    costed = len(costs)
+    return ordered + python_paths[costed:]
+
+
+def _scan_cost(
+    path: str, file_imports: dict[str, frozenset[str]], index: ImportIndex | None
+) -> tuple[int, int]:
+    # files already scanned this run, then files whose imports are in the index,
+    # then everything else, smallest first
+    if os.path.abspath(path) in file_imports:
+        return 0, 0
+    try:
+        stat = os.stat(path)
+    except OSError:
+        # reported when it's scanned
+        return 2, 0
+    if index is not None and index.is_current(path, stat):
+        return 1, stat.st_size
+    return 2, stat.st_size
+
+
+def _scan_file(
+    path: str,
+    file_imports: dict[str, frozenset[str]],
+    stats: RunStats,
+    index: ImportIndex | None,
+    header_files: set[str] | None,
+) -> frozenset[str]:
+    key = os.path.abspath(path)
+    try:
+        imports = file_imports[key]
+        stats.file_cache_hits += 1
+    except KeyError:
+        # the index already has every import of a file, so reading just the
+        # module level imports wouldn't save anything
+        if header_files is not None and index is None:
+            header_files.add(key)
+            imports = _parse_imports(path, stats, None, module_level_only=True)
+        else:
+            imports = _parse_imports(path, stats, index)
+        file_imports[key] = imports
+    return imports
+
+
+def _confirm_unused(
+    paths: Iterable[str],
+    declared: dict[str, frozenset[str]],
+    imported_packages: frozenset[str],
+    file_imports: dict[str, frozenset[str]],
+    header_files: set[str],
+    stats: RunStats,
+) -> frozenset[str]:
+    # imports after the module level ones can only show that more dependencies
+    # are used, so files are read in full only until every dependency that looks
+    # unused is found
+    unused = [
+        packages
+        for packages in declared.values()
+        if imported_packages.isdisjoint(packages)
+    ]
+    confirmed = set(imported_packages)
+    for path in paths:
+        if not unused:
+            break
+        key = os.path.abspath(path)
+        if key in header_files:
+            header_files.remove(key)
+            file_imports[key] = _parse_imports(path, stats, None)
+        # may have been read in full for another project
+        confirmed.update(file_imports[key])
+        unused = [packages for packages in unused if confirmed.isdisjoint(packages)]
+
+    return frozenset(confirmed)
+
+
+def _undeclared_imports(
+    config: Config,
+    imported_packages: frozenset[str],
+    declared: dict[str, frozenset[str]],
+    requested: Iterable[str],
+    module_index: dict[str, tuple[str, ...]],
+    paths: Iterable[str],
+) -> Generator[tuple[str, tuple[str, ...]]]:
+    # modules that aren't installed, e.g. first party modules or dependencies
+    # that are missing entirely, aren't in the index and can't be reported.
+    # Requirements skipped for their marker or extra are still declared
+    from unused_deps.compat import stdlib_module_names
+
+    ignored: set[str] = {
+        canonicalize_name(dist_name) for dist_name in config.ignore or ()
+    }
+    ignored.update(requested)
+    if config.distribution is not None:
+        ignored.add(canonicalize_name(config.distribution))
+    declared_modules = set(chain.from_iterable(declared.values()))
+    first_party = None
+    stdlib = stdlib_module_names()
+    for module in sorted(imported_packages - declared_modules - stdlib):
+        dist_names = module_index.get(module)
+        if dist_names is None or any(
+            canonicalize_name(dist_name) in ignored for dist_name in dist_names
+        ):
+            continue
+        if first_party is None:
+            first_party = _first_party_modules(paths)
+        if module not in first_party:
+            yield module, dist_names
+
+
+def _transitive_suffixes(
+    declared: dict[str, frozenset[str]],
+    imported_packages: frozenset[str],
+    suffixes: dict[str, str],
+    graph: DependencyGraph,
+    requested_extras: dict[str, set[str]],
+) -> dict[str, str]:
+    # the declared dependencies requiring each unused one, which keep it installed
+    # without being declared, and the distributions only installed because of it.
+    # A dependency declared with extras also requires what they do
+    nodes = {
+        dist_name: node
+        for dist_name in declared
+        if (node := graph.node(dist_name)) is not None
+    }
+    roots = {node: dist_name for dist_name, node in nodes.items()}
+    for dist_name in nodes:
+        for extra in requested_extras.get(canonicalize_name(dist_name), ()):
+            extra_node = graph.node(dist_name, extra)
+            if extra_node is not None:
+                roots[extra_node] = dist_name
+    transitive = dict(suffixes)
+    for dist_name, node in nodes.items():
+        if not imported_packages.isdisjoint(declared[dist_name]):
+            continue
+        suffix = transitive.get(dist_name, "")
+        required_by = graph.required_by(node, roots)
+        if required_by:
+            names = sorted({roots[other] for other in required_by})
+            suffix += f" (required by: {', '.join(names)})"
+        only_through = graph.only_reachable_through(node, roots)
+        if only_through:
+            names = [graph.names[other] for other in only_through]
+            suffix += f" (only reachable through it: {', '.join(names)})"
+        transitive[dist_name] = suffix
+    return transitive
+
+
+def _first_party_modules(paths: Iterable[str]) -> set[str]:
+    # the top level module or package each scanned file belongs to
+    modules = set()
+    packages: dict[str, str | None] = {}
+    for path in paths:
+        directory, filename = os.path.split(os.path.abspath(path))
+        package = _top_level_package(directory, packages)
+        modules.add(os.path.splitext(filename)[0] if package is None else package)
+    return modules
+
+
+def _top_level_package(directory: str, packages: dict[str, str | None]) -> str | None:
+    try:
+        return packages[directory]
+    except KeyError:
+        pass
+
+    package = None
+    if os.path.isfile(os.path.join(directory, "__init__.py")):
+        parent, name = os.path.split(directory)
+        package = _top_level_package(parent, packages) or name
+    packages[directory] = package
+    return package
+
+
+def _parse_imports(
+    path: str,
+    stats: RunStats,
+    index: ImportIndex | None,
+    *,
+    module_level_only: bool = False,
+) -> frozenset[str]:
+    if HOOKS.file_parsed is None:
+        imports, read = _read_imports(path, index, module_level_only)
+    else:
+        start = time.perf_counter()
+        imports, read = _read_imports(path, index, module_level_only)
+        if read:
+            HOOKS.file_parsed(path, time.perf_counter() - start, len(imports))
+    if read:
+        stats.files += 1
+        stats.bytes += os.path.getsize(path)
+    else:
+        stats.file_cache_hits += 1
+    return imports
+
+
+def _read_imports(
+    path: str, index: ImportIndex | None, module_level_only: bool
+) -> tuple[frozenset[str], bool]:
+    # the imported modules, and whether the file had to be read to find them
+    if index is None:
+        return (
+            frozenset(get_import_bases(path, module_level_only=module_level_only)),
+            True,
+        )
+
+    indexed, read = index.file_imports(path)
+    return frozenset(module.partition(".")[0] for _, module in indexed), read
+
+
+def _read_requirements(
+    requirements: Iterable[str],
+    extras: Iterable[str] | None,
+    environment: Environment,
+    requested_extras: dict[str, set[str]] | None,
+) -> Generator[importlib.metadata.Distribution | None]:
+    for requirement_file in requirements:
+        with open(requirement_file) as f:
+            for requirement in f:
+                yield parse_requirement(
+                    requirement.rstrip(),
+                    extras,
+                    environment,
+                    requested_extras=requested_extras,
+                )
+
+
+def _requirements_from_dist(
+    dist_name: str,
+    extras: Iterable[str] | None,
+    environment: Environment,
+    requested_extras: dict[str, set[str]] | None,
+) -> Generator[importlib.metadata.Distribution]:
+    try:
+        root_dist = find_distribution(dist_name, environment)
+    except importlib.metadata.PackageNotFoundError:
+        raise InternalError(
+            f"Could not find metadata for distribution `{dist_name}` is it installed?"
+        )
+
+    return required_dists(
+        root_dist, extras, environment, requested_extras=requested_extras
+    )
+
+
+def _requirements_from_pyproject(
+    path: str,
+    extras: Iterable[str] | None,
+    environment: Environment,
+    requested_extras: dict[str, set[str]] | None,
+) -> Generator[importlib.metadata.Distribution | None]:
+    from unused_deps.compat import toml
+
+    try:
+        with open(path, "rb") as f:
+            project = toml.load(f).get("project")
+    except (OSError, toml.TOMLDecodeError) as e:
+        raise InternalError(f"Failed to read TOML file: {path}: {e}")
+
+    if not isinstance(project, dict):
+        raise InternalError(f"No [project] table in {path}")
+    dynamic = project.get("dynamic", ())
+    if "dependencies" in dynamic:
+        raise InternalError(
+            f"The dependencies in {path} are dynamic, "
+            "install the project and use '--distribution' instead"
+        )
+    if extras and "optional-dependencies" in dynamic:
+        raise InternalError(
+            f"The optional dependencies in {path} are dynamic, "
+            "install the project and use '--distribution' instead"
+        )
+
+    for requirement in project.get("dependencies", ()):
+        yield parse_requirement(
+            requirement, extras, environment, requested_extras=requested_extras
+        )
+
+    # in the installed metadata these would all be marked with `extra == "<extra>"`
+    optional_dependencies = project.get("optional-dependencies", {})
+    for extra in extras or ():
+        if extra not in optional_dependencies:
+            logger.info("No optional dependencies for extra %s in %s", extra, path)
+        for requirement in optional_dependencies.get(extra, ()):
+            yield parse_requirement(
+                requirement, [extra], environment, requested_extras=requested_extras
+            )
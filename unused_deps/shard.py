@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import zlib
+from collections.abc import Iterable, Sequence
+from typing import Any, NamedTuple
+
+from unused_deps.errors import InternalError
+from unused_deps.stats import RunStats
+
+logger = logging.getLogger("unused-deps")
+
+_PARTIAL_VERSION = 1
+
+
+class Shard(NamedTuple):
+    # the shard `number` (from 1) of `total`
+    number: int
+    total: int
+
+
+def parse_shard(value: str) -> Shard:
+    index, sep, count = value.partition("/")
+    try:
+        shard = Shard(int(index), int(count))
+    except ValueError:
+        shard = None
+
+    if not sep or shard is None or not 1 <= shard.number <= shard.total:
+        raise InternalError(
+            f"Invalid shard '{value}': expected INDEX/COUNT, e.g. '1/4'"
+        )
+    return shard
+
+
+def in_shard(path: str, shard: Shard) -> bool:
+    # must give the same answer on every node, so no `hash()`
+    normalized = os.path.normpath(path).replace(os.sep, "/")
+    return zlib.crc32(normalized.encode()) % shard.total == shard.number - 1
+
+
+def write_partial(
+    path: str,
+    shard: Shard,
+    project_imports: Iterable[frozenset[str]],
+    stats: RunStats,
+) -> None:
+    partial = {
+        "version": _PARTIAL_VERSION,
+        "shard": list(shard),
+        "imports": [sorted(imports) for imports in project_imports],
+        "stats": {"files": stats.files, "bytes": stats.bytes},
+    }
+    with open(path, "w") as f:
+        json.dump(partial, f)
+
+
+def read_partials(
+    paths: Sequence[str], project_count: int, stats: RunStats
+) -> list[frozenset[str]]:
+    project_imports: list[set[str]] = [set() for _ in range(project_count)]
+    seen: dict[int, str] = {}
+    shard_count = None
+
+    for path in paths:
+        partial = _read_partial(path)
+        index, count = partial["shard"]
+        if shard_count is None:
+            shard_count = count
+        elif count != shard_count:
+            raise InternalError(
+                f"Partial result {path} is from a run with {count} shards, "
+                f"expected {shard_count}"
+            )
+        if index in seen:
+            raise InternalError(
+                f"Partial results {seen[index]} and {path} are both for shard {index}"
+            )
+        seen[index] = path
+
+        if len(partial["imports"]) != project_count:
+            raise InternalError(
+                f"Partial result {path} has {len(partial['imports'])} projects, "
+                f"expected {project_count}"
+            )
+        for imports, shard_imports in zip(project_imports, partial["imports"]):
+            imports.update(shard_imports)
+
+        stats.files += partial["stats"]["files"]
+        stats.bytes += partial["stats"]["bytes"]
+
+    missing = sorted(set(range(1, (shard_count or 0) + 1)) - seen.keys())
+    if missing:
+        raise InternalError(
+            "Missing partial results for shards: " + ", ".join(map(str, missing))
+        )
+
+    logger.info(
+        "Merged %d shards: %d files, %d bytes scanned",
+        len(seen),
+        stats.files,
+        stats.bytes,
+    )
+    return [frozenset(imports) for imports in project_imports]
+
+
+def _read_partial(path: str) -> dict[str, Any]:
+    try:
+        with open(path) as f:
+            partial = json.load(f)
+    except (OSError, ValueError) as e:
+        raise InternalError(f"Failed to read partial result {path}: {e}")
+
+    if not isinstance(partial, dict) or partial.get("version") != _PARTIAL_VERSION:
+        raise InternalError(f"Unsupported partial result file: {path}")
+    return partial
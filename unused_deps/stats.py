@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from unused_deps.hooks import HOOKS
+
+
+@dataclass
+class RunStats:
+    files: int = 0
+    bytes: int = 0
+    file_cache_hits: int = 0
+    distributions: int = 0
+    run_cache_hit: bool | None = None
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def stage(self, name: str) -> Generator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + duration
+            if HOOKS.stage is not None:
+                HOOKS.stage(name, duration)
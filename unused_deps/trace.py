@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from unused_deps.files import write_file_atomic
+from unused_deps.hooks import Hooks
+
+
+class TraceRecorder:
+    # records a span for each hook event with a duration, in the Chrome trace event
+    # format (https://ui.perfetto.dev or chrome://tracing can open these). Events
+    # are raised once the work is done, so a span is placed ending when it's raised
+    def __init__(self) -> None:
+        self._start = time.perf_counter()
+        self._pid = os.getpid()
+        self._events: list[dict[str, Any]] = []
+        self._threads: dict[int, str] = {}
+        self._files: list[tuple[float, str]] = []
+        self._handlers: dict[str, Callable[..., None]] = {
+            "stage": self._stage,
+            "directory_listed": self._directory_listed,
+            "file_parsed": self._file_parsed,
+            "distribution_lookup": self._distribution_lookup,
+        }
+
+    def register(self, hooks: Hooks) -> None:
+        for event, handler in self._handlers.items():
+            hooks.register(event, handler)
+
+    def unregister(self, hooks: Hooks) -> None:
+        for event, handler in self._handlers.items():
+            hooks.unregister(event, handler)
+
+    def write(self, path: str) -> None:
+        thread_names = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in self._threads.items()
+        ]
+        write_file_atomic(
+            path,
+            json.dumps(
+                {
+                    "traceEvents": thread_names + self._events,
+                    "displayTimeUnit": "ms",
+                }
+            ),
+        )
+
+    def slowest_files(self, count: int) -> list[tuple[float, str]]:
+        return heapq.nlargest(count, self._files)
+
+    def _stage(self, name: str, duration: float) -> None:
+        self._span(name, "stage", duration, {})
+
+    def _directory_listed(self, path: str, duration: float, entries: int) -> None:
+        self._span(path, "list", duration, {"entries": entries})
+
+    def _file_parsed(self, path: str, duration: float, import_count: int) -> None:
+        self._files.append((duration, path))
+        self._span(path, "parse", duration, {"imports": import_count})
+
+    def _distribution_lookup(self, name: str, duration: float) -> None:
+        self._span(name, "distribution", duration, {})
+
+    def _span(
+        self, name: str, category: str, duration: float, args: dict[str, Any]
+    ) -> None:
+        # list appends and dict assignments are atomic, so events from worker
+        # threads need no lock
+        end = time.perf_counter() - self._start
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        self._events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (end - duration) * 1e6,
+                "dur": duration * 1e6,
+                "pid": self._pid,
+                "tid": tid,
+                "args": args,
+            }
+        )
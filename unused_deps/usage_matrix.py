@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterable, Mapping
+
+
+class UsageMatrix:
+    # module names are interned to IDs, and the modules imported by each file and
+    # directory are stored as bitsets of these IDs, so building the matrix and
+    # checking a dependency against a directory are both just integer operations
+    def __init__(self, depth: int) -> None:
+        self.depth = depth
+        self.files: list[str] = []
+        self.file_modules: list[int] = []
+        self.directory_modules: dict[str, int] = {}
+        self._module_ids: dict[str, int] = {}
+
+    def add_file(self, path: str, modules: Iterable[str]) -> None:
+        bits = 0
+        for module in modules:
+            bits |= 1 << self._module_id(module)
+
+        self.files.append(path)
+        self.file_modules.append(bits)
+        directory = self._directory(path)
+        self.directory_modules[directory] = (
+            self.directory_modules.get(directory, 0) | bits
+        )
+
+    def modules_mask(self, modules: Iterable[str]) -> int:
+        mask = 0
+        for module in modules:
+            module_id = self._module_ids.get(module)
+            if module_id is not None:
+                mask |= 1 << module_id
+        return mask
+
+    def usage_by_directory(
+        self, dist_modules: Mapping[str, Iterable[str]]
+    ) -> dict[str, list[str]]:
+        dist_masks = {
+            dist_name: self.modules_mask(modules)
+            for dist_name, modules in dist_modules.items()
+        }
+        return {
+            directory: [
+                dist_name for dist_name, mask in dist_masks.items() if bits & mask
+            ]
+            for directory, bits in sorted(self.directory_modules.items())
+        }
+
+    def _module_id(self, module: str) -> int:
+        try:
+            return self._module_ids[module]
+        except KeyError:
+            module_id = self._module_ids[module] = len(self._module_ids)
+            return module_id
+
+    def _directory(self, path: str) -> str:
+        # the root of an absolute path isn't counted as a level
+        drive, directory = os.path.splitdrive(os.path.normpath(os.path.dirname(path)))
+        root = drive
+        if directory.startswith(os.sep):
+            root += "/"
+            directory = directory.lstrip(os.sep)
+        parts = directory.split(os.sep)
+        return root + "/".join(parts[: self.depth])